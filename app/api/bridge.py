@@ -1,9 +1,17 @@
 # app/api/bridge.py
 from fastapi import APIRouter, HTTPException
-from web3 import Web3
-import os, yaml
+from fastapi.responses import StreamingResponse
+from typing import TYPE_CHECKING
+import json, os
 
-from app.correlate.linkers import BridgeAdapter, fetch_bridge_src_events
+from app.core.config import snapshot
+from app.core.rpc import REGISTRY
+from app.correlate.join import join_bridge_events
+from app.correlate.linkers import BridgeAdapter, fetch_bridge_src_events_async
+from app.correlate.logfetch import AsyncLogFetcher
+
+if TYPE_CHECKING:
+    from web3 import AsyncWeb3
 
 router = APIRouter(prefix="/v1/bridge", tags=["bridge"])
 
@@ -11,69 +19,73 @@ def _env(name: str) -> str | None:
     v = os.getenv(name)
     return v if v and v.strip() else None
 
-def _rpc_for_chain(chain_id: int) -> str | None:
-    # Read RPCs straight from environment (.env is loaded at process start by your app)
-    return {
-        1:  _env("RPC_MAINNET"),
-        10: _env("RPC_OPTIMISM"),
-        42161: _env("RPC_ARBITRUM"),
-        8453: _env("RPC_BASE"),
-    }.get(chain_id)
-
-def _load_cfg() -> dict:
-    cfg_path = os.getenv("INTENT_GUARD_CONFIG", "config.yaml")
-    with open(cfg_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+def _w3_for_chain(chain_id: int) -> "AsyncWeb3":
+    try:
+        return REGISTRY.for_chain_async(chain_id).w3
+    except RuntimeError:
+        raise HTTPException(500, f"No RPC configured for chain {chain_id}")
 
-@router.get("/fetch/src/{adapter_name}")
-def fetch_src(adapter_name: str):
-    cfg = _load_cfg()
-    adapters = cfg.get("bridges", [])
-    found = next((a for a in adapters if a.get("name") == adapter_name), None)
+def _adapter_cfg(adapter_name: str) -> dict:
+    found = snapshot().bridges.get(adapter_name)
     if not found:
         raise HTTPException(404, f"adapter {adapter_name} not found in config.yaml")
+    return found
 
-    rpc = _rpc_for_chain(int(found["src_chain"]))
-    if not rpc:
-        raise HTTPException(500, f"No RPC configured for chain {found['src_chain']}")
+def _store_enabled() -> bool:
+    v = _env("INTENT_GUARD_STORE")
+    if v is not None:
+        return v.lower() not in ("0", "false", "off")
+    return bool(((snapshot().raw.get("global", {}) or {}).get("event_store", {}) or {}).get("enabled", True))
 
-    w3 = Web3(Web3.HTTPProvider(rpc, request_kwargs={"timeout": 20}))
+@router.get("/fetch/src/{adapter_name}")
+async def fetch_src(adapter_name: str):
+    found = _adapter_cfg(adapter_name)
+    w3 = _w3_for_chain(int(found["src_chain"]))
 
-    adapter = BridgeAdapter(
-        name=found["name"],
-        src_chain=int(found["src_chain"]),
-        dst_chain=int(found["dst_chain"]),
-        src_address=found["src_address"],
-        event_signature=found["event_signature"],
-        fields=found["fields"],
-        from_block=found.get("from_block", "latest-5000"),
-        to_block=found.get("to_block", "latest"),
-    )
+    adapter = BridgeAdapter.from_config(found)
 
-    events = fetch_bridge_src_events(w3, adapter)
+    if _store_enabled():
+        from app.correlate.store import fetch_bridge_src_events_cached_async, get_store   # SQLAlchemy, on first use
+        events = await fetch_bridge_src_events_cached_async(w3, adapter, get_store())
+    else:
+        events = await fetch_bridge_src_events_async(w3, adapter)
     return [e.__dict__ for e in events]
 
+@router.get("/join/{adapter_name}")
+async def join(adapter_name: str, max_delay_s: float | None = None, matched_only: bool = False):
+    """
+    Source and destination events of the adapter joined by messageId, as
+    NDJSON: matched pairs as they are found, unmatched events once they
+    age out (status expired/evicted) or the scan ends (open).
+    """
+    found = _adapter_cfg(adapter_name)
+    adapter = BridgeAdapter.from_config(found)
+    try:
+        adapter.side("dst")
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    src_w3, dst_w3 = _w3_for_chain(adapter.src_chain), _w3_for_chain(adapter.dst_chain)
+    delay = max_delay_s if max_delay_s is not None else float(found.get("max_delay_s", 3600))
+
+    async def lines():
+        async for j in join_bridge_events(src_w3, dst_w3, adapter, max_delay_s=delay):
+            if j.status == "matched" or not matched_only:
+                yield json.dumps(j.as_dict()) + "\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @router.get("/fetch/debug/{adapter_name}")
-def fetch_debug(adapter_name: str, span: int = 200000):
-    cfg = _load_cfg()
-    adapters = cfg.get("bridges", [])
-    found = next((a for a in adapters if a.get("name")==adapter_name), None)
-    if not found:
-        raise HTTPException(404, f"adapter {adapter_name} not found in config.yaml")
-    rpc = _rpc_for_chain(int(found["src_chain"]))
-    if not rpc:
-        raise HTTPException(500, f"No RPC configured for chain {found['src_chain']}")
-    w3 = Web3(Web3.HTTPProvider(rpc, request_kwargs={"timeout": 20}))
-    latest = w3.eth.block_number
+async def fetch_debug(adapter_name: str, span: int = 200000):
+    from web3 import Web3
+    found = _adapter_cfg(adapter_name)
+    w3 = _w3_for_chain(int(found["src_chain"]))
+    latest = await w3.eth.block_number
     from_b = max(0, latest - span)
     topic0 = Web3.keccak(text=found["event_signature"]).hex()
-    logs = w3.eth.get_logs({
+    fetcher = AsyncLogFetcher(w3, int(found["src_chain"]))
+    logs = await fetcher.fetch({
         "address": Web3.to_checksum_address(found["src_address"]),
-        "fromBlock": from_b,
-        "toBlock": latest,
         "topics": [topic0]
-    })
+    }, from_b, latest)
     return {
         "adapter": adapter_name,
         "rpc_chain": int(found["src_chain"]),
@@ -83,5 +95,7 @@ def fetch_debug(adapter_name: str, span: int = 200000):
         "from_block": from_b,
         "to_block": latest,
         "log_count": len(logs),
+        "rpc_calls": fetcher.calls,
+        "range_splits": fetcher.splits,
         "sample_tx": logs[0]["transactionHash"].hex() if logs else None
     }
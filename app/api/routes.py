@@ -1,15 +1,24 @@
-from fastapi import APIRouter, Query
+import asyncio, json
+from collections import deque
+from typing import AsyncIterator, Iterator, Type
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 from app.models.schemas import EIP712TypedData, UserOperation, Verdict, SimCallNode
 from app.eip712.parser import eip712_hash
 from app.eip712.renderer import render_plain
 from app.policies.eip712 import lint_eip712
-from app.simulate.aa import simulate_validation
-from app.policies.eip4337 import lint_userop
+from app.simulate.aa import simulate_validation, simulate_validation_async
+from app.policies.eip4337 import Issue, lint_userop
+from app.core.deadline import DeadlineExceeded
+from app.core.metrics import stage
 from app.explain.rationale import from_issues
 from app.explain.attestation import attestation
-from app.correlate.dag import IntentDAG, IntentEvent
+from app.correlate.batch import EventBatch
+from app.correlate.dag import IntentDAG
 from app.correlate.linkers import deterministic_link, probabilistic_link
-from app.policies.crosschain import conservation_check
+from app.correlate.engine import get_engine
+from app.policies.crosschain import conservation_by_component
 
 router = APIRouter(prefix="/v1")
 
@@ -20,45 +29,197 @@ def decide(issues):
     if "warn" in sev: return "WARN"
     return "ALLOW"
 
-@router.post("/validate/eip712", response_model=Verdict)
-def validate_eip712(body: EIP712TypedData, blockTag: str = Query("latest")):
-    issues = lint_eip712(body)
+def verdict_eip712(body: EIP712TypedData, blockTag: str = "latest") -> Verdict:
+    with stage("712.lint"):
+        issues = lint_eip712(body)
     decision = decide(issues)
     rationale = from_issues(issues)
-    att = attestation({
-        "type": "eip712",
-        "hash": eip712_hash(body),
-        "render": render_plain(body),
-        "blockTag": blockTag
-    })
+    with stage("712.hash"):
+        digest = eip712_hash(body)
+    with stage("712.render"):
+        rendered = render_plain(body)
+    with stage("712.attest"):
+        att = attestation({
+            "type": "eip712",
+            "hash": digest,
+            "render": rendered,
+            "blockTag": blockTag
+        })
     return Verdict(decision=decision, rationale=rationale, attestation=att)
 
-@router.post("/validate/4337", response_model=Verdict)
-def validate_4337(body: UserOperation, blockTag: str = Query("latest")):
-    tree: SimCallNode = simulate_validation(body)
-    issues = lint_userop(tree, body)
+def _unsimulated(body: UserOperation, e: Exception):
+    # no trace: lint what the UserOperation itself shows, and block, since nothing it executes was seen
+    return SimCallNode(target=body.sender, selector="0x"), [Issue("AA-SIM", f"simulation unavailable: {e}", "error")]
+
+def _verdict_4337(body: UserOperation, tree: SimCallNode, sim_issues, blockTag: str) -> Verdict:
+    with stage("4337.lint"):
+        issues = sim_issues + lint_userop(tree, body)
     # Cross-chain (optional): if client passes events later, stitch and check conservation.
     decision = decide(issues)
     rationale = from_issues(issues)
-    att = attestation({
-        "type": "4337",
-        "sender": body.sender,
-        "callTree": tree.model_dump(),
-        "blockTag": blockTag
-    })
+    with stage("4337.attest"):
+        att = attestation({
+            "type": "4337",
+            "sender": body.sender,
+            "callTree": tree,
+            "blockTag": blockTag
+        })
     return Verdict(decision=decision, rationale=rationale, attestation=att)
 
+def verdict_4337(body: UserOperation, blockTag: str = "latest") -> Verdict:
+    try:
+        with stage("4337.simulate"):
+            tree, sim_issues = simulate_validation(body, block=blockTag), []
+    except DeadlineExceeded:
+        raise
+    except (RuntimeError, ValueError, OSError) as e:
+        tree, sim_issues = _unsimulated(body, e)
+    return _verdict_4337(body, tree, sim_issues, blockTag)
+
+async def verdict_4337_async(body: UserOperation, blockTag: str = "latest") -> Verdict:
+    try:
+        with stage("4337.simulate"):
+            tree, sim_issues = await simulate_validation_async(body, block=blockTag), []
+    except DeadlineExceeded:
+        raise
+    except (RuntimeError, ValueError, OSError) as e:
+        tree, sim_issues = _unsimulated(body, e)
+    return _verdict_4337(body, tree, sim_issues, blockTag)
+
+@router.post("/validate/eip712", response_model=Verdict)
+def validate_eip712(body: EIP712TypedData, blockTag: str = Query("latest")):
+    return verdict_eip712(body, blockTag)
+
+@router.post("/validate/4337", response_model=Verdict)
+async def validate_4337(body: UserOperation, blockTag: str = Query("latest")):
+    return await verdict_4337_async(body, blockTag)
+
+def _validated(items, validate) -> Iterator[BaseModel | Exception]:
+    for it in items:
+        try:
+            yield validate(it)
+        except ValidationError as e:
+            yield e
+
+def parse_batch(raw: bytes, model: Type[BaseModel]) -> Iterator[BaseModel | Exception]:
+    """
+    Items of a JSON array or an NDJSON body, in input order. An item that fails
+    to parse or validate is yielded as its exception so the rest still run; a
+    malformed array is rejected up front with a 400.
+    """
+    text = raw.lstrip()
+    if text[:1] == b"[":
+        try:
+            items = json.loads(text)
+        except ValueError as e:
+            raise HTTPException(400, f"invalid JSON array: {e}")
+        return _validated(items, model.model_validate)
+    lines = (ln for ln in text.splitlines() if ln.strip())
+    return _validated(lines, model.model_validate_json)
+
+def _invalid(e: Exception) -> Verdict:
+    # unreadable input is never waved through
+    msg = e.errors()[0]["msg"] if isinstance(e, ValidationError) else str(e)
+    return Verdict(decision="BLOCK", rationale=[f"P-INPUT: {msg}"], attestation={"error": "invalid item"})
+
+def batch_verdicts(items, verdict_fn, blockTag: str = "latest") -> Iterator[Verdict]:
+    for it in items:
+        yield _invalid(it) if isinstance(it, Exception) else verdict_fn(it, blockTag)
+
+BATCH_CONCURRENCY = 16   # UserOperations simulated at once per 4337 batch
+
+async def _verdict_4337_or_late(body: UserOperation, blockTag: str) -> Verdict:
+    try:
+        return await verdict_4337_async(body, blockTag)
+    except DeadlineExceeded as e:
+        # the response is already streaming: an item the deadline cut off is blocked, not dropped
+        return _verdict_4337(body, *_unsimulated(body, e), blockTag)
+
+async def batch_verdicts_4337(items, blockTag: str = "latest",
+                              concurrency: int = BATCH_CONCURRENCY) -> AsyncIterator[Verdict]:
+    """
+    Verdicts for `items` in input order, with up to `concurrency` simulations
+    in flight: the window moves on as its oldest item finishes.
+    """
+    window, items = deque(), iter(items)
+    def launch():
+        for it in items:
+            if isinstance(it, Exception):
+                window.append(_invalid(it))
+            else:
+                window.append(asyncio.ensure_future(_verdict_4337_or_late(it, blockTag)))
+                return
+    try:
+        for _ in range(max(1, concurrency)):
+            launch()
+        while window:
+            head = window.popleft()
+            if isinstance(head, Verdict):
+                yield head
+                continue
+            v = await head
+            launch()
+            yield v
+    finally:
+        for t in window:
+            if isinstance(t, asyncio.Future):
+                t.cancel()
+
+def _ndjson(verdicts: Iterator[Verdict] | AsyncIterator[Verdict]) -> StreamingResponse:
+    if hasattr(verdicts, "__aiter__"):
+        lines = (v.model_dump_json() + "\n" async for v in verdicts)
+    else:
+        lines = (v.model_dump_json() + "\n" for v in verdicts)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@router.post("/validate/eip712/batch")
+async def validate_eip712_batch(request: Request, blockTag: str = Query("latest")):
+    """JSON array or NDJSON of typed data in; one NDJSON Verdict per item out, in order."""
+    items = parse_batch(await request.body(), EIP712TypedData)
+    return _ndjson(batch_verdicts(items, verdict_eip712, blockTag))
+
+@router.post("/validate/4337/batch")
+async def validate_4337_batch(request: Request, blockTag: str = Query("latest")):
+    """
+    JSON array or NDJSON of UserOperations in; one NDJSON Verdict per item out,
+    in order. Items the request deadline cuts off come back as AA-SIM blocks.
+    """
+    items = parse_batch(await request.body(), UserOperation)
+    return _ndjson(batch_verdicts_4337(items, blockTag))
+
 @router.post("/validate/crosschain", response_model=Verdict)
 def validate_crosschain(events: list[dict]):
     dag = IntentDAG()
-    evobjs = [IntentEvent(**e) for e in events]
+    try:
+        batch = EventBatch.from_dicts(events)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(422, str(e))
     logs = []
-    logs += deterministic_link(dag, evobjs)
-    logs += probabilistic_link(dag, evobjs)
-    issues = []
-    if evobjs:
-        issues += conservation_check(dag, evobjs[0].eid)
+    with stage("xchain.link"):
+        logs += deterministic_link(dag, batch)
+        logs += probabilistic_link(dag, batch)
+    with stage("xchain.conservation"):
+        issues = conservation_by_component(dag, batch=batch)
     decision = decide(issues)
     rationale = from_issues(issues) + [f"link:{m}" for m in logs]
     att = attestation({"type": "xchain", "edges": list(dag.edges())})
     return Verdict(decision=decision, rationale=rationale, attestation=att)
+
+@router.post("/stream/events")
+def stream_ingest(events: list[dict]):
+    engine = get_engine()
+    try:
+        logs = engine.ingest_many(EventBatch.from_dicts(events).to_events())
+    except (TypeError, ValueError) as e:
+        raise HTTPException(422, str(e))
+    return {"ingested": len(events), "retained": len(engine), "links": logs}
+
+@router.get("/stream/intents/{eid}", response_model=Verdict)
+def stream_verdict(eid: str):
+    issues = get_engine().check(eid)
+    if issues is None:
+        raise HTTPException(404, f"intent {eid} is not in the correlation window")
+    decision = decide(issues)
+    rationale = from_issues(issues)
+    att = attestation({"type": "xchain-stream", "intent": eid})
+    return Verdict(decision=decision, rationale=rationale, attestation=att)
@@ -1,17 +1,21 @@
 from fastapi import APIRouter
-from web3 import Web3
+from app.core.deadline import DeadlineExceeded
+from app.core.rpc import get_async_w3
 router = APIRouter()
 
 @router.post("/v1/simulate/eoa")
-def simulate_eoa(payload: dict):
+async def simulate_eoa(payload: dict):
     to = payload["to"]; data = payload.get("data","0x"); frm = payload.get("from")
     value = int(payload.get("value","0"), 0) if isinstance(payload.get("value"), str) else payload.get("value",0)
     gas = payload.get("gas")  # optional
+    w3 = get_async_w3(int(payload.get("chainId", 1)))
     try:
         # dry-run
-        res = w3.eth.call({"to": to, "from": frm, "data": data, "value": value, "gas": gas or 1_000_000}, block_identifier="latest")
+        res = await w3.eth.call({"to": to, "from": frm, "data": data, "value": value, "gas": gas or 1_000_000}, block_identifier="latest")
         return {"will_succeed": True, "result": res.hex()}
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         # decode revert if present
-        reason = decode_revert(str(e))
+        reason = str(e)
         return {"will_succeed": False, "error": reason}
@@ -1,10 +1,11 @@
 from typing import Optional
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-import os, requests
+import os
+from app.core.rpc import REGISTRY
+from app.simulate.cache import get_sim_cache, sim_key
 
 router = APIRouter()
-BUNDLER_RPC = os.getenv("BUNDLER_RPC", "").strip()
 DEFAULT_EP = os.getenv("ENTRY_POINT", "").strip()
 
 class UserOperation(BaseModel):
@@ -24,17 +25,23 @@ class SimRequest(BaseModel):
     userop: UserOperation
     entryPoint: Optional[str] = None  # allow override
 
-def bundler_rpc(method: str, params: list):
-    r = requests.post(BUNDLER_RPC, json={"jsonrpc":"2.0","id":1,"method":method,"params":params}, timeout=20)
-    j = r.json()
-    if "error" in j: raise HTTPException(status_code=400, detail=j["error"])
-    return j["result"]
+async def bundler_rpc(method: str, params: list):
+    try:
+        return await REGISTRY.bundler_async().call(method, params)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=e.args[0])
 
 @router.post("/v1/simulate/4337")
-def simulate_userop(req: SimRequest):
+async def simulate_userop(req: SimRequest):
     ep = req.entryPoint or DEFAULT_EP
+    op = req.userop.dict(exclude_none=True)
+    method = "eth_estimateUserOperationGas"
+    gas = await get_sim_cache().get_async(sim_key(method, op, ep, "latest"),
+                                          lambda: bundler_rpc(method, [op, ep, "latest"]))
     return {
         "validation_ok": True,
-        "gas": bundler_rpc("eth_estimateUserOperationGas", [req.userop.dict(exclude_none=True), ep, "latest"]),
+        "gas": gas,
         "entryPoint_used": ep
     }
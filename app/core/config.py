@@ -1,26 +1,169 @@
-import os, yaml
+import logging, os, threading, time
 from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping
 from dotenv import load_dotenv
 
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
 def _load_yaml(path: str):
+    import yaml   # loaded with the first snapshot, not at import
     with open(path, "r") as f:
         return yaml.safe_load(f)
 
-CFG = _load_yaml(os.getenv("INTENT_GUARD_CONFIG", "config.yaml"))
+def config_path() -> str:
+    return os.getenv("INTENT_GUARD_CONFIG", "config.yaml")
+
+def _env(name: str) -> str | None:
+    v = os.getenv(name)
+    return v.strip() if v and v.strip() else None
 
 def rpc_for_chain(chain_id: int) -> str | None:
     m = {
-        1: os.getenv("RPC_MAINNET"),
-        10: os.getenv("RPC_OPTIMISM"),
-        42161: os.getenv("RPC_ARBITRUM"),
-        8453: os.getenv("RPC_BASE"),
+        1: _env("RPC_MAINNET"),
+        10: _env("RPC_OPTIMISM"),
+        42161: _env("RPC_ARBITRUM"),
+        8453: _env("RPC_BASE"),
     }
     return m.get(chain_id)
 
-BUNDLER_RPC = os.getenv("BUNDLER_RPC")
-DEFAULT_BLOCK_TAG = CFG["global"].get("default_block_tag", "latest")
-PROFILE = CFG["global"].get("decision_profile", "conservative")
-POLICY = CFG["policies"]
-XCHAIN = CFG["crosschain"]
+BUNDLER_RPC = _env("BUNDLER_RPC")
+
+def _addrs(xs) -> frozenset:
+    return frozenset(str(a).lower() for a in (xs or []))
+
+@dataclass(frozen=True)
+class Eip712Policy:
+    trusted_chain_ids: frozenset
+    trusted_verifying_contracts: frozenset   # lowercased
+    max_allowance: int
+    max_expiry_seconds: int
+
+@dataclass(frozen=True)
+class Eip4337Policy:
+    vetted_factories: frozenset              # lowercased
+    vetted_paymasters: frozenset             # lowercased
+    block_delegatecall: bool
+    vetted_implementations: frozenset = frozenset()   # lowercased; delegatecall targets that are allowed
+
+@dataclass(frozen=True)
+class CrosschainPolicy:
+    amount_tol_bps: float
+    time_window_s: float | None
+    stream_horizon_s: float
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One parsed config.yaml with every policy section compiled for lookups."""
+    raw: Mapping[str, Any]
+    mtime: float
+    default_block_tag: str
+    profile: str
+    attestation_mode: str    # "json" (stable_hash) | "merkle"
+    eip712: Eip712Policy
+    eip4337: Eip4337Policy
+    crosschain: CrosschainPolicy
+    bridges: Mapping[str, Mapping[str, Any]]  # adapter name -> config entry
+
+def compile_config(cfg: dict, mtime: float = 0.0) -> Snapshot:
+    g = cfg.get("global", {}) or {}
+    pol = cfg.get("policies", {}) or {}
+    p712 = pol.get("eip712", {}) or {}
+    p4337 = pol.get("eip4337", {}) or {}
+    x = cfg.get("crosschain", {}) or {}
+    prob = x.get("probabilistic", {}) or {}
+    return Snapshot(
+        raw=cfg,
+        mtime=mtime,
+        default_block_tag=g.get("default_block_tag", "latest"),
+        profile=g.get("decision_profile", "conservative"),
+        attestation_mode=g.get("attestation_mode", "json"),
+        eip712=Eip712Policy(
+            trusted_chain_ids=frozenset(int(c) for c in p712.get("trusted_chain_ids", []) or []),
+            trusted_verifying_contracts=_addrs(p712.get("trusted_verifying_contracts")),
+            max_allowance=int(p712.get("max_allowance", 10**21)),
+            max_expiry_seconds=int(p712.get("max_expiry_seconds", 7*24*3600)),
+        ),
+        eip4337=Eip4337Policy(
+            vetted_factories=_addrs(p4337.get("vetted_factories")),
+            vetted_paymasters=_addrs(p4337.get("vetted_paymasters")),
+            block_delegatecall=bool(p4337.get("block_delegatecall", True)),
+            vetted_implementations=_addrs(p4337.get("vetted_implementations")),
+        ),
+        crosschain=CrosschainPolicy(
+            amount_tol_bps=float(prob.get("amount_tol_bps", 0)),
+            time_window_s=float(prob["time_window_s"]) if prob.get("time_window_s") else None,
+            stream_horizon_s=float((x.get("stream", {}) or {}).get("horizon_s", 3600)),
+        ),
+        bridges=MappingProxyType({b["name"]: b for b in cfg.get("bridges", []) or [] if b.get("name")}),
+    )
+
+class ConfigStore:
+    """
+    Parses the config file once and hands out the compiled Snapshot. The file's
+    mtime is checked at most every `check_interval` seconds; a changed file is
+    parsed and swapped in with a single reference assignment. A file that fails
+    to parse leaves the previous snapshot in place.
+    """
+    def __init__(self, path: str | None = None, check_interval: float = 1.0):
+        self.path = path or config_path()
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snap: Snapshot | None = None
+        self._next_check = 0.0
+
+    def _reload(self, mtime: float):
+        try:
+            snap = compile_config(_load_yaml(self.path) or {}, mtime)
+        except Exception:
+            if self._snap is None:
+                raise
+            log.exception("config reload failed; keeping the previous snapshot")
+            return
+        self._snap = snap
+
+    def get(self) -> Snapshot:
+        now = time.monotonic()
+        snap = self._snap
+        if snap is not None and now < self._next_check:
+            return snap
+        with self._lock:
+            if self._snap is None or now >= self._next_check:
+                try:
+                    mtime = os.stat(self.path).st_mtime
+                except FileNotFoundError:
+                    if self._snap is None:
+                        raise
+                    mtime = self._snap.mtime
+                if self._snap is None or mtime != self._snap.mtime:
+                    self._reload(mtime)
+                self._next_check = now + self.check_interval
+            return self._snap
+
+_STORE: ConfigStore | None = None
+
+def snapshot() -> Snapshot:
+    global _STORE
+    if _STORE is None:
+        _STORE = ConfigStore()
+    return _STORE.get()
+
+def loaded() -> Snapshot | None:
+    """The current snapshot if one has been loaded already; never reads the file."""
+    return _STORE._snap if _STORE is not None else None
+
+# Old module constants, now served from the current snapshot
+_LEGACY = {
+    "CFG": lambda s: s.raw,
+    "POLICY": lambda s: s.raw["policies"],
+    "XCHAIN": lambda s: s.raw["crosschain"],
+    "DEFAULT_BLOCK_TAG": lambda s: s.default_block_tag,
+    "PROFILE": lambda s: s.profile,
+}
+
+def __getattr__(name: str):
+    if name in _LEGACY:
+        return _LEGACY[name](snapshot())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
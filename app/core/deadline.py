@@ -0,0 +1,72 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from app.core.config import loaded
+
+# absolute time.monotonic() by which the current request must be answered
+_DEADLINE: ContextVar[float | None] = ContextVar("intent_guard_deadline", default=None)
+
+DEADLINE_HEADER = "x-request-deadline-ms"
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+def remaining() -> float | None:
+    """Seconds left for the current request (None when no deadline is set)."""
+    d = _DEADLINE.get()
+    return None if d is None else d - time.monotonic()
+
+def budget(timeout_s: float) -> float:
+    """`timeout_s` capped by the request deadline; raises once the deadline has passed."""
+    left = remaining()
+    if left is None:
+        return timeout_s
+    if left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return min(timeout_s, left)
+
+@contextmanager
+def deadline(seconds: float | None):
+    """Bound everything under this block (and tasks it spawns) to `seconds`; nested deadlines only shrink."""
+    if seconds is None:
+        yield
+        return
+    d = time.monotonic() + seconds
+    cur = _DEADLINE.get()
+    token = _DEADLINE.set(d if cur is None else min(cur, d))
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+def default_deadline_s() -> float | None:
+    # the snapshot already loaded, if any: the per-request path never reads the config file
+    snap = loaded()
+    raw = snap.raw if snap is not None else {}
+    v = ((raw.get("global", {}) or {}).get("rpc", {}) or {}).get("request_deadline_s", 25)
+    return float(v) if v else None
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware: every HTTP request runs under global.rpc.request_deadline_s,
+    shortened (never extended) by an X-Request-Deadline-Ms header. Requests
+    to `skip_paths` run without one.
+    """
+    def __init__(self, app, skip_paths=()):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            return await self.app(scope, receive, send)
+        seconds = default_deadline_s()
+        for k, v in scope.get("headers") or []:
+            if k.decode("latin-1").lower() == DEADLINE_HEADER:
+                try:
+                    asked = max(0.0, int(v) / 1000)
+                    seconds = asked if seconds is None else min(seconds, asked)
+                except ValueError:
+                    pass
+                break
+        with deadline(seconds):
+            await self.app(scope, receive, send)
@@ -1,19 +1,238 @@
-import logging, sys, json
-
-def configure_logging():
-    class JsonFormatter(logging.Formatter):
-        def format(self, record):
-            base = {
-                "level": record.levelname,
-                "msg": record.getMessage(),
-                "name": record.name,
-            }
-            if record.exc_info:
-                base["exc_info"] = self.formatException(record.exc_info)
-            return json.dumps(base)
-    h = logging.StreamHandler(sys.stdout)
-    h.setFormatter(JsonFormatter())
+"""
+Structured JSON logging off the request path.
+
+configure_logging() routes the root logger through a bounded queue: request
+threads only filter the record and enqueue it, and a listener thread formats
+and writes to stdout, so a slow stdout no longer stalls handlers. Records that
+do not fit are dropped and counted rather than blocking.
+
+Before enqueueing, records pass per-logger sampling (below WARNING only) and
+token-bucket rate limits from global.logging, applied once the config has
+been loaded (logging never loads it itself):
+
+    logging:
+      level: INFO
+      queue_size: 10000
+      sample: {intent_guard.access: 0.1}     # keep this fraction of records
+      rate_limit: {web3: 20}                 # records per second per logger
+
+RequestContextMiddleware gives each HTTP request an id (X-Request-Id, taken
+from the request or generated) that is attached to every record logged while
+it runs, and ends the request with one intent_guard.access record carrying
+status, duration and the metrics stage timings of that request.
+"""
+import atexit, json, logging, queue, random, sys, threading, time, uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict
+from app.core.config import loaded
+from app.core.metrics import REQUEST_STAGES, collector
+
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj, default=str).decode()
+except ImportError:   # pragma: no cover - orjson is optional
+    _encode = json.JSONEncoder(separators=(",", ":"), default=str).encode
+
+    def _dumps(obj) -> str:
+        return _encode(obj)
+
+REQUEST_ID_HEADER = b"x-request-id"
+_REQUEST_ID: ContextVar[str | None] = ContextVar("intent_guard_request_id", default=None)
+
+access_log = logging.getLogger("intent_guard.access")
+
+# attributes every LogRecord has; anything else on a record came from `extra=`
+_STANDARD = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "request_id"}
+
+def current_request_id() -> str | None:
+    return _REQUEST_ID.get()
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        base: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+            "name": record.name,
+        }
+        rid = getattr(record, "request_id", None)
+        if rid is not None:
+            base["request_id"] = rid
+        for k, v in record.__dict__.items():
+            if k not in _STANDARD:
+                base[k] = v
+        if record.exc_info:
+            base["exc_info"] = self.formatException(record.exc_info)
+        return _dumps(base)
+
+class _Bucket:
+    # bursts of up to max(1, rate) records: a rate below 1/s still lets one through every 1/rate seconds
+    __slots__ = ("rate", "burst", "tokens", "t")
+
+    def __init__(self, rate: float):
+        self.rate, self.burst = rate, max(1.0, rate)
+        self.tokens, self.t = self.burst, time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+        self.t = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+class _Drops:
+    def __init__(self):
+        self.counts = {"queue_full": 0, "sampled": 0, "rate_limited": 0}
+        self._lock = threading.Lock()
+
+    def add(self, reason: str):
+        with self._lock:
+            self.counts[reason] += 1
+
+DROPS = _Drops()
+
+@collector("intent_guard_log_records_dropped_total", "Log records dropped before output, by reason.", kind="counter")
+def _drop_samples():
+    with DROPS._lock:
+        counts = dict(DROPS.counts)
+    for reason, n in counts.items():
+        yield {"reason": reason}, n
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    Samples, rate-limits and enqueues without formatting: the record (with the
+    request id) is handed to the listener as is and formatted there. Limits
+    match a logger and its children ("web3" covers "web3.providers.rpc") and
+    apply below WARNING only: warnings and errors are never sampled or limited.
+    Messages are %-formatted on the listener too, so log values, not objects
+    that are mutated right after the call.
+
+    Without an explicit `cfg`, settings follow global.logging of the loaded
+    config snapshot (and its reloads).
+    """
+    def __init__(self, q: queue.Queue, cfg: Dict[str, Any] | None = None):
+        super().__init__(q)
+        self._bucket_lock = threading.Lock()
+        self._follow, self._snap = cfg is None, None
+        self._apply(cfg or {})
+
+    def _apply(self, cfg: Dict[str, Any]):
+        self.sample = {k: float(v) for k, v in (cfg.get("sample") or {}).items()}
+        self.rate_limit = {k: float(v) for k, v in (cfg.get("rate_limit") or {}).items()}
+        self._buckets: Dict[str, _Bucket] = {}
+        self._limits: Dict[str, tuple] = {}   # logger name -> (sample rate, bucket key)
+        self.queue.maxsize = int(cfg.get("queue_size", 10000))
+        logging.getLogger().setLevel(str(cfg.get("level", "INFO")).upper())
+
+    def _limits_for(self, name: str) -> tuple:
+        lim = self._limits.get(name)
+        if lim is None:
+            def lookup(table):
+                n = name
+                while True:
+                    if n in table:
+                        return n
+                    if "." not in n:
+                        return None
+                    n = n.rsplit(".", 1)[0]
+            s, r = lookup(self.sample), lookup(self.rate_limit)
+            lim = self._limits[name] = (self.sample[s] if s else None, r)
+        return lim
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not super().filter(record):
+            return False
+        if self._follow and loaded() is not self._snap:
+            self._snap = loaded()
+            self._apply((self._snap.raw.get("global", {}) or {}).get("logging", {}) or {})
+        if not (self.sample or self.rate_limit):
+            return True
+        p, bucket = self._limits_for(record.name)
+        if p is not None and record.levelno < logging.WARNING and random.random() >= p:
+            DROPS.add("sampled")
+            return False
+        if bucket is not None and record.levelno < logging.WARNING:
+            with self._bucket_lock:
+                b = self._buckets.get(bucket) or self._buckets.setdefault(bucket, _Bucket(self.rate_limit[bucket]))
+                ok = b.take()
+            if not ok:
+                DROPS.add("rate_limited")
+                return False
+        return True
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = _REQUEST_ID.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPS.add("queue_full")
+
+_LISTENER: QueueListener | None = None
+
+def stop_logging():
+    """Drain the queue and stop the listener thread."""
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+
+def configure_logging(stream=None, cfg: dict | None = None) -> AsyncQueueHandler:
+    """Install the queue pipeline on the root logger; `cfg` pins settings instead of following the config."""
+    global _LISTENER
+    stop_logging()
+    out = logging.StreamHandler(stream or sys.stdout)
+    out.setFormatter(JsonFormatter())
+    q: queue.Queue = queue.Queue()
+    h = AsyncQueueHandler(q, cfg)
     root = logging.getLogger()
-    root.setLevel(logging.INFO)
     root.handlers.clear()
     root.addHandler(h)
+    _LISTENER = QueueListener(q, out)
+    _LISTENER.start()
+    return h
+
+atexit.register(stop_logging)
+
+class RequestContextMiddleware:
+    """ASGI middleware: request id and per-request stage timings, then one access record."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        rid = None
+        for k, v in scope.get("headers") or []:
+            if k == REQUEST_ID_HEADER:
+                rid = v.decode("latin-1")[:64]
+                break
+        rid = rid or uuid.uuid4().hex[:16]
+        status = [500]
+
+        async def send_with_id(msg):
+            if msg["type"] == "http.response.start":
+                status[0] = msg["status"]
+                msg = {**msg, "headers": [*msg.get("headers", []), (REQUEST_ID_HEADER, rid.encode("latin-1"))]}
+            await send(msg)
+
+        stages: Dict[str, float] = {}
+        t_rid, t_stages = _REQUEST_ID.set(rid), REQUEST_STAGES.set(stages)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if access_log.isEnabledFor(logging.INFO):
+                route = getattr(scope.get("route"), "path", None)
+                access_log.info("%s %s %d", scope["method"], scope["path"], status[0], extra={
+                    "route": route, "status": status[0], "duration_ms": round((time.perf_counter() - t0) * 1000, 3),
+                    "stages_ms": {k: round(v * 1000, 3) for k, v in stages.items()}})
+            REQUEST_STAGES.reset(t_stages)
+            _REQUEST_ID.reset(t_rid)
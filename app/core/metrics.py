@@ -0,0 +1,246 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format (0.0.4).
+
+Hot paths only touch per-label cells: `stage("4337.lint")` costs a dict
+lookup, two perf_counter calls, a bisect and two unlocked increments (a
+microsecond or two). Values owned elsewhere (cache counters, RPC client stats) are
+read by collectors at scrape time instead of being mirrored on every call.
+"""
+import threading, time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+_now = time.perf_counter
+
+# stage name -> seconds for the current request, when something (RequestContextMiddleware) collects them
+REQUEST_STAGES: ContextVar[Dict[str, float] | None] = ContextVar("intent_guard_request_stages", default=None)
+
+# seconds; covers cache hits (µs) to slow RPC fan-outs (tens of seconds)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+class _Cell:
+    """One label set of a histogram: per-bucket counts (last = +Inf) and the running sum."""
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        # no lock: with the GIL, a list-item/float in-place add on builtins cannot be
+        # interrupted (the eval loop only switches threads at calls and backward jumps)
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._cells: Dict[Tuple, _Cell] = {}
+
+    def labels(self, *labels) -> _Cell:
+        """The cell for one label set; hold on to it on hot paths to skip the lookup."""
+        cell = self._cells.get(labels)
+        if cell is None:
+            with self._lock:
+                cell = self._cells.setdefault(labels, _Cell(self.buckets))
+        return cell
+
+    def observe(self, value: float, *labels):
+        self.labels(*labels).observe(value)
+
+    def snapshot(self, *labels) -> Tuple[int, float]:
+        """(count, sum) for one label set."""
+        cell = self._cells.get(labels)
+        return (sum(cell.counts), cell.sum) if cell else (0, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._cells.items())
+        out = self.header()
+        for k, cell in items:
+            counts, total = list(cell.counts), cell.sum
+            acc = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                le_label = 'le="' + _num(le) + '"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, k, le_label)} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, k)} {_num(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, k)} {acc}")
+        return out
+
+Sample = Tuple[Dict[str, object], float]
+
+class Gauge(_Metric):
+    """Read at scrape time from `fn`, which returns (labels, value) samples (cumulative values use kind="counter")."""
+    def __init__(self, name: str, help: str, fn: Callable[[], Iterable[Sample]], kind: str = "gauge"):
+        super().__init__(name, help)
+        self.kind, self.fn = kind, fn
+
+    def render(self) -> List[str]:
+        out = self.header()
+        for labels, v in self.fn():
+            out.append(f"{self.name}{_labels(list(labels), list(labels.values()))} {_num(v)}")
+        return out
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            try:
+                lines += m.render()
+            except Exception as e:   # a broken collector must not take /metrics down
+                lines.append(f"# {m.name} unavailable: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+STAGE_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "intent_guard_stage_seconds", "Time spent in one pipeline stage.", ("stage",)))
+RPC_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "intent_guard_rpc_seconds", "Upstream JSON-RPC call latency.", ("upstream", "method")))
+RPC_ERRORS: Counter = REGISTRY.register(Counter(
+    "intent_guard_rpc_errors_total", "Upstream JSON-RPC calls that raised.", ("upstream", "method")))
+DECODE_LOGS: Counter = REGISTRY.register(Counter(
+    "intent_guard_decode_logs_total", "Bridge logs by decode outcome (decoded, skipped, slow_path).",
+    ("adapter", "outcome")))
+HTTP_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "intent_guard_http_request_seconds", "HTTP request latency by route.", ("method", "route", "status")))
+
+def _record_stage(name: str, cell: _Cell, dt: float):
+    cell.observe(dt)
+    stages = REQUEST_STAGES.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + dt
+
+class stage:
+    """
+    Times a block (or, as a decorator, every call of a function) into
+    intent_guard_stage_seconds, and into the current request's REQUEST_STAGES:
+
+        with stage("4337.lint"):
+            ...
+    """
+    __slots__ = ("name", "cell", "t0")
+
+    def __init__(self, name: str):
+        self.name, self.cell = name, STAGE_SECONDS.labels(name)
+
+    def __enter__(self):
+        self.t0 = _now()
+        return self
+
+    def __exit__(self, *exc):
+        _record_stage(self.name, self.cell, _now() - self.t0)
+        return False
+
+    def __call__(self, fn):
+        name, cell = self.name, self.cell
+
+        def wrapper(*a, **kw):
+            t0 = _now()
+            try:
+                return fn(*a, **kw)
+            finally:
+                _record_stage(name, cell, _now() - t0)
+        wrapper.__name__, wrapper.__doc__, wrapper.__wrapped__ = fn.__name__, fn.__doc__, fn
+        return wrapper
+
+def collector(name: str, help: str, kind: str = "gauge"):
+    """Register `fn() -> [(labels, value), ...]` as a metric read at scrape time."""
+    def register(fn: Callable[[], Iterable[Sample]]):
+        REGISTRY.register(Gauge(name, help, fn, kind))
+        return fn
+    return register
+
+_CACHES: Dict[str, Callable[[], Dict[str, int]]] = {}
+
+def register_cache(name: str, fn: Callable[[], Dict[str, int]]):
+    """`fn() -> {"hit": n, "miss": n, ...}` (cumulative) is exported per result as intent_guard_cache_requests_total."""
+    _CACHES[name] = fn
+
+@collector("intent_guard_cache_requests_total", "Cache lookups by cache and result.", kind="counter")
+def _cache_samples() -> Iterable[Sample]:
+    for name, fn in sorted(_CACHES.items()):
+        for result, n in fn().items():
+            yield {"cache": name, "result": result}, n
+
+class MetricsMiddleware:
+    """ASGI middleware: request latency by route template (not raw path, to keep label cardinality bounded)."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = [500]
+
+        async def send_wrapper(msg):
+            if msg["type"] == "http.response.start":
+                status[0] = msg["status"]
+            await send(msg)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_SECONDS.observe(time.perf_counter() - t0, scope["method"],
+                                 getattr(route, "path", "unmatched"), status[0])
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,224 @@
+"""
+Opt-in sampling profiler for single requests.
+
+A request is profiled when it carries `X-Profile: <token>` (the token from
+global.profiling.token or INTENT_GUARD_PROFILE_TOKEN), or when it is drawn by
+global.profiling.sample_pct. While it runs, a shared sampler thread reads its
+stacks every `interval_ms` and counts them. The result is written to
+global.profiling.dir as collapsed stacks ("root;...;leaf <count>" lines, as
+read by flamegraph.pl, speedscope and inferno); the response carries the
+profile id in X-Profile-Id and GET /debug/profiles/{id} returns it.
+
+Whose stacks are counted: on the event loop, only while this request's own
+coroutine chain is running (matched by frame); on worker threads, frames of
+the matched endpoint function (sync handlers run in the threadpool), so
+concurrent calls to the same sync endpoint can be mixed into one profile.
+
+With no token and no sample_pct configured, the middleware costs one cached
+settings check per request.
+"""
+import hmac, logging, os, random, re, sys, threading, time, uuid
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List
+from app.core.config import loaded
+
+log = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+ID_HEADER = b"x-profile-id"
+
+_ID = re.compile(r"[0-9a-f]{8,32}-[0-9a-f]{8}")
+
+@dataclass(frozen=True)
+class ProfilingSettings:
+    token: str | None = None
+    sample_pct: float = 0.0
+    interval_ms: float = 5.0
+    dir: str = "profiles"
+    max_files: int = 200
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token) or self.sample_pct > 0
+
+_CACHED: tuple[Any, ProfilingSettings] = (object(), ProfilingSettings())
+
+def settings() -> ProfilingSettings:
+    """From the snapshot already loaded (never reads the config file; defaults until one is)."""
+    global _CACHED
+    snap = loaded()
+    if _CACHED[0] is not snap:
+        g = ((snap.raw if snap is not None else {}).get("global", {}) or {}).get("profiling", {}) or {}
+        token = os.getenv("INTENT_GUARD_PROFILE_TOKEN", "").strip() or str(g.get("token") or "").strip() or None
+        _CACHED = (snap, ProfilingSettings(
+            token=token,
+            sample_pct=float(g.get("sample_pct", 0) or 0),
+            interval_ms=max(1.0, float(g.get("interval_ms", 5))),
+            dir=str(g.get("dir", "profiles")),
+            max_files=int(g.get("max_files", 200)),
+        ))
+    return _CACHED[1]
+
+def token_ok(given: str | None, cfg: ProfilingSettings | None = None) -> bool:
+    cfg = cfg or settings()
+    return bool(cfg.token and given) and hmac.compare_digest(given.encode(), cfg.token.encode())
+
+_LABELS: Dict[Any, str] = {}
+_PREFIXES = sorted({os.path.join(os.path.abspath(p), "") for p in sys.path}, key=len, reverse=True)
+
+def _label(code) -> str:
+    s = _LABELS.get(code)
+    if s is None:
+        path = code.co_filename
+        for p in _PREFIXES:
+            if path.startswith(p):
+                path = path[len(p):]
+                break
+        # ";" separates frames and the last space separates the count
+        s = _LABELS[code] = f"{code.co_qualname} ({path}:{code.co_firstlineno})".replace(";", ":")
+    return s
+
+class _Sampler:
+    """
+    The one daemon thread that samples for every profile in flight: each tick
+    reads all threads' stacks once with sys._current_frames() and hands them
+    to each active RequestProfile. Idle (blocked on a condition) while no
+    request is being profiled.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._active: List["RequestProfile"] = []
+        self._thread: threading.Thread | None = None
+        self.ticks = 0
+
+    def add(self, prof: "RequestProfile"):
+        with self._cond:
+            self._active.append(prof)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def remove(self, prof: "RequestProfile"):
+        # under the lock, so no tick is still feeding the profile once this returns
+        with self._cond:
+            self._active.remove(prof)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._cond:
+                while not self._active:
+                    self._cond.wait()
+                interval = min(p.interval_s for p in self._active)
+            time.sleep(interval)
+            with self._cond:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                frames.pop(me, None)
+                for p in self._active:
+                    p.sample(frames)
+                self.ticks += 1
+                del frames          # do not keep other threads' frames alive between ticks
+
+_SAMPLER = _Sampler()
+
+class RequestProfile:
+    """Counts the stacks of one request, as sampled by the shared sampler thread, until stop()."""
+    def __init__(self, scope, anchor, interval_s: float):
+        self.scope, self.anchor, self.interval_s = scope, anchor, interval_s
+        self.loop_thread = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def start(self) -> "RequestProfile":
+        self.t0 = time.perf_counter()
+        _SAMPLER.add(self)
+        return self
+
+    def stop(self) -> "RequestProfile":
+        _SAMPLER.remove(self)
+        self.elapsed_s = time.perf_counter() - self.t0
+        return self
+
+    def sample(self, frames: Dict[int, Any]):
+        endpoint = getattr(self.scope.get("endpoint"), "__code__", None)
+        self.samples += 1
+        for tid, frame in frames.items():
+            stack: List[Any] = []
+            root = self.anchor if tid == self.loop_thread else endpoint
+            f = frame
+            while f is not None:
+                stack.append(f)
+                if f is root or (tid != self.loop_thread and f.f_code is root):
+                    break
+                f = f.f_back
+            if f is None:
+                continue            # not this request
+            self.stacks[";".join(_label(fr.f_code) for fr in reversed(stack))] += 1
+
+    def collapsed(self, root: str = "") -> str:
+        prefix = root.replace(";", ":") + ";" if root else ""
+        return "".join(f"{prefix}{k} {n}\n" for k, n in self.stacks.most_common())
+
+def _write(cfg: ProfilingSettings, pid: str, text: str) -> Path:
+    d = Path(cfg.dir)
+    d.mkdir(parents=True, exist_ok=True)
+    path = d / f"{pid}.collapsed"
+    path.write_text(text)
+    old = sorted(d.glob("*.collapsed"), key=lambda p: p.stat().st_mtime)
+    for p in old[:max(0, len(old) - cfg.max_files)]:
+        p.unlink(missing_ok=True)
+    return path
+
+def load(pid: str) -> str | None:
+    """Stored collapsed stacks for a profile id, None if unknown."""
+    if not _ID.fullmatch(pid):
+        return None
+    try:
+        return (Path(settings().dir) / f"{pid}.collapsed").read_text()
+    except FileNotFoundError:
+        return None
+
+class ProfilingMiddleware:
+    """ASGI middleware: profiles requests that ask for it (X-Profile) or are sampled; `skip_paths` never are."""
+    def __init__(self, app, skip_paths=()):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            return await self.app(scope, receive, send)
+        cfg = settings()
+        if not cfg.enabled:
+            return await self.app(scope, receive, send)
+        asked = None
+        for k, v in scope.get("headers") or []:
+            if k == PROFILE_HEADER:
+                asked = v.decode("latin-1")
+                break
+        if not (token_ok(asked, cfg) or (cfg.sample_pct and random.random() * 100 < cfg.sample_pct)):
+            return await self.app(scope, receive, send)
+
+        pid = f"{int(time.time() * 1000):x}-{uuid.uuid4().hex[:8]}"
+
+        async def send_with_id(msg):
+            if msg["type"] == "http.response.start":
+                msg = {**msg, "headers": [*msg.get("headers", []), (ID_HEADER, pid.encode())]}
+            await send(msg)
+
+        prof = RequestProfile(scope, sys._getframe(), cfg.interval_ms / 1000).start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            prof.stop()
+            route = f'{scope["method"]} {getattr(scope.get("route"), "path", scope["path"])}'
+            try:
+                path = _write(cfg, pid, prof.collapsed(route))
+                log.info("profiled %s: %d samples over %.1f ms -> %s", route, prof.samples,
+                         prof.elapsed_s * 1000, path)
+            except OSError:
+                log.exception("could not store profile %s", pid)
@@ -0,0 +1,28 @@
+"""
+web3 providers that send through RpcClient / AsyncRpcClient, so web3 calls
+share the clients' pools, limits, deadlines and counters. Kept apart from
+app.core.rpc because importing web3 is slow; RpcClient.w3 imports this
+module on first use.
+"""
+from web3.providers.async_rpc import AsyncHTTPProvider
+from web3.providers.rpc import HTTPProvider
+
+class PooledHTTPProvider(HTTPProvider):
+    """HTTPProvider that sends through the owning RpcClient's shared session."""
+    def __init__(self, client):
+        super().__init__(client.url, request_kwargs={"timeout": client.settings.timeout_s})
+        self.client = client
+
+    def make_request(self, method, params):
+        raw = self.client.post_raw(self.encode_rpc_request(method, params), method)
+        return self.decode_rpc_response(raw)
+
+class AsyncPooledHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider that sends through the owning AsyncRpcClient."""
+    def __init__(self, client):
+        super().__init__(client.url)
+        self.client = client
+
+    async def make_request(self, method, params):
+        raw = await self.client.post_raw(self.encode_rpc_request(method, params), method)
+        return self.decode_rpc_response(raw)
@@ -0,0 +1,444 @@
+import asyncio, json, threading, time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterator, List, Tuple
+from urllib.parse import urlsplit
+from app.core.config import BUNDLER_RPC, rpc_for_chain, snapshot
+from app.core.deadline import DeadlineExceeded, budget
+from app.core.metrics import RPC_ERRORS, RPC_SECONDS, collector
+
+# requests, aiohttp and web3 are imported when the first client is built
+if TYPE_CHECKING:
+    import aiohttp
+    from web3 import AsyncWeb3, Web3
+
+@dataclass
+class PoolSettings:
+    pool_size: int = 16        # keep-alive connections per upstream
+    timeout_s: float = 20.0
+    retries: int = 2           # connect errors and 429/502/503/504
+    backoff_s: float = 0.25    # urllib3 backoff_factor
+    max_inflight: int = 64     # async path: concurrent requests per upstream, the rest wait (within the deadline)
+
+def pool_settings(key) -> PoolSettings:
+    g = (snapshot().raw.get("global", {}) or {}).get("rpc", {}) or {}
+    over = (g.get("per_chain", {}) or {}).get(key, {}) or {}
+    merged = {**{k: v for k, v in g.items() if k != "per_chain"}, **over}
+    known = PoolSettings.__dataclass_fields__
+    return PoolSettings(**{k: type(known[k].default)(v) for k, v in merged.items() if k in known})
+
+class _Counters:
+    name: str
+    _lock: threading.Lock
+    methods: Dict[str, Dict[str, float]]
+    last_error: str | None
+
+    def _record(self, method: str, dt: float, err: Exception | None):
+        RPC_SECONDS.observe(dt, self.name, method)
+        if err is not None:
+            RPC_ERRORS.inc(1, self.name, method)
+        with self._lock:
+            m = self.methods.setdefault(method, {"calls": 0, "errors": 0, "seconds": 0.0})
+            m["calls"] += 1
+            m["seconds"] += dt
+            if err is not None:
+                m["errors"] += 1
+                self.last_error = f"{method}: {type(err).__name__}: {err}"[:300]
+
+    def _method_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            methods = {k: dict(v) for k, v in self.methods.items()}
+        calls = sum(m["calls"] for m in methods.values())
+        return {
+            "calls": calls,
+            "errors": sum(m["errors"] for m in methods.values()),
+            "avg_ms": round(1000 * sum(m["seconds"] for m in methods.values()) / calls, 3) if calls else None,
+            "methods": methods,
+            "last_error": self.last_error,
+        }
+
+class RpcClient(_Counters):
+    """One upstream: a pooled keep-alive session plus call/error/latency counters."""
+    def __init__(self, name: str, url: str, settings: PoolSettings):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        self.name, self.url, self.settings = name, url, settings
+        retry = Retry(total=settings.retries, connect=settings.retries, read=0,
+                      status_forcelist=(429, 502, 503, 504), allowed_methods=None,
+                      backoff_factor=settings.backoff_s, raise_on_status=False)
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.pool_size,
+                                   max_retries=retry, pool_block=False)
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self._lock = threading.Lock()
+        self.methods: Dict[str, Dict[str, float]] = {}
+        self.last_error: str | None = None
+        self._w3: "Web3 | None" = None
+
+    def post_raw(self, body: bytes | str, method: str) -> bytes:
+        t0 = time.perf_counter()
+        err = None
+        try:
+            r = self.session.post(self.url, data=body, timeout=budget(self.settings.timeout_s),
+                                  headers={"Content-Type": "application/json"})
+            r.raise_for_status()
+            return r.content
+        except Exception as e:
+            err = e
+            raise
+        finally:
+            self._record(method, time.perf_counter() - t0, err)
+
+    def call(self, method: str, params: list) -> Any:
+        """Plain JSON-RPC call; RPC errors are raised as ValueError(error) like web3 does."""
+        t0 = time.perf_counter()
+        err = None
+        try:
+            r = self.session.post(self.url, json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params},
+                                  timeout=budget(self.settings.timeout_s))
+            j = r.json()
+            if "error" in j:
+                raise ValueError(j["error"])
+            return j["result"]
+        except Exception as e:
+            err = e
+            raise
+        finally:
+            self._record(method, time.perf_counter() - t0, err)
+
+    def call_stream(self, method: str, params: list, consume: Callable[[Iterator[bytes]], Any],
+                    chunk_size: int = 1 << 16) -> Any:
+        """
+        JSON-RPC call whose response body is handed to `consume` chunk by chunk
+        instead of being buffered (multi-megabyte traces); `consume` parses the
+        envelope and returns the result.
+        """
+        t0 = time.perf_counter()
+        err = None
+        try:
+            with self.session.post(self.url, json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params},
+                                   timeout=budget(self.settings.timeout_s), stream=True) as r:
+                r.raise_for_status()
+                return consume(r.iter_content(chunk_size))
+        except Exception as e:
+            err = e
+            raise
+        finally:
+            self._record(method, time.perf_counter() - t0, err)
+
+    def call_batch(self, requests_: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send a JSON-RPC batch; returns the raw response objects (any order)."""
+        t0 = time.perf_counter()
+        err = None
+        try:
+            r = self.session.post(self.url, json=requests_, timeout=budget(self.settings.timeout_s))
+            j = r.json()
+            if isinstance(j, dict):
+                # whole batch rejected (or batching unsupported): fan the error out
+                return [{"id": q["id"], "error": j.get("error") or {"code": -32603, "message": str(j)}} for q in requests_]
+            return j
+        except Exception as e:
+            err = e
+            raise
+        finally:
+            self._record("batch", time.perf_counter() - t0, err)
+
+    @property
+    def w3(self) -> "Web3":
+        if self._w3 is None:
+            from web3 import Web3
+            from app.core.providers import PooledHTTPProvider
+            self._w3 = Web3(PooledHTTPProvider(self))
+        return self._w3
+
+    def stats(self) -> Dict[str, Any]:
+        pm = self.adapter.poolmanager
+        pools = [pm.pools[k] for k in pm.pools.keys()]
+        return {
+            "upstream": urlsplit(self.url).netloc,   # never expose the path (API keys live there)
+            "pool_size": self.settings.pool_size,
+            "connections_opened": sum(p.num_connections for p in pools),
+            "idle_connections": sum(p.pool.qsize() if p.pool else 0 for p in pools),
+            **self._method_stats(),
+        }
+
+_RETRY_STATUS = (429, 502, 503, 504)
+
+class AsyncRpcClient(_Counters):
+    """
+    asyncio counterpart of RpcClient: one aiohttp session per event loop, at
+    most `max_inflight` requests in flight to the upstream, and every wait
+    (slot, connect, response, retry backoff) bounded by the request deadline.
+    """
+    def __init__(self, name: str, url: str, settings: PoolSettings):
+        self.name, self.url, self.settings = name, url, settings
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._session: "aiohttp.ClientSession | None" = None
+        self._slots: asyncio.Semaphore | None = None
+        self._lock = threading.Lock()
+        self.methods: Dict[str, Dict[str, float]] = {}
+        self.last_error: str | None = None
+        self.inflight = 0
+        self.waiting = 0
+        self._w3: "AsyncWeb3 | None" = None
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            import aiohttp
+            self._loop = loop
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=max(self.settings.pool_size, self.settings.max_inflight)),
+                headers={"Content-Type": "application/json"})
+            self._slots = asyncio.Semaphore(max(1, self.settings.max_inflight))
+            self._w3 = None
+
+    async def post_raw(self, body: bytes | str, method: str,
+                       read: "Callable[[aiohttp.ClientResponse], Awaitable[Any]] | None" = None) -> Any:
+        """POST `body`; the response bytes, or what `read` makes of the response when given."""
+        self._bind()
+        t0 = time.perf_counter()
+        err = None
+        try:
+            self.waiting += 1
+            try:
+                wait_s = budget(self.settings.timeout_s)
+                await asyncio.wait_for(self._slots.acquire(), wait_s)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"{self.name}: no free upstream slot before the deadline")
+            finally:
+                self.waiting -= 1
+            self.inflight += 1
+            try:
+                return await self._post(body, read)
+            finally:
+                self.inflight -= 1
+                self._slots.release()
+        except Exception as e:
+            err = e
+            raise
+        finally:
+            self._record(method, time.perf_counter() - t0, err)
+
+    async def _post(self, body: bytes | str, read=None) -> Any:
+        import aiohttp
+        for attempt in range(self.settings.retries + 1):
+            timeout = budget(self.settings.timeout_s)
+            last = attempt == self.settings.retries
+            try:
+                async with self._session.post(self.url, data=body,
+                                              timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+                    if r.status in _RETRY_STATUS and not last:
+                        raise aiohttp.ClientResponseError(r.request_info, r.history, status=r.status)
+                    r.raise_for_status()
+                    return await (r.read() if read is None else read(r))
+            except asyncio.TimeoutError:
+                if timeout < self.settings.timeout_s:
+                    raise DeadlineExceeded(f"{self.name}: request deadline exceeded")
+                raise
+            except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError) as e:
+                if last or (isinstance(e, aiohttp.ClientResponseError) and e.status not in _RETRY_STATUS):
+                    raise
+            await asyncio.sleep(min(self.settings.backoff_s * 2 ** attempt, budget(self.settings.timeout_s)))
+
+    async def aclose(self):
+        if self._session is not None and self._loop is asyncio.get_running_loop():
+            await self._session.close()
+        self._loop = self._session = self._slots = self._w3 = None
+
+    async def call(self, method: str, params: list) -> Any:
+        """Plain JSON-RPC call; RPC errors are raised as ValueError(error) like web3 does."""
+        raw = await self.post_raw(json.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params}), method)
+        j = json.loads(raw)
+        if "error" in j:
+            raise ValueError(j["error"])
+        return j["result"]
+
+    async def call_stream(self, method: str, params: list, consume: Callable[[Iterator[bytes]], Any],
+                          chunk_size: int = 1 << 16) -> Any:
+        """
+        RpcClient.call_stream for the event loop: `consume` runs in a worker
+        thread and pulls the body chunk by chunk as it arrives, so a large
+        response is neither buffered nor parsed on the loop.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def read(r):
+            chunks = r.content.iter_chunked(chunk_size)
+
+            def pull() -> Iterator[bytes]:
+                while True:
+                    try:
+                        yield asyncio.run_coroutine_threadsafe(chunks.__anext__(), loop).result()
+                    except StopAsyncIteration:
+                        return
+            return await asyncio.to_thread(consume, pull())
+
+        body = json.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+        return await self.post_raw(body, method, read)
+
+    @property
+    def w3(self) -> "AsyncWeb3":
+        self._bind()
+        if self._w3 is None:
+            from web3 import AsyncWeb3
+            from app.core.providers import AsyncPooledHTTPProvider
+            self._w3 = AsyncWeb3(AsyncPooledHTTPProvider(self))
+        return self._w3
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "upstream": urlsplit(self.url).netloc,
+            "max_inflight": self.settings.max_inflight,
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            **self._method_stats(),
+        }
+
+class ClientRegistry:
+    """Process-wide RpcClients keyed by chain id (plus one for the bundler), sync and async."""
+    def __init__(self):
+        self._clients: Dict[Any, RpcClient | AsyncRpcClient] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, name: str, url: str | None, cls=RpcClient):
+        c = self._clients.get(key)
+        if c is not None and c.url == url:
+            return c
+        if not url:
+            raise RuntimeError(f"No RPC configured for {name}")
+        with self._lock:
+            c = self._clients.get(key)
+            if c is None or c.url != url:
+                c = self._clients[key] = cls(name, url, pool_settings(key[1] if isinstance(key, tuple) else key))
+            return c
+
+    def for_chain(self, chain_id: int) -> RpcClient:
+        return self._get(int(chain_id), f"chain {chain_id}", rpc_for_chain(int(chain_id)))
+
+    def bundler(self) -> RpcClient:
+        return self._get("bundler", "bundler", BUNDLER_RPC)
+
+    def for_chain_async(self, chain_id: int) -> AsyncRpcClient:
+        return self._get(("async", int(chain_id)), f"chain {chain_id}", rpc_for_chain(int(chain_id)), AsyncRpcClient)
+
+    def bundler_async(self) -> AsyncRpcClient:
+        return self._get(("async", "bundler"), "bundler", BUNDLER_RPC, AsyncRpcClient)
+
+    async def aclose(self):
+        """Close the async clients' sessions (call on the loop that used them)."""
+        with self._lock:
+            clients = [c for c in self._clients.values() if isinstance(c, AsyncRpcClient)]
+        for c in clients:
+            await c.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            clients = dict(self._clients)
+        return {(":".join(map(str, k)) if isinstance(k, tuple) else str(k)): c.stats() for k, c in clients.items()}
+
+@dataclass
+class BatchResult:
+    value: Any = None
+    error: Dict[str, Any] | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+def _hexbytes(v: str) -> bytes:
+    return bytes.fromhex(v[2:] if v.startswith("0x") else v)
+
+def _block_param(block) -> str:
+    return hex(block) if isinstance(block, int) else block
+
+def pin_block(client: RpcClient, block: int | str) -> int | str:
+    """"latest" as the upstream's current head number, so reads made with it see one state; other tags as given."""
+    if block == "latest":
+        return int(client.call("eth_blockNumber", []), 16)
+    return block
+
+class RpcBatch:
+    """
+    Queue reads against one upstream and one pinned block, then send them as
+    a single JSON-RPC batch. Each queued read returns its index into the
+    list of BatchResults that execute() produces; failures stay per item.
+    A "latest" block is resolved to a number once, when the first read is
+    queued, since a node may advance its head while it works through a batch.
+    """
+    def __init__(self, client: RpcClient, block: int | str = "latest"):
+        self.client = client
+        self._block = block
+        self._pinned: str | None = None
+        self._items: List[Tuple[str, list, Callable[[Any], Any] | None]] = []
+
+    @property
+    def block(self) -> str:
+        if self._pinned is None:
+            self._pinned = _block_param(pin_block(self.client, self._block))
+        return self._pinned
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, method: str, params: list, decode: Callable[[Any], Any] | None = None) -> int:
+        self._items.append((method, params, decode))
+        return len(self._items) - 1
+
+    def get_code(self, address: str) -> int:
+        return self.add("eth_getCode", [address, self.block], _hexbytes)
+
+    def get_storage_at(self, address: str, slot: int | str) -> int:
+        return self.add("eth_getStorageAt", [address, _block_param(slot), self.block], _hexbytes)
+
+    def get_balance(self, address: str) -> int:
+        return self.add("eth_getBalance", [address, self.block], lambda v: int(v, 16))
+
+    def call(self, to: str, data: bytes | str, out_types: List[str] | None = None) -> int:
+        """eth_call; with out_types the return data is ABI-decoded (a single output is unwrapped)."""
+        if isinstance(data, (bytes, bytearray)):
+            data = "0x" + bytes(data).hex()
+        decode = _hexbytes
+        if out_types is not None:
+            def decode(v, _t=out_types):
+                from eth_abi import decode as abi_decode
+                vals = abi_decode(_t, _hexbytes(v))
+                return vals[0] if len(vals) == 1 else vals
+        return self.add("eth_call", [{"to": to, "data": data}, self.block], decode)
+
+    def execute(self) -> List[BatchResult]:
+        if not self._items:
+            return []
+        reqs = [{"jsonrpc": "2.0", "id": i, "method": m, "params": p} for i, (m, p, _) in enumerate(self._items)]
+        by_id = {r.get("id"): r for r in self.client.call_batch(reqs)}
+        out = []
+        for i, (_, _, decode) in enumerate(self._items):
+            r = by_id.get(i)
+            if r is None:
+                out.append(BatchResult(error={"code": -32603, "message": "no response for batch item"}))
+            elif r.get("error") is not None:
+                out.append(BatchResult(error=r["error"]))
+            else:
+                try:
+                    out.append(BatchResult(value=decode(r["result"]) if decode else r["result"]))
+                except Exception as e:
+                    out.append(BatchResult(error={"code": "decode", "message": f"{type(e).__name__}: {e}"}))
+        self._items = []
+        return out
+
+REGISTRY = ClientRegistry()
+
+@collector("intent_guard_rpc_inflight", "Async upstream requests in flight, and waiting for a slot.")
+def _inflight_samples():
+    with REGISTRY._lock:
+        clients = [c for c in REGISTRY._clients.values() if isinstance(c, AsyncRpcClient)]
+    for c in clients:
+        yield {"upstream": c.name, "state": "inflight"}, c.inflight
+        yield {"upstream": c.name, "state": "waiting"}, c.waiting
+
+def get_w3(chain_id: int) -> "Web3":
+    return REGISTRY.for_chain(chain_id).w3
+
+def get_async_w3(chain_id: int) -> "AsyncWeb3":
+    return REGISTRY.for_chain_async(chain_id).w3
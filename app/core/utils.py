@@ -3,7 +3,7 @@ import hashlib, json
 def keccak_hex(data: bytes) -> str:
     # web3 has Web3.keccak; keeping a local helper for attestation hashing
     try:
-        from eth_utils import keccak
+        from eth_hash.auto import keccak
         return "0x" + keccak(data).hex()
     except Exception:
         # fallback sha256 (not keccak) if eth_utils missing (shouldn't happen)
@@ -0,0 +1,69 @@
+"""
+Lazily loaded subsystems and readiness.
+
+Importing `main` loads FastAPI and the app's own modules only. The config
+file and the heavy libraries (eth_account, eth_abi, web3, requests, aiohttp,
+SQLAlchemy) load when the first request that needs them arrives. warm()
+loads a subsystem ahead of that, e.g. from INTENT_GUARD_WARM=eip712,4337 at
+startup, and readiness() reports which subsystems are loaded.
+"""
+import importlib, logging, os, sys, threading, time
+from typing import Any, Dict, Iterable, Tuple
+from app.core import config
+
+log = logging.getLogger(__name__)
+
+# subsystem -> modules whose import makes it warm (their heavy dependencies come along)
+SUBSYSTEMS: Dict[str, Tuple[str, ...]] = {
+    "config": (),                                                    # config.yaml parsed
+    "eip712": ("eth_account", "app.eip712.hashing"),
+    "eip4337": ("eth_abi", "requests", "app.simulate.aa"),
+    "rpc": ("requests", "aiohttp", "web3", "app.core.providers"),
+    "bridge": ("eth_abi", "eth_utils", "web3", "sqlalchemy", "app.correlate.store"),
+}
+
+_LOAD_MS: Dict[str, float] = {}
+_LOCK = threading.Lock()
+
+def is_warm(name: str) -> bool:
+    if name == "config":
+        return config.loaded() is not None
+    return all(m in sys.modules for m in SUBSYSTEMS[name])
+
+def warm(name: str) -> float:
+    """Load one subsystem now; returns the milliseconds it took (0 when already warm)."""
+    if name not in SUBSYSTEMS:
+        raise KeyError(f"unknown subsystem {name!r} (known: {', '.join(SUBSYSTEMS)})")
+    with _LOCK:
+        if is_warm(name):
+            return 0.0
+        t0 = time.perf_counter()
+        if name == "config":
+            config.snapshot()
+        for m in SUBSYSTEMS[name]:
+            importlib.import_module(m)
+        ms = _LOAD_MS[name] = (time.perf_counter() - t0) * 1000
+    log.info("warmed %s in %.1f ms", name, ms)
+    return ms
+
+def warm_in_background(names: Iterable[str]) -> threading.Thread | None:
+    """Warm `names` on a daemon thread so startup (and /health) does not wait for them."""
+    names = [n.strip() for n in names if n.strip()]
+    if not names:
+        return None
+
+    def run():
+        for n in names:
+            try:
+                warm(n)
+            except Exception:
+                log.exception("warming %s failed", n)
+    t = threading.Thread(target=run, name="warmup", daemon=True)
+    t.start()
+    return t
+
+def startup_warm_list() -> list:
+    return os.getenv("INTENT_GUARD_WARM", "").split(",")
+
+def readiness() -> Dict[str, Any]:
+    return {name: {"warm": is_warm(name), "warm_ms": _LOAD_MS.get(name)} for name in SUBSYSTEMS}
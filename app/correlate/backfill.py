@@ -0,0 +1,235 @@
+"""
+Historical backfill of bridge adapters into column files (scripts/backfill.py).
+
+Each adapter's block range is cut into shards that a process pool fetches
+like fetch_bridge_src_events (LogFetcher), decodes with decode_bridge_batch,
+which keeps the exact token amounts, and writes as one column file each:
+
+    <out>/<adapter>/checkpoint.json
+    <out>/<adapter>/000018000000-000018009999.cols.json.gz
+
+Only the parent process writes the checkpoint, after a shard's file is in
+place, so a crash loses at most the shards in flight; a rerun fetches the
+requested range minus the ranges the checkpoint lists as done. Requests to
+each RPC endpoint are rate-limited across all worker processes.
+"""
+import json, logging, multiprocessing, os, shutil, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+from app.core.config import rpc_for_chain
+from app.core.rpc import PoolSettings, RpcClient, pool_settings
+from app.correlate.columnar import SUFFIX, write_shard
+from app.correlate.linkers import BridgeAdapter, _block_expr, decode_bridge_batch, src_log_filter
+from app.correlate.logfetch import FetchSettings, LogFetcher, settings_for_chain
+
+log = logging.getLogger(__name__)
+
+Range = Tuple[int, int]
+
+class RateLimiter:
+    """
+    At most `rps` requests per second over every process that holds it: a
+    shared "next free slot" time (GCRA without burst) in shared memory.
+    Pass it to workers at process start (pool initializer), not per task.
+    """
+    def __init__(self, rps: float, ctx=multiprocessing):
+        self.interval = 1.0 / rps if rps > 0 else 0.0
+        self._next = ctx.Value("d", 0.0)
+
+    def acquire(self) -> float:
+        """Wait for the next free slot; returns its time.monotonic() start."""
+        if not self.interval:
+            return time.monotonic()
+        with self._next.get_lock():
+            now = time.monotonic()
+            slot = max(now, self._next.value)
+            self._next.value = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+        return slot
+
+def merge(ranges: List[Range]) -> List[Range]:
+    """Sorted, coalesced inclusive ranges ([1,5] and [6,9] become [1,9])."""
+    out: List[Range] = []
+    for lo, hi in sorted(ranges):
+        if out and lo <= out[-1][1] + 1:
+            out[-1] = (out[-1][0], max(out[-1][1], hi))
+        else:
+            out.append((lo, hi))
+    return out
+
+def gaps(done: List[Range], lo: int, hi: int) -> List[Range]:
+    """Parts of [lo, hi] not covered by `done`."""
+    out, nxt = [], lo
+    for a, b in merge(done):
+        if b < nxt or a > hi:
+            continue
+        if a > nxt:
+            out.append((nxt, a - 1))
+        nxt = max(nxt, b + 1)
+    if nxt <= hi:
+        out.append((nxt, hi))
+    return out
+
+def shards(ranges: List[Range], size: int) -> List[Range]:
+    return [(a, min(hi, a + size - 1)) for lo, hi in ranges for a in range(lo, hi + 1, size)]
+
+def shard_name(lo: int, hi: int) -> str:
+    return f"{lo:012d}-{hi:012d}{SUFFIX}"
+
+class Checkpoint:
+    """Per-adapter progress: the block ranges whose column files are complete."""
+    def __init__(self, directory: str, adapter: BridgeAdapter):
+        self.path = os.path.join(directory, "checkpoint.json")
+        # the same range means the same rows only while the filter and decoding are unchanged
+        self.fingerprint = adapter.fingerprint
+        self.adapter = adapter.name
+        self.done: List[Range] = []
+        self.rows = 0
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                doc = json.load(f)
+            if doc.get("fingerprint") != self.fingerprint:
+                raise ValueError(f"{self.path} was written for a different {adapter.name} config "
+                                 "(address, event or fields changed); rerun with --reset")
+            self.done = [tuple(r) for r in doc["done"]]
+            self.rows = int(doc.get("rows", 0))
+
+    def mark(self, lo: int, hi: int, rows: int):
+        self.done = merge(self.done + [(lo, hi)])
+        self.rows += rows
+        self.save()
+
+    def save(self):
+        doc = {"adapter": self.adapter, "fingerprint": self.fingerprint, "rows": self.rows,
+               "done": [list(r) for r in self.done], "updated": int(time.time())}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(doc, f, indent=1)
+        os.replace(tmp, self.path)
+
+@dataclass
+class ShardTask:
+    adapter: Dict[str, Any]       # the config.yaml entry; workers never load the config themselves
+    url: str
+    lo: int
+    hi: int
+    path: str
+    fetch: FetchSettings
+    pool: PoolSettings
+
+# --- worker side ------------------------------------------------------------
+
+_LIMITERS: Dict[str, RateLimiter] = {}
+
+def _init_worker(limiters: Dict[str, RateLimiter]):
+    _LIMITERS.update(limiters)
+
+class _LimitedClient(RpcClient):
+    def __init__(self, name: str, url: str, settings: PoolSettings, limiter: RateLimiter | None):
+        super().__init__(name, url, settings)
+        self.limiter = limiter
+
+    def post_raw(self, body: bytes | str, method: str) -> bytes:
+        if self.limiter is not None:
+            self.limiter.acquire()
+        return super().post_raw(body, method)
+
+_CLIENTS: Dict[str, _LimitedClient] = {}
+
+def run_shard(task: ShardTask) -> Dict[str, Any]:
+    """Fetch, decode and write one shard (in a worker process)."""
+    adapter = BridgeAdapter.from_config(task.adapter)
+    client = _CLIENTS.get(task.url)
+    if client is None:
+        client = _CLIENTS[task.url] = _LimitedClient(f"backfill chain {adapter.src_chain}", task.url,
+                                                     task.pool, _LIMITERS.get(task.url))
+    fetcher = LogFetcher(client.w3, adapter.src_chain, task.fetch)
+    logs = fetcher.fetch(src_log_filter(adapter), task.lo, task.hi)
+    batch, stats = decode_bridge_batch(adapter, logs)
+    rows = write_shard(task.path, adapter.name, adapter.src_chain, task.lo, task.hi, batch)
+    return {"adapter": adapter.name, "lo": task.lo, "hi": task.hi, "rows": rows,
+            "calls": fetcher.calls, "splits": fetcher.splits, "rate_limited": fetcher.rate_limited,
+            "skipped": stats["skipped"]}
+
+# --- parent side ------------------------------------------------------------
+
+def _head(url: str, cache: Dict[str, int]) -> int:
+    if url not in cache:
+        client = RpcClient("backfill head", url, PoolSettings())
+        try:
+            cache[url] = int(client.call("eth_blockNumber", []), 16)
+        finally:
+            client.session.close()
+    return cache[url]
+
+def backfill(adapters: List[Dict[str, Any]], out_dir: str, from_block: str | None = None,
+             to_block: str = "latest", *, workers: int = 4, shard_blocks: int = 10_000, rps: float = 10.0,
+             confirmations: int = 64, rpc: Dict[int, str] | None = None, max_shards: int | None = None,
+             reset: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Backfill `adapters` (config.yaml `bridges:` entries) into `out_dir`.
+    `from_block` / `to_block` take the same expressions as the adapters
+    ("latest-N", numbers); `from_block` defaults to the adapter's own
+    `backfill_from` (or `from_block`). The end is clamped to `confirmations`
+    below the head, so only finalized blocks land in the files. Returns a
+    per-adapter summary; failed shards are logged, left out of the
+    checkpoint and counted under "failed".
+    """
+    heads: Dict[str, int] = {}
+    tasks: List[ShardTask] = []
+    ckpts: Dict[str, Checkpoint] = {}
+    summary: Dict[str, Dict[str, Any]] = {}
+    for cfg in adapters:
+        adapter = BridgeAdapter.from_config(cfg)
+        url = (rpc or {}).get(adapter.src_chain) or rpc_for_chain(adapter.src_chain)
+        if not url:
+            raise RuntimeError(f"No RPC configured for chain {adapter.src_chain} (adapter {adapter.name})")
+        directory = os.path.join(out_dir, adapter.name)
+        if reset and os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory, exist_ok=True)
+        ck = ckpts[adapter.name] = Checkpoint(directory, adapter)
+
+        latest = _head(url, heads)
+        lo = _block_expr(latest, str(from_block or cfg.get("backfill_from") or adapter.from_block))
+        hi = min(_block_expr(latest, str(to_block)), latest - confirmations)
+        todo = shards(gaps(ck.done, lo, hi), max(1, shard_blocks))
+        summary[adapter.name] = {"from_block": lo, "to_block": hi, "shards": len(todo), "written": 0,
+                                 "failed": 0, "rows": 0, "calls": 0, "splits": 0, "rate_limited": 0}
+        fetch, pool = settings_for_chain(adapter.src_chain), pool_settings(adapter.src_chain)
+        for a, b in todo:
+            tasks.append(ShardTask(cfg, url, a, b, os.path.join(directory, shard_name(a, b)), fetch, pool))
+    if max_shards is not None:
+        tasks = tasks[:max_shards]
+    if not tasks:
+        return summary
+
+    # workers fork from a server process that has already imported web3 and the decoder: no forking of
+    # the parent's threads and sockets, and no per-worker import cost
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload(["app.correlate.backfill", "app.core.providers"])
+    limiters = {url: RateLimiter(rps, ctx) for url in {t.url for t in tasks}}
+    with ProcessPoolExecutor(max(1, min(workers, len(tasks))), mp_context=ctx,
+                             initializer=_init_worker, initargs=(limiters,)) as ex:
+        futs = {ex.submit(run_shard, t): t for t in tasks}
+        try:
+            for fut in as_completed(futs):
+                t = futs[fut]
+                s = summary[t.adapter["name"]]
+                try:
+                    res = fut.result()
+                except Exception:
+                    s["failed"] += 1
+                    log.exception("backfill %s [%d, %d] failed", t.adapter["name"], t.lo, t.hi)
+                    continue
+                ckpts[res["adapter"]].mark(res["lo"], res["hi"], res["rows"])
+                s["written"] += 1
+                for k in ("rows", "calls", "splits", "rate_limited"):
+                    s[k] += res[k]
+                log.info("backfill %s [%d, %d]: %d rows", res["adapter"], res["lo"], res["hi"], res["rows"])
+        except BaseException:
+            ex.shutdown(wait=True, cancel_futures=True)
+            raise
+    return summary
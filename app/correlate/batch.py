@@ -0,0 +1,369 @@
+"""
+Columnar batches of intent events.
+
+An EventBatch keeps events as parallel columns instead of one IntentEvent
+(plus meta dict) per event:
+
+    eid          32 raw bytes + log index for "0x<tx hash>:<n>" eids
+    chain        interned id (array "H")
+    kind         interned id, KINDS first (array "B")
+    token        interned id (array "I")
+    amount       exact integer in units of 10**-scale, as two 64-bit halves
+    timestamp    float seconds, NaN when unknown
+    messageId    32 raw bytes for "0x" + 64 hex ids
+    adapter, from, to, blockNumber
+
+Other values (eids and ids of other shapes, amounts beyond 128 bits,
+unknown meta keys) are kept as they are in small per-row dicts, so every
+event converts back to the IntentEvent it was built from. Amounts never pass
+through a float: decoded logs carry the raw token amount (scale 0) and API
+payloads are read as the decimals they print as (0.1 is exactly 1/10) and
+rejected when they are not finite or need more than MAX_SCALE decimal places,
+so sums and tolerance checks are exact.
+
+deterministic_link, probabilistic_link and conservation_by_component take a
+batch directly; IntentEvents are only built when a caller asks for one.
+"""
+from array import array
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from app.correlate.dag import IntentEvent, Interner, KINDS
+
+MAX_SCALE = 18      # finest decimal place kept for fractional amounts (wei of an 18-decimals token)
+
+_FIELDS = ("eid", "chain", "kind", "token", "amount", "meta")
+_META_COLUMNS = frozenset(("messageId", "adapter", "from", "to", "blockNumber", "timestamp"))
+_M64 = (1 << 64) - 1
+_LIMIT = 1 << 127
+_NO_BLOCK = -(1 << 63)
+_NAN = float("nan")
+
+class _Absent:
+    def __repr__(self):
+        return "<absent>"
+
+ABSENT = _Absent()   # a meta key the event did not have (as opposed to one set to None)
+
+def _decimal(x) -> Decimal | None:
+    """The exact decimal an amount stands for; None for NaN and infinities."""
+    if isinstance(x, float):
+        d = Decimal(repr(x))
+    elif isinstance(x, int):
+        return Decimal(x)
+    elif isinstance(x, str):
+        try:
+            d = Decimal(int(x, 16)) if x[:2] in ("0x", "0X") else Decimal(x)
+        except InvalidOperation:
+            raise ValueError(f"amount {x!r} is not a number") from None
+    else:
+        raise TypeError(f"amount must be a number or a numeric string, not {type(x).__name__}")
+    return d if d.is_finite() else None
+
+def decimal_places(x) -> int:
+    """Digits after the decimal point `x` needs (0 for integers)."""
+    if isinstance(x, int):
+        return 0
+    d = _decimal(x)
+    return max(0, -d.as_tuple().exponent) if d is not None else 0
+
+def to_units(x, scale: int, exact: bool = False) -> int | float:
+    """
+    `x` as an integer count of 10**-scale, rounded half-even past that; NaN/inf
+    stay floats. With exact=True, an amount that would be rounded or is not
+    finite raises ValueError instead.
+    """
+    if isinstance(x, int):
+        return x * 10 ** scale if scale else x
+    d = _decimal(x)
+    if d is None:
+        if exact:
+            raise ValueError(f"amount {x!r} is not a finite number")
+        return float(x)
+    sign, digits, exp = d.as_tuple()
+    n = int("".join(map(str, digits)))
+    e = exp + scale
+    if e >= 0:
+        n *= 10 ** e
+    else:
+        q, r = divmod(n, 10 ** -e)
+        if exact and r:
+            raise ValueError(f"amount {x!r} has more than {scale} decimal places")
+        half = 5 * 10 ** (-e - 1)
+        n = q + (r > half or (r == half and q & 1))
+    return -n if sign else n
+
+def format_units(n: int, scale: int) -> str:
+    """An amount in units of 10**-scale as a plain decimal string."""
+    if not scale or not isinstance(n, int):
+        return str(n)
+    q, r = divmod(abs(n), 10 ** scale)
+    frac = str(r).rjust(scale, "0").rstrip("0")
+    return ("-" if n < 0 else "") + (f"{q}.{frac}" if frac else str(q))
+
+class _Hex32:
+    """Column of "0x" + 64 lowercase hex strings held as 32 raw bytes each; other values kept in `other`."""
+    __slots__ = ("raw", "other")
+
+    def __init__(self):
+        self.raw = bytearray()
+        self.other: Dict[int, Any] = {}
+
+    def append(self, v):
+        if type(v) is str and len(v) == 66 and v[:2] == "0x":
+            h = v[2:]
+            if h.islower() or h.isdigit():
+                try:
+                    b = bytes.fromhex(h)
+                except ValueError:
+                    b = b""
+                if len(b) == 32:
+                    self.raw += b
+                    return
+        self.other[len(self.raw) >> 5] = v
+        self.raw += bytes(32)
+
+    def __getitem__(self, i: int):
+        v = self.other.get(i, self) if self.other else self
+        return "0x" + self.raw[i << 5:(i + 1) << 5].hex() if v is self else v
+
+    def key(self, i: int):
+        """A hashable stand-in for row i that compares like the value (raw bytes or the value itself)."""
+        v = self.other.get(i, self) if self.other else self
+        return bytes(self.raw[i << 5:(i + 1) << 5]) if v is self else v
+
+class EventBatch:
+    """
+    Struct-of-arrays intent events; see the module docstring for the columns.
+    `scale` is fixed per batch: amount column values count 10**-scale of a
+    token unit (0 for raw on-chain amounts).
+    """
+    def __init__(self, scale: int = 0):
+        self.scale = scale
+        self.chains = Interner()
+        self.kinds = Interner(KINDS)
+        self.tokens = Interner()
+        self.names = Interner([ABSENT])        # adapter / from / to values
+        self._eid = _Hex32()
+        self._log_index = array("i")           # -1: the whole eid is in _eid
+        self.chain = array("H")
+        self.kind = array("B")
+        self.token = array("I")
+        self._lo = array("Q")
+        self._hi = array("q")
+        self._wide: Dict[int, int | float] = {}  # amounts outside the two halves, and NaN / inf
+        self.timestamp = array("d")
+        self.block = array("q")
+        self._mid = _Hex32()
+        self._adapter = array("I")
+        self._from = array("I")
+        self._to = array("I")
+        self._extra: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self):
+        return len(self.chain)
+
+    def append(self, eid: str, chain: int, kind: str, token: Any, amount: int, meta: Dict[str, Any] | None = None):
+        """Add one event; `amount` is already in units of 10**-scale."""
+        i = len(self.chain)
+        # everything that can raise comes before the first column grows
+        c, k, t = self.chains.intern(chain), self.kinds.intern(kind), self.tokens.intern(token)
+        if c > 0xFFFF or k > 0xFF:
+            raise ValueError(f"too many distinct chains or kinds in one batch ({chain!r}, {kind!r})")
+        meta = meta or {}
+        if not isinstance(meta, dict):
+            raise TypeError(f"meta must be a dict, not {type(meta).__name__}")
+        tx, sep, ix = eid.rpartition(":") if type(eid) is str else ("", "", "")
+        if sep and ix.isascii() and ix.isdigit() and len(ix) < 10 and (ix[0] != "0" or ix == "0"):
+            self._eid.append(tx)
+            self._log_index.append(int(ix))
+        else:
+            self._eid.append(eid)
+            self._log_index.append(-1)
+        self.chain.append(c)
+        self.kind.append(k)
+        self.token.append(t)
+        if type(amount) is int and -_LIMIT <= amount < _LIMIT:
+            self._lo.append(amount & _M64)
+            self._hi.append(amount >> 64)
+        else:
+            self._lo.append(0)
+            self._hi.append(0)
+            self._wide[i] = amount
+        extra = None
+        ts = meta.get("timestamp")
+        if type(ts) in (int, float) and ts == ts:
+            self.timestamp.append(ts)
+        else:
+            if "timestamp" in meta:
+                extra = {"timestamp": ts}
+            try:
+                ts = float(ts)      # numeric strings still place the event in time, as _event_ts does
+            except (TypeError, ValueError):
+                ts = _NAN
+            self.timestamp.append(ts)
+        b = meta.get("blockNumber")
+        if type(b) is int and _NO_BLOCK < b < 1 << 63:
+            self.block.append(b)
+        else:
+            self.block.append(_NO_BLOCK)
+            if "blockNumber" in meta:
+                extra = {**(extra or {}), "blockNumber": b}
+        self._mid.append(meta.get("messageId", ABSENT))
+        for key, col in (("adapter", self._adapter), ("from", self._from), ("to", self._to)):
+            v = meta.get(key, ABSENT)
+            try:
+                col.append(self.names.intern(v))
+            except TypeError:       # unhashable: keep it with the row
+                col.append(0)
+                extra = {**(extra or {}), key: v}
+        if not _META_COLUMNS.issuperset(meta):
+            rest = {k: v for k, v in meta.items() if k not in _META_COLUMNS}
+            if rest:
+                extra = {**(extra or {}), **rest}
+        if extra:
+            self._extra[i] = extra
+
+    @classmethod
+    def from_events(cls, events: Iterable[IntentEvent], scale: int | None = None) -> "EventBatch":
+        """
+        Batch of IntentEvents. The scale defaults to the finest decimal place
+        any amount needs (at most MAX_SCALE), so every amount is exact.
+        """
+        events = list(events)
+        if scale is None:
+            scale = min(MAX_SCALE, max((decimal_places(e.amount) for e in events), default=0))
+        batch = cls(scale)
+        for e in events:
+            batch.append(e.eid, e.chain, e.kind, e.token, to_units(e.amount, scale), e.meta)
+        return batch
+
+    @classmethod
+    def from_dicts(cls, rows: List[Dict[str, Any]], scale: int | None = None) -> "EventBatch":
+        """
+        from_events for IntentEvent-shaped dicts (API payloads), without
+        building the IntentEvents. Payload amounts must be exact: NaN, infinities
+        and amounts finer than the scale (MAX_SCALE by default) raise ValueError
+        naming the event rather than being rounded.
+        """
+        for r in rows:
+            if len(r) != len(_FIELDS) or any(k not in r for k in _FIELDS):
+                raise TypeError(f"event needs exactly the fields {', '.join(_FIELDS)}; got {', '.join(map(str, r))}")
+        r: Dict[str, Any] = {}
+        try:
+            if scale is None:
+                scale = 0
+                for r in rows:
+                    scale = max(scale, decimal_places(r["amount"]))
+                scale = min(MAX_SCALE, scale)
+            batch = cls(scale)
+            for r in rows:
+                batch.append(r["eid"], r["chain"], r["kind"], r["token"], to_units(r["amount"], scale, exact=True),
+                             r["meta"])
+        except ValueError as e:
+            raise ValueError(f"event {r.get('eid')}: {e}") from None
+        return batch
+
+    # --- columns ------------------------------------------------------------
+
+    def eid(self, i: int) -> str:
+        ix = self._log_index[i]
+        return self._eid[i] if ix < 0 else f"{self._eid[i]}:{ix}"
+
+    @property
+    def eids(self) -> List[str]:
+        return [self.eid(i) for i in range(len(self))]
+
+    def amount(self, i: int) -> int | float:
+        """Row i's exact amount in units of 10**-scale (a float only for NaN / inf inputs)."""
+        if self._wide and i in self._wide:
+            return self._wide[i]
+        return (self._hi[i] << 64) | self._lo[i]
+
+    def amounts(self) -> List[int | float]:
+        out = [(h << 64) | lo if h else lo for h, lo in zip(self._hi, self._lo)]
+        for i, v in self._wide.items():
+            out[i] = v
+        return out
+
+    def amount_float(self, i: int) -> float:
+        a = self.amount(i)
+        return a / 10 ** self.scale if self.scale and isinstance(a, int) else float(a)
+
+    def message_id(self, i: int):
+        v = self._mid[i]
+        return None if v is ABSENT else v
+
+    def message_keys(self) -> List[Any]:
+        """Per row a hashable key equal across rows with the same messageId; None when there is none."""
+        mid = self._mid
+        return [None if k is ABSENT else k for k in map(mid.key, range(len(self)))]
+
+    def timestamps(self) -> List[float | None]:
+        return [None if t != t else t for t in self.timestamp]
+
+    # --- IntentEvents -------------------------------------------------------
+
+    def meta(self, i: int) -> Dict[str, Any]:
+        meta: Dict[str, Any] = {}
+        mid = self._mid[i]
+        if mid is not ABSENT:
+            meta["messageId"] = mid
+        names = self.names.values
+        for key, col in (("adapter", self._adapter), ("from", self._from), ("to", self._to)):
+            if col[i]:
+                meta[key] = names[col[i]]
+        if self.block[i] != _NO_BLOCK:
+            meta["blockNumber"] = self.block[i]
+        t = self.timestamp[i]
+        if t == t:
+            meta["timestamp"] = t
+        if self._extra and i in self._extra:
+            meta.update(self._extra[i])
+        return meta
+
+    def event(self, i: int) -> IntentEvent:
+        return IntentEvent(self.eid(i), self.chains.values[self.chain[i]], self.kinds.values[self.kind[i]],
+                           self.tokens.values[self.token[i]], self.amount_float(i), self.meta(i))
+
+    def __getitem__(self, i: int) -> IntentEvent:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.event(i)
+
+    def __iter__(self) -> Iterator[IntentEvent]:
+        return map(self.event, range(len(self)))
+
+    def to_events(self) -> List[IntentEvent]:
+        return list(self)
+
+    # --- aggregates ---------------------------------------------------------
+
+    def component_flows(self, comp: List[int], roots: List[str],
+                        signs: Dict[str, int]) -> List[Tuple[str, str, int, int]]:
+        """
+        CompactIntentDAG.component_flows over the batch's exact amounts:
+        `comp` is each row's component (-1: none) and `roots` the root eid
+        per component, as returned by the DAG's component_index().
+        """
+        sign = [signs.get(k, 0) for k in self.kinds.values]
+        names = sorted({str(t) for t in self.tokens.values})
+        nt = max(1, len(names))
+        index = {n: k for k, n in enumerate(names)}
+        rank = [index[str(t)] for t in self.tokens.values]
+        flows: Dict[int, List[int]] = {}    # component * nt + token rank -> [out, in]
+        kind, token = self.kind, self.token
+        for i, (c, a) in enumerate(zip(comp, self.amounts())):
+            sg = sign[kind[i]]
+            if c < 0 or not sg:
+                continue
+            key = c * nt + rank[token[i]]
+            f = flows.get(key)
+            if f is None:
+                f = flows[key] = [0, 0]
+            f[0 if sg > 0 else 1] += a
+        return [(roots[key // nt], names[key % nt], o, n) for key, (o, n) in sorted(flows.items())]
+
+    def format_amount(self, n: int) -> str:
+        return format_units(n, self.scale)
@@ -1,6 +1,7 @@
+import os
+from array import array
 from dataclasses import dataclass, field
-from typing import Dict, List, Tuple
-import networkx as nx
+from typing import Dict, Iterator, List, Tuple
 
 @dataclass
 class IntentEvent:
@@ -11,19 +12,370 @@ class IntentEvent:
     amount: float
     meta: Dict
 
-class IntentDAG:
+class Interner:
+    """Maps repeated values (tokens, kinds) to small integer ids."""
+    def __init__(self, initial=()):
+        self.ids: Dict[object, int] = {}
+        self.values: List[object] = []
+        for v in initial:
+            self.intern(v)
+    def intern(self, v) -> int:
+        i = self.ids.get(v)
+        if i is None:
+            i = self.ids[v] = len(self.values)
+            self.values.append(v)
+        return i
+    def __len__(self):
+        return len(self.values)
+
+KINDS = ("swap", "bridge_out", "bridge_in", "claim", "settle")
+
+NO_COMPONENT = 0xFFFFFFFF
+
+class NxIntentDAG:
+    """networkx-backed graph; keeps whole IntentEvents as node attributes (handy for debugging)."""
     def __init__(self):
+        import networkx as nx
+        self._nx = nx
         self.g = nx.DiGraph()
+    def __contains__(self, eid: str):
+        return eid in self.g
+    def __len__(self):
+        return self.g.number_of_nodes()
     def add(self, ev: IntentEvent):
         self.g.add_node(ev.eid, ev=ev)
+    def remove(self, eid: str):
+        if eid in self.g:
+            self.g.remove_node(eid)
     def link(self, src: str, dst: str, confidence: float = 1.0):
         self.g.add_edge(src, dst, confidence=confidence)
+    def event(self, eid: str) -> IntentEvent:
+        return self.g.nodes[eid]["ev"]
     def path_amounts(self, start: str) -> Dict[str, float]:
         # toy aggregation along reachable nodes
         out = {}
-        for nid in nx.descendants(self.g, start) | {start}:
+        for nid in self._nx.descendants(self.g, start) | {start}:
             ev: IntentEvent = self.g.nodes[nid]["ev"]
             out[ev.token] = out.get(ev.token, 0.0) + ev.amount
         return out
     def edges(self):
         return self.g.edges(data=True)
+    def add_batch(self, batch):
+        for ev in batch:
+            self.add(ev)
+    def _components(self) -> Tuple[Dict[str, int], List[str]]:
+        # numbered like CompactIntentDAG.components: by each component's earliest node
+        g = self.g
+        order = list(g)
+        pos = {nid: i for i, nid in enumerate(order)}
+        firsts = sorted((min(pos[nid] for nid in comp), comp) for comp in self._nx.weakly_connected_components(g))
+        comp_of: Dict[str, int] = {}
+        for c, (_, comp) in enumerate(firsts):
+            for nid in comp:
+                comp_of[nid] = c
+        roots: List[str | None] = [None] * len(firsts)
+        for nid in order:
+            c = comp_of[nid]
+            if roots[c] is None and not any(p != nid for p in g.predecessors(nid)):
+                roots[c] = nid
+        return comp_of, [r if r is not None else order[first] for r, (first, _) in zip(roots, firsts)]
+    def component_index(self, eids: List[str]) -> Tuple[List[int], List[str]]:
+        comp_of, roots = self._components()
+        return [comp_of.get(e, -1) for e in eids], roots
+    def component_flows(self, signs: Dict[str, int]) -> List[Tuple[str, str, float, float]]:
+        # same rows and order as CompactIntentDAG.component_flows
+        comp_of, roots = self._components()
+        flows: Dict[Tuple[int, str], List[float]] = {}
+        for nid, ev in self.g.nodes(data="ev"):
+            s = signs.get(ev.kind, 0) if ev is not None else 0
+            if s:
+                f = flows.setdefault((comp_of[nid], str(ev.token)), [0.0, 0.0])
+                f[0 if s > 0 else 1] += ev.amount
+        return [(roots[c], tkn, o, i) for (c, tkn), (o, i) in sorted(flows.items())]
+
+class CompactIntentDAG:
+    """
+    Array-backed graph: integer node ids, columnar node attributes with interned
+    chain/kind/token ids, edge arrays with float32 confidences and a lazily
+    rebuilt CSR adjacency. Event meta is not retained.
+    """
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._eids: List[str | None] = []
+        self._alive = bytearray()
+        self._has_ev = bytearray()
+        self._chains = Interner()
+        self._kinds = Interner(KINDS)
+        self._tokens = Interner()
+        self._chain = array("H")
+        self._kind = array("B")
+        self._token = array("I")
+        self._amount = array("d")
+        self._src = array("I")
+        self._dst = array("I")
+        self._conf = array("f")
+        self._dead = 0
+        self._csr: Tuple[array, array, array] | None = None
+        self._comp: Tuple[List[int], List[int]] | None = None
+
+    def __contains__(self, eid: str):
+        return eid in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _node(self, eid: str) -> int:
+        i = self._ids.get(eid)
+        if i is None:
+            i = self._ids[eid] = len(self._eids)
+            self._eids.append(eid)
+            self._alive.append(1)
+            self._has_ev.append(0)
+            self._chain.append(0); self._kind.append(0); self._token.append(0); self._amount.append(0.0)
+            self._comp = None
+        return i
+
+    def _check_room(self, chains, kinds):
+        # the chain and kind columns are 16- and 8-bit: refuse before anything (interners included) changes
+        for what, interner, values, limit in (("chains", self._chains, chains, 0xFFFF),
+                                              ("kinds", self._kinds, kinds, 0xFF)):
+            new = {v for v in values if v not in interner.ids}
+            if len(interner) + len(new) > limit + 1:
+                raise ValueError(f"too many distinct {what} in the graph (at most {limit + 1}): {sorted(map(repr, new))[:3]}")
+
+    def add(self, ev: IntentEvent):
+        """Add (or overwrite) a node's event; raises ValueError/TypeError without changing the graph."""
+        if type(ev.amount) not in (int, float):
+            raise TypeError(f"amount must be a number, not {type(ev.amount).__name__}")
+        amount = float(ev.amount)
+        self._check_room((ev.chain,), (ev.kind,))
+        c, k, t = self._chains.intern(ev.chain), self._kinds.intern(ev.kind), self._tokens.intern(ev.token)
+        i = self._node(ev.eid)
+        self._has_ev[i] = 1
+        self._chain[i], self._kind[i], self._token[i], self._amount[i] = c, k, t, amount
+
+    def add_batch(self, batch):
+        """add() for every row of an EventBatch without building IntentEvents."""
+        self._check_room(batch.chains.values, batch.kinds.values)
+        chain = [self._chains.intern(c) for c in batch.chains.values]
+        kind = [self._kinds.intern(k) for k in batch.kinds.values]
+        token = [self._tokens.intern(t) for t in batch.tokens.values]
+        for r, eid in enumerate(batch.eids):
+            i = self._node(eid)
+            self._has_ev[i] = 1
+            self._chain[i] = chain[batch.chain[r]]
+            self._kind[i] = kind[batch.kind[r]]
+            self._token[i] = token[batch.token[r]]
+            self._amount[i] = batch.amount_float(r)
+
+    def remove(self, eid: str):
+        i = self._ids.pop(eid, None)
+        if i is None:
+            return
+        self._alive[i] = 0
+        self._eids[i] = None
+        self._dead += 1
+        self._csr = self._comp = None
+        if self._dead > 1024 and self._dead * 2 > len(self._eids):
+            self._compact()
+
+    def link(self, src: str, dst: str, confidence: float = 1.0):
+        self._src.append(self._node(src))
+        self._dst.append(self._node(dst))
+        self._conf.append(confidence)
+        self._csr = self._comp = None
+
+    def event(self, eid: str) -> IntentEvent:
+        i = self._ids[eid]
+        if not self._has_ev[i]:
+            raise KeyError(eid)
+        return IntentEvent(eid, self._chains.values[self._chain[i]], self._kinds.values[self._kind[i]],
+                           self._tokens.values[self._token[i]], self._amount[i], {})
+
+    def _compact(self):
+        # drop tombstoned nodes and their edges, renumbering the survivors
+        remap = array("i", [-1]) * len(self._eids)
+        keep = [i for i, a in enumerate(self._alive) if a]
+        for new, old in enumerate(keep):
+            remap[old] = new
+        self._eids = [self._eids[i] for i in keep]
+        self._ids = {e: n for n, e in enumerate(self._eids)}
+        self._alive = bytearray(b"\x01") * len(keep)
+        self._has_ev = bytearray(self._has_ev[i] for i in keep)
+        self._chain = array("H", (self._chain[i] for i in keep))
+        self._kind = array("B", (self._kind[i] for i in keep))
+        self._token = array("I", (self._token[i] for i in keep))
+        self._amount = array("d", (self._amount[i] for i in keep))
+        src, dst, conf = array("I"), array("I"), array("f")
+        for s, d, c in zip(self._src, self._dst, self._conf):
+            if remap[s] >= 0 and remap[d] >= 0:
+                src.append(remap[s]); dst.append(remap[d]); conf.append(c)
+        self._src, self._dst, self._conf = src, dst, conf
+        self._dead = 0
+        self._csr = self._comp = None
+
+    def _adjacency(self) -> Tuple[array, array, array]:
+        """CSR (offsets, targets, confidences); duplicate edges keep the first slot and the last confidence."""
+        if self._csr is not None:
+            return self._csr
+        n = len(self._eids)
+        alive = self._alive
+        counts = array("I", [0]) * (n + 1)
+        for s, d in zip(self._src, self._dst):
+            if alive[s] and alive[d]:
+                counts[s + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        fill = array("I", counts)
+        targets = array("I", [0]) * counts[n]
+        conf = array("f", [0.0]) * counts[n]
+        for s, d, c in zip(self._src, self._dst, self._conf):
+            if alive[s] and alive[d]:
+                k = fill[s]
+                targets[k] = d; conf[k] = c
+                fill[s] = k + 1
+        # collapse parallel edges so the graph behaves like a DiGraph
+        offsets = array("I", [0]) * (n + 1)
+        out_t, out_c = array("I"), array("f")
+        for s in range(n):
+            lo, hi = counts[s], counts[s + 1]
+            if hi - lo > 1:
+                seen: Dict[int, int] = {}
+                for k in range(lo, hi):
+                    d = targets[k]
+                    if d in seen:
+                        out_c[seen[d]] = conf[k]
+                    else:
+                        seen[d] = len(out_t)
+                        out_t.append(d); out_c.append(conf[k])
+            elif hi > lo:
+                out_t.append(targets[lo]); out_c.append(conf[lo])
+            offsets[s + 1] = len(out_t)
+        self._csr = (offsets, out_t, out_c)
+        return self._csr
+
+    def descendants(self, start: str) -> List[int]:
+        """Node ids reachable from start, start included (iterative DFS over the CSR)."""
+        offsets, targets, _ = self._adjacency()
+        s = self._ids[start]
+        seen = {s}
+        order, stack = [s], [s]
+        while stack:
+            u = stack.pop()
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                if v not in seen:
+                    seen.add(v)
+                    order.append(v)
+                    stack.append(v)
+        return order
+
+    def path_amounts(self, start: str) -> Dict[str, float]:
+        # toy aggregation along reachable nodes
+        sums: Dict[int, float] = {}
+        has_ev, token, amount = self._has_ev, self._token, self._amount
+        for i in self.descendants(start):
+            if has_ev[i]:
+                t = token[i]
+                sums[t] = sums.get(t, 0.0) + amount[i]
+        tokens = self._tokens.values
+        return {tokens[t]: v for t, v in sums.items()}
+
+    def components(self) -> Tuple[List[int], List[int]]:
+        """
+        Weakly connected components in one union-find pass over the edges:
+        (component per node id, root node id per component). The root is the
+        earliest-added node without incoming edges, or the earliest node when
+        every member has one (cycles). Removed nodes get NO_COMPONENT.
+        """
+        if self._comp is not None:
+            return self._comp
+        n = len(self._eids)
+        alive = self._alive
+        # a set is represented by its smallest id, so every parent pointer goes to a smaller id
+        parent = list(range(n))
+        has_in = bytearray(n)
+        for s, d in zip(self._src, self._dst):
+            if alive[s] and alive[d]:
+                if s != d:
+                    has_in[d] = 1
+                while parent[s] != s:
+                    parent[s] = s = parent[parent[s]]      # path halving
+                while parent[d] != d:
+                    parent[d] = d = parent[parent[d]]
+                if s < d:
+                    parent[d] = s
+                elif d < s:
+                    parent[s] = d
+        # ascending ids: a node's parent is already labelled and in the same component
+        label = [NO_COMPONENT] * n
+        roots: List[int] = []
+        first: List[int] = []
+        for i in range(n):
+            if not alive[i]:
+                continue
+            p = parent[i]
+            if p == i:
+                label[i] = len(roots)
+                roots.append(-1 if has_in[i] else i)
+                first.append(i)
+                continue
+            c = label[i] = label[p]
+            if roots[c] < 0 and not has_in[i]:
+                roots[c] = i
+        self._comp = (label, [r if r >= 0 else first[c] for c, r in enumerate(roots)])
+        return self._comp
+
+    def component_index(self, eids: List[str]) -> Tuple[List[int], List[str]]:
+        """Component of each of `eids` (-1 when not in the graph) and the root eid of every component."""
+        label, roots = self.components()
+        ids = self._ids
+        comp = [label[ids[e]] if e in ids else -1 for e in eids]
+        return comp, [self._eids[r] for r in roots]
+
+    def component_flows(self, signs: Dict[str, int]) -> List[Tuple[str, str, float, float]]:
+        """
+        (root eid, token, outflow, inflow) for every component and token that
+        has flows, ordered by component (root order) then token. `signs`
+        maps kinds to +1 (outflow), -1 (inflow) or 0 (not a flow); nodes
+        without an event (link targets only) carry no amount.
+        """
+        label, roots = self.components()
+        sign = [signs.get(k, 0) for k in self._kinds.values]
+        names = sorted({str(t) for t in self._tokens.values})
+        nt = max(1, len(names))
+        index = {n: i for i, n in enumerate(names)}
+        rank = [index[str(t)] for t in self._tokens.values]
+        slot: Dict[int, int] = {}             # component * nt + token rank -> row
+        outs, ins = array("d"), array("d")
+        has_ev, kind, token, amount = self._has_ev, self._kind, self._token, self._amount
+        for i, c in enumerate(label):
+            if c == NO_COMPONENT or not has_ev[i]:
+                continue
+            sg = sign[kind[i]]
+            if sg:
+                key = c * nt + rank[token[i]]
+                r = slot.get(key)
+                if r is None:
+                    r = slot[key] = len(outs)
+                    outs.append(0.0)
+                    ins.append(0.0)
+                if sg > 0:
+                    outs[r] += amount[i]
+                else:
+                    ins[r] += amount[i]
+        eids = self._eids
+        return [(eids[roots[key // nt]], names[key % nt], outs[r], ins[r]) for key, r in sorted(slot.items())]
+
+    def edges(self) -> Iterator[Tuple[str, str, Dict[str, float]]]:
+        # same shape and order as DiGraph.edges(data=True)
+        offsets, targets, conf = self._adjacency()
+        eids = self._eids
+        for s in range(len(eids)):
+            for k in range(offsets[s], offsets[s + 1]):
+                yield eids[s], eids[targets[k]], {"confidence": round(conf[k], 6)}
+
+_BACKENDS = {"compact": CompactIntentDAG, "networkx": NxIntentDAG}
+
+# INTENT_GUARD_DAG_BACKEND=networkx switches back to the networkx graph for debugging
+IntentDAG = _BACKENDS[os.getenv("INTENT_GUARD_DAG_BACKEND", "compact")]
@@ -0,0 +1,208 @@
+import math, threading, time
+from collections import deque
+from typing import Any, Dict, List, Tuple
+from app.correlate.dag import IntentDAG, IntentEvent
+from app.core.config import snapshot
+from app.policies.crosschain import FLOW_SIGNS, Issue, flow_issues
+
+_TINY = 1e-12
+_NAN = float("nan")
+
+class CorrelationEngine:
+    """
+    Long-lived, incremental counterpart of deterministic_link + probabilistic_link.
+    Events are ingested one at a time; each one is matched against a messageId
+    map and a log-scaled amount index, so the per-event cost depends on how many
+    events sit inside the horizon, not on the total history seen.
+    """
+    def __init__(self, horizon_s: float | None = None, tol_bps: float | None = None,
+                 time_window_s: float | None = None):
+        x = snapshot().crosschain
+        self.horizon_s = float(horizon_s if horizon_s is not None else x.stream_horizon_s)
+        self.tol_bps = tol_bps if tol_bps is not None else x.amount_tol_bps
+        self.tol = self.tol_bps / 10000
+        self.window = time_window_s if time_window_s is not None else x.time_window_s
+        # log-scale bucket width; a match is always within two buckets of the new amount
+        self._w = math.log1p(max(self.tol, 1e-9))
+        self.dag = IntentDAG()
+        self._lock = threading.Lock()
+        self._events: Dict[str, Tuple[IntentEvent, float, Any, int]] = {}  # eid -> (ev, ts, amount key, seq)
+        self._in: Dict[str, set] = {}       # eid -> retained events linked into it
+        self._out: Dict[str, set] = {}      # eid -> retained events it links to
+        self._seq = 0
+        self._by_mid: Dict[str, str] = {}
+        self._by_amount: Dict[Any, Dict[str, IntentEvent]] = {}
+        self._order: deque = deque()
+        self._watermark = float("-inf")
+
+    def _key(self, token, amount: float):
+        if abs(amount) <= _TINY:
+            return (token, 0, 0)
+        return (token, 1 if amount > 0 else -1, math.floor(math.log(abs(amount)) / self._w))
+
+    def _candidate_keys(self, token, amount: float):
+        k = math.floor(math.log(max(abs(amount), _TINY)) / self._w)
+        signs = (1, -1) if abs(amount) <= _TINY else (1 if amount > 0 else -1,)
+        keys = [(token, 0, 0)]
+        for sg in signs:
+            keys.extend((token, sg, k + d) for d in (-2, -1, 0, 1, 2))
+        return keys
+
+    def __len__(self):
+        return len(self._events)
+
+    def __contains__(self, eid: str):
+        return eid in self._events
+
+    def _timestamp(self, ev: IntentEvent, now: float | None) -> float:
+        ts = ev.meta.get("timestamp") if ev.meta else None
+        if ts is None:
+            return now if now is not None else time.time()
+        try:
+            ts = float(ts)
+        except (TypeError, ValueError):
+            ts = _NAN
+        if not math.isfinite(ts):
+            raise ValueError(f"event {ev.eid}: timestamp {ev.meta['timestamp']!r} is not a finite number")
+        return ts
+
+    def _check_event(self, ev: IntentEvent):
+        if type(ev.amount) not in (int, float):
+            raise TypeError(f"event {ev.eid}: amount must be a number, not {type(ev.amount).__name__}")
+        if ev.meta is not None and not isinstance(ev.meta, dict):
+            raise TypeError(f"event {ev.eid}: meta must be a dict, not {type(ev.meta).__name__}")
+
+    def ingest(self, ev: IntentEvent, now: float | None = None) -> List[str]:
+        """
+        Add one event, link it against the retained window and evict expired
+        events. An event that cannot be indexed raises (TypeError/ValueError)
+        without changing the engine.
+        """
+        self._check_event(ev)
+        ts = self._timestamp(ev, now)
+        logs = []
+        with self._lock:
+            if ev.eid in self._events:
+                return logs
+            # everything that can raise comes before the graph changes
+            mid = ev.meta.get("messageId") if ev.meta else None
+            mid_src = self._by_mid.get(mid) if mid else None
+            hits, key = [], None
+            if math.isfinite(ev.amount):
+                for ck in self._candidate_keys(ev.token, ev.amount):
+                    for a in self._by_amount.get(ck, {}).values():
+                        if a.chain == ev.chain: continue
+                        if abs(a.amount - ev.amount) > self.tol * max(abs(a.amount), _TINY): continue
+                        ta = self._events[a.eid][1]
+                        if self.window and abs(ta - ts) > self.window: continue
+                        hits.append(a)
+                key = self._key(ev.token, ev.amount)
+            self.dag.add(ev)
+
+            self._watermark = max(self._watermark, ts)
+            self._in[ev.eid], self._out[ev.eid] = set(), set()
+            if mid:
+                if mid_src is not None:
+                    self._link(mid_src, ev.eid, 1.0)
+                    logs.append(f"link {mid_src} -> {ev.eid}")
+                else:
+                    self._by_mid[mid] = ev.eid
+            for a in hits:
+                self._link(a.eid, ev.eid, 0.7)
+                logs.append(f"p-link {a.eid} -> {ev.eid} (0.7)")
+            if key is not None:
+                self._by_amount.setdefault(key, {})[ev.eid] = ev
+
+            self._seq += 1
+            self._events[ev.eid] = (ev, ts, key, self._seq)
+            self._order.append(ev.eid)
+            self._evict()
+        return logs
+
+    def ingest_many(self, events: List[IntentEvent], now: float | None = None) -> List[str]:
+        """ingest() each event, after checking all of them, so a bad payload is rejected whole."""
+        for ev in events:
+            self._check_event(ev)
+            self._timestamp(ev, now)
+        logs = []
+        for ev in events:
+            logs += self.ingest(ev, now)
+        return logs
+
+    def _link(self, src: str, dst: str, confidence: float):
+        self.dag.link(src, dst, confidence=confidence)
+        self._out[src].add(dst)
+        self._in[dst].add(src)
+
+    def _evict(self) -> int:
+        cutoff = self._watermark - self.horizon_s
+        n = 0
+        while self._order:
+            eid = self._order[0]
+            rec = self._events.get(eid)
+            if rec is not None and rec[1] >= cutoff:
+                break
+            self._order.popleft()
+            if rec is None:
+                continue
+            ev, _, key, _ = rec
+            del self._events[eid]
+            if key is not None:
+                bucket = self._by_amount[key]
+                bucket.pop(eid, None)
+                if not bucket:
+                    del self._by_amount[key]
+            mid = ev.meta.get("messageId") if ev.meta else None
+            if mid and self._by_mid.get(mid) == eid:
+                del self._by_mid[mid]
+            for p in self._in.pop(eid):
+                self._out[p].discard(eid)
+            for c in self._out.pop(eid):
+                self._in[c].discard(eid)
+            self.dag.remove(eid)
+            n += 1
+        return n
+
+    def _component(self, eid: str) -> List[str]:
+        seen, stack = {eid}, [eid]
+        while stack:
+            e = stack.pop()
+            for nb in (self._in[e], self._out[e]):
+                for o in nb:
+                    if o not in seen:
+                        seen.add(o)
+                        stack.append(o)
+        return list(seen)
+
+    def check(self, eid: str) -> List[Issue] | None:
+        """
+        Conservation issues for the intent (linked component) containing eid,
+        or None if it is not retained. Only that component is walked; the
+        issues name its root, the earliest event without an incoming link.
+        """
+        with self._lock:
+            if eid not in self._events:
+                return None
+            comp = self._component(eid)
+            seq = lambda e: self._events[e][3]
+            roots = [e for e in comp if not self._in[e]]
+            root = min(roots or comp, key=seq)
+            flows: Dict[str, List[float]] = {}
+            for e in comp:
+                ev = self._events[e][0]
+                sg = FLOW_SIGNS.get(ev.kind, 0)
+                if sg:
+                    f = flows.setdefault(str(ev.token), [0.0, 0.0])
+                    f[0 if sg > 0 else 1] += ev.amount
+            return flow_issues([(root, tkn, o, i) for tkn, (o, i) in sorted(flows.items())], self.tol_bps)
+
+_ENGINE: CorrelationEngine | None = None
+_ENGINE_LOCK = threading.Lock()
+
+def get_engine() -> CorrelationEngine:
+    global _ENGINE
+    if _ENGINE is None:
+        with _ENGINE_LOCK:
+            if _ENGINE is None:
+                _ENGINE = CorrelationEngine()
+    return _ENGINE
@@ -0,0 +1,183 @@
+"""
+Streaming join of a bridge's source (bridge_out) and destination (bridge_in)
+events by messageId.
+
+join_bridge_events() pages through both chains concurrently and feeds the
+decoded chunks to a StreamingJoin, always taking the next chunk from the side
+that is further behind in time. The side that runs ahead blocks on its small
+queue, so neither chain is ever held in memory: what is kept is the events
+still waiting for their counterpart. A bridge_out waits until the destination
+has been scanned `max_delay_s` past it; a bridge_in waits until the source
+has been scanned `skew_s` past it (the deposit comes first). Whatever is left
+waiting then is emitted as expired, and `max_pending` caps each side outright.
+
+Event times come from the block timestamps of chunk boundaries (one
+eth_getBlockByNumber per chunk), interpolated by block number, and are set as
+meta["timestamp"] when the log does not carry its own.
+"""
+import asyncio, math
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Dict, List, Tuple
+from app.correlate.dag import IntentEvent
+from app.correlate.linkers import BridgeAdapter, _block_expr, decode_bridge_logs, dst_log_filter, src_log_filter
+from app.correlate.logfetch import AsyncLogFetcher
+
+SIDES = ("src", "dst")
+
+@dataclass
+class Joined:
+    status: str                     # matched | expired | evicted | open (still waiting when the scan ended)
+    message_id: str
+    src: IntentEvent | None = None
+    dst: IntentEvent | None = None
+    delay_s: float | None = None    # dst time - src time, matched pairs only
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"status": self.status, "message_id": self.message_id, "delay_s": self.delay_s,
+                "src": self.src.__dict__ if self.src else None, "dst": self.dst.__dict__ if self.dst else None}
+
+class StreamingJoin:
+    """
+    Symmetric hash join over two time-ordered streams. push() an event with
+    its time, advance() a side's watermark once everything up to it has been
+    pushed; both return the results they settle. Equal messageIds on one side
+    (identical deposits) pair first-in, first-out. Expiry can run late, never
+    early.
+    """
+    def __init__(self, max_delay_s: float, skew_s: float = 60.0, max_pending: int = 1_000_000):
+        self.wait_s = {"src": float(max_delay_s), "dst": float(skew_s)}
+        self.max_pending = max_pending
+        # side -> messageId -> FIFO of (time, event); keys in (roughly) oldest-first order
+        self.pending: Dict[str, "OrderedDict[str, Deque[Tuple[float, IntentEvent]]]"] = {s: OrderedDict() for s in SIDES}
+        self.size = {s: 0 for s in SIDES}
+        self.peak = {s: 0 for s in SIDES}
+        self.watermark = {s: -math.inf for s in SIDES}
+        self.counts = {"matched": 0, "expired": 0, "evicted": 0, "open": 0}
+
+    def _pop_oldest(self, side: str, mid: str | None = None) -> Tuple[str, float, IntentEvent]:
+        q = self.pending[side]
+        if mid is None:
+            mid = next(iter(q))
+        fifo = q[mid]
+        t, ev = fifo.popleft()
+        if fifo:
+            q.move_to_end(mid)
+        else:
+            del q[mid]
+        self.size[side] -= 1
+        return mid, t, ev
+
+    def _unmatched(self, side: str, status: str, mid: str, ev: IntentEvent) -> Joined:
+        self.counts[status] += 1
+        return Joined(status, mid, **{side: ev})
+
+    def push(self, side: str, ev: IntentEvent, t: float) -> List[Joined]:
+        other = "dst" if side == "src" else "src"
+        mid = ev.meta.get("messageId")
+        if mid is None:
+            return []
+        if mid in self.pending[other]:
+            _, t_other, ev_other = self._pop_oldest(other, mid)
+            src, dst = (ev, ev_other) if side == "src" else (ev_other, ev)
+            t_src, t_dst = (t, t_other) if side == "src" else (t_other, t)
+            self.counts["matched"] += 1
+            return [Joined("matched", mid, src, dst, t_dst - t_src)]
+        self.pending[side].setdefault(mid, deque()).append((t, ev))
+        self.size[side] += 1
+        self.peak[side] = max(self.peak[side], self.size[side])
+        out = []
+        while self.size[side] > self.max_pending:
+            m, _, e = self._pop_oldest(side)
+            out.append(self._unmatched(side, "evicted", m, e))
+        return out
+
+    def advance(self, side: str, watermark: float) -> List[Joined]:
+        """`side` has been scanned up to `watermark`: expire what the other side waited for in vain."""
+        self.watermark[side] = max(self.watermark[side], watermark)
+        other = "dst" if side == "src" else "src"
+        q, wait, out = self.pending[other], self.wait_s[other], []
+        while q:
+            fifo = q[next(iter(q))]
+            if fifo[0][0] + wait > self.watermark[side]:
+                break
+            m, _, e = self._pop_oldest(other)
+            out.append(self._unmatched(other, "expired", m, e))
+        return out
+
+    def close(self) -> List[Joined]:
+        """Everything still waiting, as `open`."""
+        out = []
+        for side in SIDES:
+            while self.pending[side]:
+                m, _, e = self._pop_oldest(side)
+                out.append(self._unmatched(side, "open", m, e))
+        return out
+
+async def _block_time(w3, number: int) -> float:
+    return float((await w3.eth.get_block(number))["timestamp"])
+
+def _stamp(evs: List[IntentEvent], b0: int, t0: float, b1: int, t1: float) -> List[float]:
+    """Times for events in blocks (b0, b1], linear between the two known block timestamps."""
+    rate = (t1 - t0) / (b1 - b0) if b1 > b0 else 0.0
+    ts = []
+    for ev in evs:
+        t = ev.meta.get("timestamp")
+        if t is None:
+            t = ev.meta["timestamp"] = t0 + (ev.meta["blockNumber"] - b0) * rate
+        ts.append(float(t))
+    return ts
+
+async def _produce(w3, adapter: BridgeAdapter, side: str, lo: int, hi: int, q: asyncio.Queue):
+    sd = adapter.side(side)
+    flt = src_log_filter(adapter) if side == "src" else dst_log_filter(adapter)
+    b_prev, t_prev = lo, await _block_time(w3, lo)
+    async for _, c_hi, logs in AsyncLogFetcher(w3, sd.chain).iter_chunks(flt, lo, hi):
+        t_hi = await _block_time(w3, c_hi)
+        evs, _ = decode_bridge_logs(adapter, logs, side)
+        await q.put((evs, _stamp(evs, b_prev, t_prev, c_hi, t_hi), t_hi))
+        b_prev, t_prev = c_hi, t_hi
+    await q.put(None)
+
+async def join_bridge_events(src_w3, dst_w3, adapter: BridgeAdapter, *, max_delay_s: float = 3600.0,
+                             skew_s: float = 60.0, max_pending: int = 1_000_000,
+                             queue_chunks: int = 4, join: StreamingJoin | None = None) -> AsyncIterator[Joined]:
+    """
+    Yield Joined results for the adapter's source range (from_block..to_block
+    on src_w3) against its destination range (dst_from_block..dst_to_block on
+    dst_w3), both AsyncWeb3. Memory is bounded by `max_pending` events per side
+    plus `queue_chunks` fetched chunks per side. Pass `join` to read its
+    counts and peaks afterwards.
+    """
+    (src_latest, dst_latest) = await asyncio.gather(src_w3.eth.block_number, dst_w3.eth.block_number)
+    ranges = {"src": (_block_expr(src_latest, adapter.from_block), _block_expr(src_latest, adapter.to_block)),
+              "dst": (_block_expr(dst_latest, adapter.dst_from_block), _block_expr(dst_latest, adapter.dst_to_block))}
+    w3s = {"src": src_w3, "dst": dst_w3}
+    queues = {s: asyncio.Queue(maxsize=max(1, queue_chunks)) for s in SIDES}
+    tasks = {s: asyncio.ensure_future(_produce(w3s[s], adapter, s, *ranges[s], queues[s])) for s in SIDES}
+    join = join or StreamingJoin(max_delay_s, skew_s, max_pending)
+    live = set(SIDES)
+    try:
+        while live:
+            side = min(live, key=lambda s: join.watermark[s])   # the side further behind goes next
+            get = asyncio.ensure_future(queues[side].get())
+            done, _ = await asyncio.wait({get, tasks[side]}, return_when=asyncio.FIRST_COMPLETED)
+            if get in done:
+                item = get.result()
+            else:
+                tasks[side].result()        # raises if the producer failed
+                item = await get            # it finished cleanly: the rest is queued
+            if item is None:
+                live.discard(side)
+                continue
+            evs, ts, watermark = item
+            for ev, t in zip(evs, ts):
+                for j in join.push(side, ev, t):
+                    yield j
+            for j in join.advance(side, watermark):
+                yield j
+        for j in join.close():
+            yield j
+    finally:
+        for t in tasks.values():
+            t.cancel()
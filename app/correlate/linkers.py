@@ -1,52 +1,177 @@
-from typing import List, Tuple
+from bisect import bisect_left, bisect_right
+from fractions import Fraction
+from typing import Any, Dict, List, Tuple
+from app.correlate.batch import EventBatch, to_units
 from app.correlate.dag import IntentDAG, IntentEvent
-from app.core.config import XCHAIN
-from eth_abi import decode as abi_decode
-from eth_utils import to_checksum_address
+from app.core.config import snapshot
+from app.core.metrics import DECODE_LOGS, stage
+from eth_hash.auto import keccak
 
-def deterministic_link(dag: IntentDAG, events: List[IntentEvent]) -> List[str]:
+# eth_abi / eth_utils / web3 load with the first bridge decode, not with the linkers
+def abi_decode(types, data):
+    from eth_abi import decode
+    return decode(types, data)
+
+def to_checksum_address(addr) -> str:
+    from eth_utils import to_checksum_address as checksum
+    return checksum(addr)
+
+def deterministic_link(dag: IntentDAG, events: List[IntentEvent] | EventBatch) -> List[str]:
     """
     Link by shared messageId (out/in). This assumes events meta have 'messageId'.
     """
+    if isinstance(events, EventBatch):
+        dag.add_batch(events)
+        rows = zip(events.eids, events.message_keys())
+    else:
+        for ev in events:
+            dag.add(ev)
+        rows = ((ev.eid, ev.meta.get("messageId")) for ev in events)
     by_id = {}
     logs = []
-    for ev in events:
-        dag.add(ev)
-        mid = ev.meta.get("messageId")
+    for eid, mid in rows:
         if not mid: continue
         if mid in by_id:
             # naive: first is out, second is in
-            dag.link(by_id[mid], ev.eid, confidence=1.0)
-            logs.append(f"link {by_id[mid]} -> {ev.eid}")
+            dag.link(by_id[mid], eid, confidence=1.0)
+            logs.append(f"link {by_id[mid]} -> {eid}")
         else:
-            by_id[mid] = ev.eid
+            by_id[mid] = eid
     return logs
 
-def probabilistic_link(dag: IntentDAG, events: List[IntentEvent]) -> List[str]:
+def _event_ts(ev: IntentEvent) -> float | None:
+    ts = ev.meta.get("timestamp") if ev.meta else None
+    return float(ts) if ts is not None else None
+
+def _index_by_token(events: List[IntentEvent], window: float | None) -> Dict[Any, Dict[Any, Tuple[list, list]]]:
+    # token -> time slot (None when untimed) -> (sorted amounts, event positions)
+    buckets: Dict[Any, Dict[Any, list]] = {}
+    for i, ev in enumerate(events):
+        if ev.amount != ev.amount:  # NaN never matches anything
+            continue
+        ts = _event_ts(ev) if window else None
+        slot = int(ts // window) if ts is not None else None
+        buckets.setdefault(ev.token, {}).setdefault(slot, []).append((ev.amount, i))
+    index = {}
+    for tkn, slots in buckets.items():
+        index[tkn] = {}
+        for slot, items in slots.items():
+            items.sort()
+            index[tkn][slot] = ([amt for amt, _ in items], [i for _, i in items])
+    return index
+
+def _link_batch(dag: IntentDAG, batch: EventBatch, tol_bps: float, window: float | None) -> List[str]:
+    # exact integer amounts: b matches a when |a - b| <= tol * |a|, i.e. b lies in the closed
+    # integer range a -/+ floor(tol * |a|), which bisect finds without a per-pair float check
+    tol = Fraction(tol_bps) / 10000
+    num, den = tol.numerator, tol.denominator
+    amounts = batch.amounts()
+    ts = batch.timestamps() if window else None
+    token, chain = batch.token, batch.chain
+    buckets: Dict[int, Dict[Any, list]] = {}
+    for i, a in enumerate(amounts):
+        if type(a) is not int:   # NaN / inf never match
+            continue
+        slot = int(ts[i] // window) if ts and ts[i] is not None else None
+        buckets.setdefault(token[i], {}).setdefault(slot, []).append((a, i))
+    index: Dict[int, Dict[Any, Tuple[list, list]]] = {}
+    for tkn, slots in buckets.items():
+        index[tkn] = {}
+        for slot, items in slots.items():
+            items.sort()
+            index[tkn][slot] = ([amt for amt, _ in items], [i for _, i in items])
+
+    logs, eids = [], None
+    for i, a in enumerate(amounts):
+        slots = index.get(token[i])
+        if slots is None or type(a) is not int:
+            continue
+        k = num * abs(a) // den
+        ta = ts[i] if ts else None
+        if ta is None:
+            cands = slots.values()
+        else:
+            s = int(ta // window)
+            cands = [slots[q] for q in (s-1, s, s+1, None) if q in slots]
+        hits = []
+        for amts, idxs in cands:
+            for p in range(bisect_left(amts, a - k), bisect_right(amts, a + k)):
+                j = idxs[p]
+                if j <= i or chain[i] == chain[j]: continue
+                if ta is not None:
+                    tb = ts[j]
+                    if tb is not None and abs(ta - tb) > window: continue
+                hits.append(j)
+        if hits:
+            hits.sort()
+            if eids is None:
+                eids = batch.eids
+            for j in hits:
+                dag.link(eids[i], eids[j], confidence=0.7)
+                logs.append(f"p-link {eids[i]} -> {eids[j]} (0.7)")
+    return logs
+
+def probabilistic_link(dag: IntentDAG, events: List[IntentEvent] | EventBatch, tol_bps: float | None = None,
+                       time_window_s: float | None = None) -> List[str]:
     """
     If no messageId, match by (token, amount within tol, time window).
+    Events are bucketed by token (and time slot when a window is configured)
+    and sorted by amount, so each event is only compared against the bisect
+    window of amounts inside the tolerance. An EventBatch is matched on its
+    exact integer amounts; IntentEvents on their float amounts.
     """
-    tol_bps = XCHAIN["probabilistic"]["amount_tol_bps"]
+    x = snapshot().crosschain
+    tol_bps = x.amount_tol_bps if tol_bps is None else tol_bps
+    window = (x.time_window_s if time_window_s is None else time_window_s) or None
+    if isinstance(events, EventBatch):
+        return _link_batch(dag, events, tol_bps, window)
+    tol = tol_bps / 10000
+    index = _index_by_token(events, window)
+
     logs = []
-    evs = events[:]
-    for i in range(len(evs)):
-        for j in range(i+1, len(evs)):
-            a, b = evs[i], evs[j]
-            if a.token != b.token: continue
-            if a.chain == b.chain: continue
-            base = max(abs(a.amount), 1e-12)
-            if abs(a.amount - b.amount) <= (tol_bps/10000)*base:
-                dag.link(a.eid, b.eid, confidence=0.7)
-                logs.append(f"p-link {a.eid} -> {b.eid} (0.7)")
+    for i, a in enumerate(events):
+        slots = index.get(a.token)
+        if slots is None or a.amount != a.amount:
+            continue
+        slack = tol * max(abs(a.amount), 1e-12)
+        # widen the window slightly; the exact predicate below decides
+        pad = slack * 1e-9 + 1e-300
+        ta = _event_ts(a) if window else None
+        if ta is None:
+            cands = slots.values()
+        else:
+            s = int(ta // window)
+            cands = [slots[k] for k in (s-1, s, s+1, None) if k in slots]
+        hits = []
+        for amts, idxs in cands:
+            lo = bisect_left(amts, a.amount - slack - pad)
+            hi = bisect_right(amts, a.amount + slack + pad)
+            for k in range(lo, hi):
+                j = idxs[k]
+                if j <= i: continue
+                b = events[j]
+                if a.chain == b.chain: continue
+                if abs(a.amount - b.amount) > slack: continue
+                if ta is not None:
+                    tb = _event_ts(b)
+                    if tb is not None and abs(ta - tb) > window: continue
+                hits.append(j)
+        hits.sort()
+        for j in hits:
+            b = events[j]
+            dag.link(a.eid, b.eid, confidence=0.7)
+            logs.append(f"p-link {a.eid} -> {b.eid} (0.7)")
     return logs
 
-
 from dataclasses import dataclass
-from typing import Dict, Any
-from web3 import Web3
-from eth_abi import abi
+from functools import cached_property
+from typing import TYPE_CHECKING, Dict, Any
 from app.core.utils import stable_hash
 from app.correlate.dag import IntentEvent
+from app.correlate.logfetch import AsyncLogFetcher, LogFetcher
+
+if TYPE_CHECKING:
+    from web3 import Web3
 
 @dataclass
 class BridgeAdapter:
@@ -58,13 +183,68 @@ class BridgeAdapter:
     fields: Dict[str, Any]           # mapping (see config)
     from_block: str = "latest-5000"  # supports "latest-N"
     to_block: str   = "latest"
+    # destination side (the bridge_in event); fields default to the source mapping
+    dst_address: str | None = None
+    dst_event_signature: str | None = None   # e.g., "DepositFinalized(address,address,address,address,uint256,bytes)"
+    dst_fields: Dict[str, Any] | None = None
+    dst_from_block: str = "latest-5000"      # against the destination chain's head
+    dst_to_block: str   = "latest"
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> "BridgeAdapter":
+        """From one `bridges:` entry of config.yaml."""
+        return cls(
+            name=cfg["name"],
+            src_chain=int(cfg["src_chain"]),
+            dst_chain=int(cfg["dst_chain"]),
+            src_address=cfg["src_address"],
+            event_signature=cfg["event_signature"],
+            fields=cfg["fields"],
+            from_block=cfg.get("from_block", "latest-5000"),
+            to_block=cfg.get("to_block", "latest"),
+            dst_address=cfg.get("dst_address"),
+            dst_event_signature=cfg.get("dst_event_signature"),
+            dst_fields=cfg.get("dst_fields"),
+            dst_from_block=cfg.get("dst_from_block", "latest-5000"),
+            dst_to_block=cfg.get("dst_to_block", "latest"),
+        )
+
+    @cached_property
+    def topic0(self) -> str:
+        return "0x" + keccak(self.event_signature.encode("utf-8")).hex()
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """Hash of what decides the source rows of a block range: filter (address, event, chain) and fields."""
+        return stable_hash({"address": self.src_address.lower(), "topic0": self.topic0,
+                            "chain": self.src_chain, "fields": self.fields})
+
+    def side(self, side: str) -> "_Side":
+        if side == "src":
+            return _Side(self.src_chain, self.src_address, self.event_signature, self.fields, "bridge_out")
+        if side != "dst":
+            raise ValueError(f"side must be 'src' or 'dst', not {side!r}")
+        if not (self.dst_address and self.dst_event_signature):
+            raise ValueError(f"adapter {self.name} has no destination side (dst_address, dst_event_signature)")
+        return _Side(self.dst_chain, self.dst_address, self.dst_event_signature, self.dst_fields or self.fields,
+                     "bridge_in")
+
+@dataclass(frozen=True)
+class _Side:
+    chain: int
+    address: str
+    event_signature: str
+    fields: Dict[str, Any]
+    kind: str
 
     @property
     def topic0(self) -> str:
-        return Web3.keccak(text=self.event_signature).hex()
+        return "0x" + keccak(self.event_signature.encode("utf-8")).hex()
+
+def _resolve_block(w3: "Web3", expr: str) -> int:
+    return _block_expr(w3.eth.block_number, expr)
 
-def _resolve_block(w3: Web3, expr: str) -> int:
-    latest = w3.eth.block_number
+def _block_expr(latest: int, expr: str) -> int:
     if expr == "latest": return latest
     if expr.startswith("latest-"): return max(0, latest - int(expr.split("-",1)[1]))
     if expr.startswith("0x"): return int(expr, 16)
@@ -75,13 +255,19 @@ def _addr_from_topic(topic_hex: str) -> str:
     b = bytes.fromhex(topic_hex[2:] if topic_hex.startswith("0x") else topic_hex)
     return to_checksum_address("0x" + b[-20:].hex())
 
+def _as_bytes(data) -> bytes:
+    # web3 hands back HexBytes; raw JSON-RPC payloads carry 0x-hex strings
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return bytes(data)
+    return bytes.fromhex(data[2:] if data.startswith("0x") else data)
+
 def _decode_erc20_deposit_try_abi(data_names: list[str], data_hex: str) -> dict:
     """
     ABI path for data-only fields: ["to","amount","extraData"] -> (address,uint256,bytes)
     """
     type_map = {"to":"address","amount":"uint256","extraData":"bytes"}
     data_types = [type_map[n] for n in data_names]
-    data_bytes = bytes.fromhex(data_hex[2:] if isinstance(data_hex, str) and data_hex.startswith("0x") else data_hex)
+    data_bytes = _as_bytes(data_hex)
     vals = abi_decode(data_types, data_bytes)
     out = {}
     for n, v in zip(data_names, vals):
@@ -101,7 +287,7 @@ def _decode_erc20_deposit_fallback(data_names: list[str], data_hex: str) -> dict
     """
     Manual parse fallback (no ABI lib), assuming (address,uint256,bytes) in the data section.
     """
-    raw = bytes.fromhex(data_hex[2:] if isinstance(data_hex, str) and data_hex.startswith("0x") else data_hex)
+    raw = _as_bytes(data_hex)
     out = {}
     if "to" in data_names and len(raw) >= 32:
         out["to"] = to_checksum_address("0x" + raw[12:32].hex())
@@ -135,56 +321,195 @@ def _decode_event_data(event_sig: str, log, indexed_names: list[str], data_names
             out[k] = to_checksum_address(out[k])
     return out
 
+_DATA_TYPES = {"to": "address", "amount": "uint256", "extraData": "bytes"}
+
+def _topic_bytes(t) -> bytes:
+    return bytes(t) if isinstance(t, (bytes, bytearray)) else bytes.fromhex(t[2:] if t.startswith("0x") else t)
+
+def _decode_data_head(mv: memoryview, types: list[str], out: Dict[str, Any], names: list[str], cs) -> bool:
+    """
+    Slice one canonically encoded data section straight out of `mv`. Returns
+    False for anything eth_abi might treat differently (dirty padding,
+    non-canonical offsets, trailing bytes) so the caller can take the slow path.
+    """
+    end = 32 * len(types)
+    if len(mv) < end:
+        return False
+    for k, (name, typ) in enumerate(zip(names, types)):
+        w = mv[32 * k: 32 * k + 32]
+        if typ == "address":
+            if any(w[:12]):
+                return False
+            out[name] = cs(bytes(w[12:]))
+        elif typ == "uint256":
+            out[name] = int.from_bytes(w, "big")
+        else:
+            if int.from_bytes(w, "big") != end or len(mv) < end + 32:
+                return False
+            n = int.from_bytes(mv[end: end + 32], "big")
+            stop = end + 32 + n
+            padded = end + 32 + -(-n // 32) * 32
+            if padded > len(mv) or any(mv[stop:padded]):
+                return False
+            out[name] = mv[end + 32: stop].hex()   # same shape as the ABI path (no 0x)
+            end = padded
+    return end == len(mv)
+
+def _decode_columns(logs: list, indexed_names: list[str], data_names: list[str]) -> Tuple[Dict[str, list], list]:
+    """
+    Decode fixed-layout logs in one pass into per-field columns. Rows that do
+    not fit the canonical layout are None in `ok` and must go through
+    _decode_event_data. Checksummed addresses are cached for the batch, since
+    tokens and senders repeat heavily.
+    """
+    names = list(dict.fromkeys(indexed_names + data_names))
+    cols: Dict[str, list] = {n: [None] * len(logs) for n in names}
+    ok = [False] * len(logs)
+    if any(n not in _DATA_TYPES for n in data_names):
+        return cols, ok
+    types = [_DATA_TYPES[n] for n in data_names]
+    seen: Dict[bytes, str] = {}
+    def cs(b20: bytes) -> str:
+        a = seen.get(b20)
+        if a is None:
+            a = seen[b20] = to_checksum_address(b20)
+        return a
+
+    row: Dict[str, Any] = {}
+    for k, lg in enumerate(logs):
+        topics = lg["topics"]
+        if len(topics) <= len(indexed_names):
+            continue
+        row.clear()
+        try:
+            for i, name in enumerate(indexed_names, start=1):
+                row[name] = cs(_topic_bytes(topics[i])[-20:])
+            if not _decode_data_head(memoryview(_as_bytes(lg["data"])), types, row, data_names, cs):
+                continue
+        except (ValueError, TypeError):
+            continue
+        for n, v in row.items():
+            cols[n][k] = v
+        ok[k] = True
+    return cols, ok
+
 
 def _message_id(components: list[str], decoded: Dict[str, Any]) -> str:
     material = {k: decoded.get(k) for k in components}
     return stable_hash(material)
 
-def fetch_bridge_src_events(w3: Web3, adapter: BridgeAdapter) -> list[IntentEvent]:
-    from_b = _resolve_block(w3, adapter.from_block)
-    to_b   = _resolve_block(w3, adapter.to_block)
-    logs = w3.eth.get_logs({
-        "address": Web3.to_checksum_address(adapter.src_address),
-        "fromBlock": from_b,
-        "toBlock": to_b,
+def src_log_filter(adapter: BridgeAdapter) -> Dict[str, Any]:
+    return {
+        "address": to_checksum_address(adapter.src_address),
         "topics": [adapter.topic0]
-    })
+    }
 
-    indexed = adapter.fields.get("indexed", ["l1Token","l2Token","from"])
-    data    = adapter.fields.get("data",    ["to","amount","extraData"])
+def dst_log_filter(adapter: BridgeAdapter) -> Dict[str, Any]:
+    dst = adapter.side("dst")
+    return {
+        "address": to_checksum_address(dst.address),
+        "topics": [dst.topic0]
+    }
+
+def _decode_rows(adapter: BridgeAdapter, logs: list, side: str, emit) -> Dict[str, int]:
+    """Decode `logs` and call emit(eid, side, token, raw amount, meta) per event; rows emit rejects are skipped."""
+    sd = adapter.side(side)
+    fields = sd.fields
+    indexed = fields.get("indexed", ["l1Token","l2Token","from"])
+    data    = fields.get("data",    ["to","amount","extraData"])
 
-    evs: list[IntentEvent] = []
     ok, fail = 0, 0
+    cols, fast = _decode_columns(logs, indexed, data)
+    names = list(cols)
 
-    for lg in logs:
+    for k, lg in enumerate(logs):
         try:
-            decoded = _decode_event_data(adapter.event_signature, lg, indexed, data)
-            mid = _message_id(adapter.fields["message_id_components"], decoded)
-            token = decoded.get(adapter.fields["token"])
-            amt_raw = decoded.get(adapter.fields["amount"])
-            try:
-                amt = float(amt_raw)
-            except Exception:
-                amt = float(int(str(amt_raw), 0)) if isinstance(amt_raw, str) and str(amt_raw).startswith("0x") else float(amt_raw)
-
-            evs.append(IntentEvent(
-                eid = lg["transactionHash"].hex() + ":" + str(lg["logIndex"]),
-                chain = adapter.src_chain,
-                kind = "bridge_out",
-                token = token,
-                amount = amt,
-                meta = {
-                    "messageId": mid,
-                    "adapter": adapter.name,
-                    "from": decoded.get("from"),
-                    "to": decoded.get("to")
-                }
-            ))
+            if fast[k]:
+                decoded = {n: cols[n][k] for n in names}
+            else:
+                decoded = _decode_event_data(sd.event_signature, lg, indexed, data)
+            mid = _message_id(fields["message_id_components"], decoded)
+            emit(lg["transactionHash"].hex() + ":" + str(lg["logIndex"]), sd,
+                 decoded.get(fields["token"]), decoded.get(fields["amount"]),
+                 {
+                     "messageId": mid,
+                     "adapter": adapter.name,
+                     "from": decoded.get("from"),
+                     "to": decoded.get("to"),
+                     "blockNumber": int(lg["blockNumber"]),
+                 })
             ok += 1
         except Exception:
             fail += 1
             continue
 
+    stats = {"decoded": ok, "skipped": fail, "total_logs": len(logs), "slow_path": fast.count(False)}
+    for outcome in ("decoded", "skipped", "slow_path"):
+        if stats[outcome]:
+            DECODE_LOGS.inc(stats[outcome], adapter.name, outcome)
+    return stats
+
+@stage("bridge.decode")
+def decode_bridge_logs(adapter: BridgeAdapter, logs: list, side: str = "src") -> Tuple[list[IntentEvent], Dict[str, int]]:
+    """Source logs become bridge_out events, destination logs (side="dst") bridge_in events."""
+    evs: list[IntentEvent] = []
+
+    def emit(eid, sd, token, amt_raw, meta):
+        try:
+            amt = float(amt_raw)
+        except Exception:
+            amt = float(int(str(amt_raw), 0)) if isinstance(amt_raw, str) and str(amt_raw).startswith("0x") else float(amt_raw)
+        evs.append(IntentEvent(eid=eid, chain=sd.chain, kind=sd.kind, token=token, amount=amt, meta=meta))
+
+    return evs, _decode_rows(adapter, logs, side, emit)
+
+@stage("bridge.decode")
+def decode_bridge_batch(adapter: BridgeAdapter, logs: list, side: str = "src") -> Tuple[EventBatch, Dict[str, int]]:
+    """decode_bridge_logs into an EventBatch, keeping the exact token amounts (scale 0)."""
+    batch = EventBatch()
+
+    def emit(eid, sd, token, amt_raw, meta):
+        batch.append(eid, sd.chain, sd.kind, token, to_units(amt_raw, 0), meta)
+
+    return batch, _decode_rows(adapter, logs, side, emit)
+
+def fetch_bridge_src_events(w3: "Web3", adapter: BridgeAdapter) -> list[IntentEvent]:
+    from_b = _resolve_block(w3, adapter.from_block)
+    to_b   = _resolve_block(w3, adapter.to_block)
+    logs = LogFetcher(w3, adapter.src_chain).fetch(src_log_filter(adapter), from_b, to_b)
+    evs, stats = decode_bridge_logs(adapter, logs)
+    if evs:
+        evs[0].meta["decode_stats"] = stats
+    return evs
+
+async def fetch_bridge_src_events_async(w3, adapter: BridgeAdapter) -> list[IntentEvent]:
+    """fetch_bridge_src_events over an AsyncWeb3."""
+    latest = await w3.eth.block_number
+    from_b = _block_expr(latest, adapter.from_block)
+    to_b   = _block_expr(latest, adapter.to_block)
+    logs = await AsyncLogFetcher(w3, adapter.src_chain).fetch(src_log_filter(adapter), from_b, to_b)
+    evs, stats = decode_bridge_logs(adapter, logs)
+    if evs:
+        evs[0].meta["decode_stats"] = stats
+    return evs
+
+def fetch_bridge_dst_events(w3: "Web3", adapter: BridgeAdapter) -> list[IntentEvent]:
+    """bridge_in events of the adapter's destination side, over dst_from_block..dst_to_block."""
+    from_b = _resolve_block(w3, adapter.dst_from_block)
+    to_b   = _resolve_block(w3, adapter.dst_to_block)
+    logs = LogFetcher(w3, adapter.dst_chain).fetch(dst_log_filter(adapter), from_b, to_b)
+    evs, stats = decode_bridge_logs(adapter, logs, "dst")
+    if evs:
+        evs[0].meta["decode_stats"] = stats
+    return evs
+
+async def fetch_bridge_dst_events_async(w3, adapter: BridgeAdapter) -> list[IntentEvent]:
+    """fetch_bridge_dst_events over an AsyncWeb3."""
+    latest = await w3.eth.block_number
+    from_b = _block_expr(latest, adapter.dst_from_block)
+    to_b   = _block_expr(latest, adapter.dst_to_block)
+    logs = await AsyncLogFetcher(w3, adapter.dst_chain).fetch(dst_log_filter(adapter), from_b, to_b)
+    evs, stats = decode_bridge_logs(adapter, logs, "dst")
     if evs:
-        evs[0].meta["decode_stats"] = {"decoded": ok, "skipped": fail, "total_logs": len(logs)}
-    return evs
\ No newline at end of file
+        evs[0].meta["decode_stats"] = stats
+    return evs
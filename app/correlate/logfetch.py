@@ -0,0 +1,211 @@
+import asyncio, re, threading, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple
+from app.core.config import snapshot
+from app.core.deadline import budget
+from app.core.metrics import stage
+
+# Provider replies meaning "ask for less" (Alchemy, Infura, QuickNode, Ankr, geth, erigon, ...)
+_RANGE_ERR = re.compile(
+    r"block range|range (is )?too|too (large|many|big|wide)|more than \d+ (results|logs|blocks)|"
+    r"(response|result) size|exceed\w* (the )?(max\w* )?(block )?(range|results?|response|logs)|query timeout", re.I)
+
+# ... and "slow down": the same request goes through later (Infura reuses -32005 for these)
+_RATE_ERR = re.compile(r"\brate|request count|too many requests|throttl|capacity|compute units", re.I)
+
+def _error_of(exc: Exception) -> Tuple[Any, int | None, str]:
+    err = exc.args[0] if exc.args else None
+    if isinstance(err, dict):
+        return err.get("code"), None, str(err.get("message", ""))
+    resp = getattr(exc, "response", None)
+    status = getattr(resp, "status_code", getattr(exc, "status", None))
+    return None, status, f"{type(exc).__name__} {exc}"
+
+def is_rate_limited(exc: Exception) -> bool:
+    """True if the provider turned a call away for its request rate or quota, not for what it asked."""
+    code, status, msg = _error_of(exc)
+    return status == 429 or code == 429 or bool(_RATE_ERR.search(msg))
+
+def is_range_error(exc: Exception) -> bool:
+    """True if the provider rejected a get_logs call because the range/result set was too big."""
+    if is_rate_limited(exc):
+        return False
+    code, status, msg = _error_of(exc)
+    return status == 413 or bool(_RANGE_ERR.search(msg))
+
+@dataclass
+class FetchSettings:
+    chunk_blocks: int = 2000        # first chunk size
+    min_chunk_blocks: int = 1
+    max_chunk_blocks: int = 100_000
+    concurrency: int = 4            # per-chain in-flight get_logs calls (shared across requests)
+    rate_retries: int = 5           # rate-limited calls are re-sent this often, backing off, before failing
+    backoff_ms: int = 250           # first backoff; doubles per retry, within the request deadline
+
+def settings_for_chain(chain_id: int | None) -> FetchSettings:
+    g = (snapshot().raw.get("global", {}) or {}).get("log_fetch", {}) or {}
+    per_chain = (g.get("per_chain", {}) or {}).get(chain_id, {}) or {}
+    merged = {**{k: v for k, v in g.items() if k != "per_chain"}, **per_chain}
+    known = FetchSettings.__dataclass_fields__
+    return FetchSettings(**{k: int(v) for k, v in merged.items() if k in known})
+
+_CHAIN_SLOTS: Dict[Any, threading.BoundedSemaphore] = {}
+_CHAIN_SLOTS_LOCK = threading.Lock()
+
+def _chain_slots(chain_id, limit: int) -> threading.BoundedSemaphore:
+    with _CHAIN_SLOTS_LOCK:
+        sem = _CHAIN_SLOTS.get(chain_id)
+        if sem is None:
+            sem = _CHAIN_SLOTS[chain_id] = threading.BoundedSemaphore(max(1, limit))
+        return sem
+
+class LogFetcher:
+    """
+    Chunked eth_getLogs over [from_block, to_block]. Chunks that the provider
+    rejects as too large are split in half and the working size shrinks; every
+    success grows it again (up to max_chunk_blocks). A rate-limited chunk is
+    re-sent unchanged after a backoff. Up to `concurrency` chunks are in
+    flight per chain and results come back in block order.
+    """
+    def __init__(self, w3, chain_id: int | None = None, settings: FetchSettings | None = None):
+        self.w3 = w3
+        self.chain_id = chain_id
+        self.settings = settings or settings_for_chain(chain_id)
+        self._slots = _chain_slots(chain_id if chain_id is not None else id(w3), self.settings.concurrency)
+        self.calls = 0
+        self.splits = 0
+        self.rate_limited = 0
+
+    def _get_logs(self, params: Dict[str, Any], lo: int, hi: int) -> list:
+        st = self.settings
+        for attempt in range(st.rate_retries + 1):
+            try:
+                with self._slots:
+                    self.calls += 1
+                    return list(self.w3.eth.get_logs({**params, "fromBlock": lo, "toBlock": hi}))
+            except Exception as e:
+                if attempt == st.rate_retries or not is_rate_limited(e):
+                    raise
+            self.rate_limited += 1
+            # waits without holding a slot
+            time.sleep(budget(st.backoff_ms / 1000 * 2 ** attempt))
+
+    def iter_chunks(self, params: Dict[str, Any], from_block: int, to_block: int) -> Iterator[Tuple[int, int, list]]:
+        """Yield (lo, hi, logs) for consecutive block ranges covering the span, in order."""
+        st = self.settings
+        size = max(st.min_chunk_blocks, min(st.chunk_blocks, st.max_chunk_blocks))
+        next_lo = from_block
+        retry: List[Tuple[int, int]] = []      # split halves waiting to be re-sent, lowest first
+        done: Dict[int, Tuple[int, list]] = {}
+        emit = from_block
+        with ThreadPoolExecutor(max_workers=max(1, st.concurrency)) as pool:
+            inflight: Dict[Any, Tuple[int, int]] = {}
+            while emit <= to_block:
+                while len(inflight) < st.concurrency and (retry or next_lo <= to_block):
+                    if retry:
+                        lo, hi = retry.pop(0)
+                    else:
+                        lo, hi = next_lo, min(to_block, next_lo + size - 1)
+                        next_lo = hi + 1
+                    inflight[pool.submit(self._get_logs, params, lo, hi)] = (lo, hi)
+                finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    lo, hi = inflight.pop(fut)
+                    try:
+                        done[lo] = (hi, fut.result())
+                        size = min(st.max_chunk_blocks, size * 2)
+                    except Exception as e:
+                        if hi <= lo or not is_range_error(e):
+                            for f in inflight:
+                                f.cancel()
+                            raise
+                        mid = (lo + hi) // 2
+                        retry.extend([(lo, mid), (mid + 1, hi)])
+                        retry.sort()
+                        self.splits += 1
+                        size = max(st.min_chunk_blocks, min(size, hi - lo + 1) // 2)
+                while emit in done:
+                    hi, logs = done.pop(emit)
+                    yield emit, hi, logs
+                    emit = hi + 1
+
+    @stage("bridge.get_logs")
+    def fetch(self, params: Dict[str, Any], from_block: int, to_block: int) -> list:
+        out: list = []
+        for _, _, logs in self.iter_chunks(params, from_block, to_block):
+            out.extend(logs)
+        return out
+
+class AsyncLogFetcher:
+    """
+    LogFetcher for AsyncWeb3: the same adaptive chunking and in-order output,
+    with up to `concurrency` chunks in flight as tasks. The shared per-upstream
+    limit is enforced by the AsyncRpcClient behind `w3`.
+    """
+    def __init__(self, w3, chain_id: int | None = None, settings: FetchSettings | None = None):
+        self.w3 = w3
+        self.chain_id = chain_id
+        self.settings = settings or settings_for_chain(chain_id)
+        self.calls = 0
+        self.splits = 0
+        self.rate_limited = 0
+
+    async def _get_logs(self, params: Dict[str, Any], lo: int, hi: int) -> list:
+        st = self.settings
+        for attempt in range(st.rate_retries + 1):
+            try:
+                self.calls += 1
+                return list(await self.w3.eth.get_logs({**params, "fromBlock": lo, "toBlock": hi}))
+            except Exception as e:
+                if attempt == st.rate_retries or not is_rate_limited(e):
+                    raise
+            self.rate_limited += 1
+            await asyncio.sleep(budget(st.backoff_ms / 1000 * 2 ** attempt))
+
+    async def iter_chunks(self, params: Dict[str, Any], from_block: int, to_block: int) -> AsyncIterator[Tuple[int, int, list]]:
+        """Yield (lo, hi, logs) for consecutive block ranges covering the span, in order."""
+        st = self.settings
+        size = max(st.min_chunk_blocks, min(st.chunk_blocks, st.max_chunk_blocks))
+        next_lo = from_block
+        retry: List[Tuple[int, int]] = []
+        done: Dict[int, Tuple[int, list]] = {}
+        emit = from_block
+        inflight: Dict[asyncio.Task, Tuple[int, int]] = {}
+        try:
+            while emit <= to_block:
+                while len(inflight) < st.concurrency and (retry or next_lo <= to_block):
+                    if retry:
+                        lo, hi = retry.pop(0)
+                    else:
+                        lo, hi = next_lo, min(to_block, next_lo + size - 1)
+                        next_lo = hi + 1
+                    inflight[asyncio.ensure_future(self._get_logs(params, lo, hi))] = (lo, hi)
+                finished, _ = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    lo, hi = inflight.pop(task)
+                    try:
+                        done[lo] = (hi, task.result())
+                        size = min(st.max_chunk_blocks, size * 2)
+                    except Exception as e:
+                        if hi <= lo or not is_range_error(e):
+                            raise
+                        mid = (lo + hi) // 2
+                        retry.extend([(lo, mid), (mid + 1, hi)])
+                        retry.sort()
+                        self.splits += 1
+                        size = max(st.min_chunk_blocks, min(size, hi - lo + 1) // 2)
+                while emit in done:
+                    hi, logs = done.pop(emit)
+                    yield emit, hi, logs
+                    emit = hi + 1
+        finally:
+            for task in inflight:
+                task.cancel()
+
+    async def fetch(self, params: Dict[str, Any], from_block: int, to_block: int) -> list:
+        out: list = []
+        with stage("bridge.get_logs"):
+            async for _, _, logs in self.iter_chunks(params, from_block, to_block):
+                out.extend(logs)
+        return out
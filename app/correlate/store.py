@@ -0,0 +1,229 @@
+import asyncio, os, threading, weakref
+from typing import TYPE_CHECKING, Dict, List, Tuple
+from sqlalchemy import (JSON, Column, Integer, MetaData, String, Table, and_, create_engine, delete,
+                        inspect, select)
+from app.core.config import snapshot
+from app.core.metrics import stage
+from app.correlate.dag import IntentEvent
+from app.correlate.linkers import BridgeAdapter, _block_expr, decode_bridge_batch, src_log_filter
+from app.correlate.logfetch import AsyncLogFetcher, LogFetcher
+
+if TYPE_CHECKING:
+    from web3 import Web3
+
+_md = MetaData()
+
+bridge_events = Table(
+    "bridge_events", _md,
+    Column("adapter", String, primary_key=True),
+    Column("block", Integer, primary_key=True),
+    Column("log_index", Integer, primary_key=True),
+    Column("eid", String, nullable=False),
+    Column("chain", Integer, nullable=False),
+    Column("kind", String, nullable=False),
+    Column("token", String),
+    Column("amount", String),      # decimal text: exact whatever the backend's float width
+    Column("meta", JSON),
+)
+
+# [lo, hi] is the contiguous, finalized block span already stored for the adapter,
+# decoded under the adapter config with this fingerprint (BridgeAdapter.fingerprint)
+sync_state = Table(
+    "sync_state", _md,
+    Column("adapter", String, primary_key=True),
+    Column("lo", Integer, nullable=False),
+    Column("hi", Integer, nullable=False),
+    Column("fingerprint", String, nullable=False),
+)
+
+def _decode(adapter: BridgeAdapter, logs: list) -> Tuple[List[IntentEvent], Dict[str, int]]:
+    """decode_bridge_logs, but with each amount the exact integer the log carries instead of its float."""
+    batch, stats = decode_bridge_batch(adapter, logs)
+    return [IntentEvent(batch.eid(i), ev.chain, ev.kind, ev.token, batch.amount(i), ev.meta)
+            for i, ev in enumerate(batch)], stats
+
+def _amount_text(a) -> str | None:
+    # repr round-trips a float exactly; ints keep every digit
+    return None if a is None else str(a) if isinstance(a, int) else repr(float(a))
+
+def _amount_value(s: str | None):
+    if s is None:
+        return None
+    try:
+        return int(s)
+    except ValueError:
+        return float(s)
+
+def _store_cfg() -> dict:
+    return (snapshot().raw.get("global", {}) or {}).get("event_store", {}) or {}
+
+class EventStore:
+    """Decoded bridge events on disk (SQLite by default), keyed by adapter and block."""
+    def __init__(self, url: str | None = None):
+        url = url or os.getenv("INTENT_GUARD_STORE_URL") or _store_cfg().get("url", "sqlite:///intent_guard_events.db")
+        self.engine = create_engine(url)
+        insp = inspect(self.engine)
+        if insp.has_table("sync_state") and "fingerprint" not in {c["name"] for c in insp.get_columns("sync_state")}:
+            _md.drop_all(self.engine)   # a cache written before fingerprints and exact amounts: refetch
+        _md.create_all(self.engine)
+        self._forget_rounded()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._alocks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Lock]]" = \
+            weakref.WeakKeyDictionary()
+
+    def _forget_rounded(self):
+        # log amounts are integers: a stored "1e+18" or "0.5" was written through a float before
+        # amounts were kept exact, so that adapter's span is dropped and refetched in full
+        t = bridge_events.c
+        rounded = select(t.adapter).where(t.amount.contains(".") | t.amount.contains("e")).distinct()
+        with self.engine.begin() as c:
+            c.execute(delete(sync_state).where(sync_state.c.adapter.in_(rounded)))
+
+    def lock(self, adapter: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(adapter, threading.Lock())
+
+    def alock(self, adapter: str) -> asyncio.Lock:
+        """Per-adapter lock for the async path (asyncio locks belong to one event loop)."""
+        loop = asyncio.get_running_loop()
+        with self._locks_lock:
+            per_loop = self._alocks.setdefault(loop, {})
+            return per_loop.setdefault(adapter, asyncio.Lock())
+
+    def span(self, adapter: str, fingerprint: str) -> Tuple[int, int] | None:
+        """Stored span for the adapter; None when nothing is stored or it was decoded under another config."""
+        t = sync_state.c
+        with self.engine.connect() as c:
+            row = c.execute(select(t.lo, t.hi, t.fingerprint).where(t.adapter == adapter)).first()
+        return (row.lo, row.hi) if row and row.fingerprint == fingerprint else None
+
+    @stage("store.put")
+    def put(self, adapter: str, fingerprint: str, events: List[IntentEvent], lo: int, hi: int,
+            span: Tuple[int, int]):
+        """
+        Replace blocks [lo, hi] for the adapter and record `span` as the stored
+        range, atomically. Rows stored under another fingerprint are all dropped.
+        """
+        rows = [{
+            "adapter": adapter, "block": ev.meta["blockNumber"], "log_index": int(ev.eid.rsplit(":", 1)[1]),
+            "eid": ev.eid, "chain": ev.chain, "kind": ev.kind, "token": ev.token, "amount": _amount_text(ev.amount),
+            "meta": {k: v for k, v in ev.meta.items() if k != "decode_stats"},
+        } for ev in events]
+        t = bridge_events.c
+        with self.engine.begin() as c:
+            old = c.execute(select(sync_state.c.fingerprint).where(sync_state.c.adapter == adapter)).scalar()
+            stale = t.adapter == adapter
+            if old == fingerprint:
+                stale = and_(stale, t.block >= lo, t.block <= hi)
+            c.execute(delete(bridge_events).where(stale))
+            if rows:
+                c.execute(bridge_events.insert(), rows)
+            c.execute(delete(sync_state).where(sync_state.c.adapter == adapter))
+            c.execute(sync_state.insert(), {"adapter": adapter, "lo": span[0], "hi": span[1],
+                                            "fingerprint": fingerprint})
+
+    @stage("store.load")
+    def load(self, adapter: str, lo: int, hi: int) -> List[IntentEvent]:
+        t = bridge_events.c
+        q = (select(t.eid, t.chain, t.kind, t.token, t.amount, t.meta)
+             .where(and_(t.adapter == adapter, t.block >= lo, t.block <= hi))
+             .order_by(t.block, t.log_index))
+        with self.engine.connect() as c:
+            return [IntentEvent(r.eid, r.chain, r.kind, r.token, _amount_value(r.amount), dict(r.meta or {}))
+                    for r in c.execute(q)]
+
+_STORE: EventStore | None = None
+_STORE_LOCK = threading.Lock()
+
+def get_store() -> EventStore:
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = EventStore()
+    return _STORE
+
+def _plan(span: Tuple[int, int] | None, from_b: int, final: int) -> List[Tuple[int, int, Tuple[int, int]]]:
+    """Ranges (lo, hi, stored span afterwards) to fetch and persist so the span covers [from_b, final]."""
+    if final < from_b:
+        return []
+    if span is None or from_b > span[1] + 1 or final < span[0] - 1:
+        # nothing usable on disk (or a gap): start a fresh span
+        return [(from_b, final, (from_b, final))]
+    steps = []
+    if from_b < span[0]:
+        steps.append((from_b, span[0] - 1, (from_b, span[1])))
+        span = (from_b, span[1])
+    if final > span[1]:
+        steps.append((span[1] + 1, final, (span[0], final)))
+    return steps
+
+def fetch_bridge_src_events_cached(w3: "Web3", adapter: BridgeAdapter, store: EventStore,
+                                   confirmations: int | None = None) -> list[IntentEvent]:
+    """
+    fetch_bridge_src_events backed by the store: only blocks outside the stored
+    span are requested from the RPC. Blocks deeper than `confirmations` are
+    persisted; the unfinalized tail is fetched live every time. Amounts are
+    the exact integer token amounts from the logs, stored and returned as such.
+    """
+    if confirmations is None:
+        confirmations = int(_store_cfg().get("confirmations", 64))
+    head = w3.eth.block_number
+    from_b = _block_expr(head, adapter.from_block)
+    to_b = _block_expr(head, adapter.to_block)
+    final = min(to_b, head - confirmations)
+    fetcher = LogFetcher(w3, adapter.src_chain)
+    flt = src_log_filter(adapter)
+    stats = {"decoded": 0, "skipped": 0, "total_logs": 0, "slow_path": 0}
+
+    def pull(lo: int, hi: int) -> list[IntentEvent]:
+        evs, st = _decode(adapter, fetcher.fetch(flt, lo, hi))
+        for k in stats:
+            stats[k] += st[k]
+        return evs
+
+    with store.lock(adapter.name):
+        span = store.span(adapter.name, adapter.fingerprint)
+        for lo, hi, span in _plan(span, from_b, final):
+            store.put(adapter.name, adapter.fingerprint, pull(lo, hi), lo, hi, span)
+        cached_hi = min(final, span[1]) if span else from_b - 1
+        evs = store.load(adapter.name, from_b, cached_hi) if cached_hi >= from_b else []
+    from_disk = len(evs) - stats["decoded"]
+    if to_b > max(cached_hi, from_b - 1):
+        evs += pull(max(cached_hi + 1, from_b), to_b)
+    if evs:
+        evs[0].meta["decode_stats"] = {**stats, "from_store": from_disk}
+    return evs
+
+async def fetch_bridge_src_events_cached_async(w3, adapter: BridgeAdapter, store: EventStore,
+                                               confirmations: int | None = None) -> list[IntentEvent]:
+    """fetch_bridge_src_events_cached over an AsyncWeb3; database work runs in worker threads."""
+    if confirmations is None:
+        confirmations = int(_store_cfg().get("confirmations", 64))
+    head = await w3.eth.block_number
+    from_b = _block_expr(head, adapter.from_block)
+    to_b = _block_expr(head, adapter.to_block)
+    final = min(to_b, head - confirmations)
+    fetcher = AsyncLogFetcher(w3, adapter.src_chain)
+    flt = src_log_filter(adapter)
+    stats = {"decoded": 0, "skipped": 0, "total_logs": 0, "slow_path": 0}
+
+    async def pull(lo: int, hi: int) -> list[IntentEvent]:
+        evs, st = _decode(adapter, await fetcher.fetch(flt, lo, hi))
+        for k in stats:
+            stats[k] += st[k]
+        return evs
+
+    async with store.alock(adapter.name):
+        span = await asyncio.to_thread(store.span, adapter.name, adapter.fingerprint)
+        for lo, hi, span in _plan(span, from_b, final):
+            await asyncio.to_thread(store.put, adapter.name, adapter.fingerprint, await pull(lo, hi), lo, hi, span)
+        cached_hi = min(final, span[1]) if span else from_b - 1
+        evs = await asyncio.to_thread(store.load, adapter.name, from_b, cached_hi) if cached_hi >= from_b else []
+    from_disk = len(evs) - stats["decoded"]
+    if to_b > max(cached_hi, from_b - 1):
+        evs += await pull(max(cached_hi + 1, from_b), to_b)
+    if evs:
+        evs[0].meta["decode_stats"] = {**stats, "from_store": from_disk}
+    return evs
@@ -0,0 +1,65 @@
+from typing import Any, Dict, Iterable, List
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+from app.core.rpc import RpcBatch, RpcClient, pin_block
+
+# SimpleAccount/Kernel-like accounts expose entryPoint()/owner(); Safe exposes getOwners()
+SEL_ENTRY_POINT = function_signature_to_4byte_selector("entryPoint()")
+SEL_OWNER = function_signature_to_4byte_selector("owner()")
+SEL_GET_OWNERS = function_signature_to_4byte_selector("getOwners()")
+EIP1967_IMPL_SLOT = 0x360894A13BA1A3210667C828492DB98DCA3E2076CC3735A920A3CA505D382BBC
+
+_READS = 5  # batch items queued per account
+
+def queue_account_reads(batch: RpcBatch, address: str) -> int:
+    """Queue every read classify_account needs; returns the index of the first one."""
+    first = batch.get_code(address)
+    batch.call(address, SEL_ENTRY_POINT, ["address"])
+    batch.call(address, SEL_OWNER, ["address"])
+    batch.call(address, SEL_GET_OWNERS, ["address[]"])
+    batch.get_storage_at(address, EIP1967_IMPL_SLOT)
+    return first
+
+def classify_account(address: str, results) -> Dict[str, Any]:
+    code, ep, owner, owners, impl = results
+    out: Dict[str, Any] = {"address": address, "deployed": False, "stack": "undeployed"}
+    if not code.ok:
+        out.update(stack="error", error=code.error)
+        return out
+    if not code.value:
+        return out
+    out.update(deployed=True, code_size=len(code.value))
+    if ep.ok:
+        out.update(stack="simple-account", entryPoint=to_checksum_address(ep.value))
+        if owner.ok:
+            out["owner"] = to_checksum_address(owner.value)
+        return out
+    if owners.ok:
+        out.update(stack="safe", owners=[to_checksum_address(o) for o in owners.value])
+        return out
+    if impl.ok and impl.value and any(impl.value):
+        out["implementation"] = to_checksum_address(impl.value[-20:])
+        out["stack"] = "eip1967-proxy"
+        return out
+    out["stack"] = "unknown"
+    return out
+
+def detect_accounts(client: RpcClient, addresses: Iterable[str], block: int | str = "latest",
+                    batch_size: int = 100) -> Iterable[Dict[str, Any]]:
+    """
+    Classify accounts with one JSON-RPC round-trip per `batch_size` addresses
+    (plus one to pin "latest", so every batch reads the same block).
+    """
+    block = pin_block(client, block)
+    chunk: List[str] = []
+    def flush():
+        batch = RpcBatch(client, block)
+        starts = [queue_account_reads(batch, a) for a in chunk]
+        res = batch.execute()
+        return [classify_account(a, res[s:s + _READS]) for a, s in zip(chunk, starts)]
+    for a in addresses:
+        chunk.append(to_checksum_address(a))
+        if len(chunk) >= batch_size:
+            yield from flush()
+            chunk = []
+    if chunk:
+        yield from flush()
@@ -0,0 +1,162 @@
+"""
+Selector extraction through batch wrappers.
+
+A UserOperation's callData is usually a wrapper (SimpleAccount execute /
+executeBatch, Safe executeUserOp + MultiSend, Multicall3, multicall(bytes[]),
+Coinbase Smart Wallet executeBatch) around the calls that matter. iter_calls
+walks them from a single memoryview: every nested payload is a slice of the
+original buffer, so a 100 KB batch is read once and never copied. Malformed
+or truncated wrappers, and wrappers nested past MAX_DEPTH, end their own
+branch (never the scan) with an UNREADABLE entry in place of the calls they
+hide, so a payload that cannot be read is never taken for a clean one.
+"""
+from typing import Callable, Dict, Iterator, List, Tuple
+from eth_hash.auto import keccak
+
+MAX_DEPTH = 8   # wrappers inside wrappers; deeper payloads are reported as UNREADABLE, not opened
+UNREADABLE = -1 # "selector" of calls inside a wrapper that could not be opened
+
+Call = Tuple[str | None, int]                    # (target, selector as int); target None = the account itself
+
+class _Malformed(Exception):
+    pass
+
+def selector_bytes(sig: str) -> bytes:
+    return keccak(sig.encode("utf-8"))[:4]
+
+def selector_int(sig: str) -> int:
+    return int.from_bytes(selector_bytes(sig), "big")
+
+def _word(mv: memoryview, o: int) -> int:
+    if o < 0 or o + 32 > len(mv):
+        raise _Malformed
+    return int.from_bytes(mv[o:o + 32], "big")
+
+def _address(mv: memoryview, o: int) -> str:
+    if _word(mv, o) >> 160:
+        raise _Malformed
+    return "0x" + mv[o + 12:o + 32].hex()
+
+def _bytes(mv: memoryview, o: int) -> memoryview:
+    """`bytes` whose length word is at `o`."""
+    n = _word(mv, o)
+    if n > len(mv) - o - 32:
+        raise _Malformed
+    return mv[o + 32:o + 32 + n]
+
+def _array(mv: memoryview, o: int) -> Tuple[int, int]:
+    """(element count, start of the elements) of the dynamic array whose length word is at `o`."""
+    n = _word(mv, o)
+    if n > (len(mv) - o - 32) // 32:
+        raise _Malformed
+    return n, o + 32
+
+def _dyn_items(mv: memoryview, head: int) -> Iterator[int]:
+    """Start of every element of a dynamic-element array (bytes[] or tuple[]) referenced from `head`."""
+    n, base = _array(mv, _word(mv, head))
+    for i in range(n):
+        yield base + _word(mv, base + 32 * i)
+
+# ---- wrappers: args (calldata after the selector), outer target -> [(target, inner calldata)]
+
+def _execute(args, target):                      # execute(address,uint256,bytes) / Safe executeUserOp(...,uint8)
+    return [(_address(args, 0), _bytes(args, _word(args, 64)))]
+
+def _execute_batch(args, target):                # executeBatch(address[],bytes[])
+    n, dests = _array(args, _word(args, 0))
+    datas = list(_dyn_items(args, 32))
+    if datas and len(datas) != n:                # SimpleAccount allows an empty bytes[] (plain transfers)
+        raise _Malformed
+    return [(_address(args, dests + 32 * i), _bytes(args, p)) for i, p in enumerate(datas)]
+
+def _execute_batch_values(args, target):         # executeBatch(address[],uint256[],bytes[])
+    n, dests = _array(args, _word(args, 0))
+    datas = list(_dyn_items(args, 64))
+    if len(datas) != n:
+        raise _Malformed
+    return [(_address(args, dests + 32 * i), _bytes(args, p)) for i, p in enumerate(datas)]
+
+def _call_tuples(to: int, data: int, head: int = 0) -> Callable:
+    # arrays of (address target, ..., bytes data) tuples; `to`/`data` are head slots in the tuple
+    def decode(args, target):
+        return [(_address(args, t + 32 * to), _bytes(args, t + _word(args, t + 32 * data)))
+                for t in _dyn_items(args, head)]
+    return decode
+
+def _multicall(head: int) -> Callable:         # multicall([uint256 deadline,] bytes[]): calls back into `target`
+    def decode(args, target):
+        return [(target, _bytes(args, p)) for p in _dyn_items(args, head)]
+    return decode
+
+def _multi_send(args, target):                   # Safe multiSend(bytes): packed (uint8, address, uint256, uint256, bytes)*
+    packed = _bytes(args, _word(args, 0))
+    out, o = [], 0
+    while o < len(packed):
+        if o + 85 > len(packed):
+            raise _Malformed
+        n = int.from_bytes(packed[o + 53:o + 85], "big")
+        if n > len(packed) - o - 85:
+            raise _Malformed
+        out.append(("0x" + packed[o + 1:o + 21].hex(), packed[o + 85:o + 85 + n]))
+        o += 85 + n
+    return out
+
+WRAPPERS: Dict[int, Callable[[memoryview, str | None], List[Tuple[str | None, memoryview]]]] = {
+    selector_int("execute(address,uint256,bytes)"): _execute,
+    selector_int("executeUserOp(address,uint256,bytes,uint8)"): _execute,
+    selector_int("executeUserOpWithErrorString(address,uint256,bytes,uint8)"): _execute,
+    selector_int("executeBatch(address[],bytes[])"): _execute_batch,
+    selector_int("executeBatch(address[],uint256[],bytes[])"): _execute_batch_values,
+    selector_int("executeBatch((address,uint256,bytes)[])"): _call_tuples(0, 2),
+    selector_int("aggregate((address,bytes)[])"): _call_tuples(0, 1),
+    selector_int("tryAggregate(bool,(address,bytes)[])"): _call_tuples(0, 1, head=32),
+    selector_int("aggregate3((address,bool,bytes)[])"): _call_tuples(0, 2),
+    selector_int("aggregate3Value((address,bool,uint256,bytes)[])"): _call_tuples(0, 3),
+    selector_int("multicall(bytes[])"): _multicall(0),
+    selector_int("multicall(uint256,bytes[])"): _multicall(32),
+    selector_int("multiSend(bytes)"): _multi_send,
+}
+
+def as_view(calldata: bytes | bytearray | memoryview | str) -> memoryview:
+    if isinstance(calldata, str):
+        h = calldata[2:] if calldata[:2] in ("0x", "0X") else calldata
+        try:
+            calldata = bytes.fromhex(h)
+        except ValueError:
+            # not clean hex: only a leading selector can be trusted
+            try:
+                calldata = bytes.fromhex(h[:8])
+            except ValueError:
+                calldata = b""
+    return memoryview(calldata)
+
+def iter_calls(calldata: bytes | bytearray | memoryview | str, target: str | None = None,
+               max_depth: int = MAX_DEPTH) -> Iterator[Call]:
+    """
+    Every (target, selector) in the payload, wrappers included, outermost first.
+    Payloads shorter than a selector are skipped; a wrapper that is malformed
+    or nested deeper than `max_depth` is followed by (its target, UNREADABLE).
+    """
+    stack: List[Tuple[str | None, memoryview, int]] = [(target, as_view(calldata), 0)]
+    while stack:
+        tgt, mv, depth = stack.pop()
+        if len(mv) < 4:
+            continue
+        sel = int.from_bytes(mv[:4], "big")
+        yield tgt, sel
+        unwrap = WRAPPERS.get(sel)
+        if unwrap is None:
+            continue
+        if depth >= max_depth:
+            yield tgt, UNREADABLE
+            continue
+        try:
+            inner = unwrap(mv[4:], tgt)
+        except _Malformed:
+            yield tgt, UNREADABLE
+            continue
+        stack.extend((t, d, depth + 1) for t, d in reversed(inner))
+
+def any_selector(calldata, table: frozenset, max_depth: int = MAX_DEPTH) -> bool:
+    """True as soon as any nested call uses a selector from `table` (ints, see selector_int; may hold UNREADABLE)."""
+    return any(sel in table for _, sel in iter_calls(calldata, max_depth=max_depth))
@@ -1,15 +1,43 @@
 from app.models.schemas import UserOperation
-from eth_abi import abi
 from typing import List
+from app.eip4337.calldata import UNREADABLE, any_selector, iter_calls, selector_bytes
 
-# Minimal helpers; extend with full ABI as needed.
-APPROVAL_SELECTORS = {"0x095ea7b3", "0x2e1a7d4d"}  # approve(), withdraw(uint256), etc. (example)
+APPROVAL_SELECTORS = {
+    "0x095ea7b3",   # approve(address,uint256)
+    "0x39509351",   # increaseAllowance(address,uint256)
+    "0xa22cb465",   # setApprovalForAll(address,bool)
+    "0xd505accf",   # permit(address,address,uint256,uint256,uint8,bytes32,bytes32) (EIP-2612)
+    "0x87517c45",   # Permit2 approve(address,address,uint160,uint48)
+    "0x2e1a7d4d",   # withdraw(uint256)
+}
+# calls hidden in a wrapper that could not be opened might be anything, approvals included
+_SUSPICIOUS_TABLE = frozenset(int(s, 16) for s in APPROVAL_SELECTORS) | {UNREADABLE}
 
 def extract_selectors_from_calldata(calldata_hex: str) -> List[str]:
-    ch = calldata_hex.lower().replace("0x","")
-    if len(ch) < 8: return []
-    return ["0x" + ch[:8]]
+    """
+    Selectors of the call and of every call nested in known batch wrappers,
+    outermost first; "unreadable" where a wrapper could not be opened.
+    """
+    return ["unreadable" if sel == UNREADABLE else f"0x{sel:08x}" for _, sel in iter_calls(calldata_hex)]
 
 def has_suspicious_selectors(calldata_hex: str) -> bool:
-    sels = set(extract_selectors_from_calldata(calldata_hex))
-    return len(sels & APPROVAL_SELECTORS) > 0
+    return any_selector(calldata_hex, _SUSPICIOUS_TABLE)
+
+# EntryPoint v0.6 simulateHandleOp(UserOperation,address,bytes): runs validation and
+# execution, then reverts with ExecutionResult, so it is traceable without a funded sender
+USEROP_ABI = "(address,uint256,bytes,bytes,uint256,uint256,uint256,uint256,uint256,bytes,bytes)"
+SEL_SIMULATE_HANDLE_OP = selector_bytes(f"simulateHandleOp({USEROP_ABI},address,bytes)")
+_GAS_FIELDS = ("callGasLimit", "verificationGasLimit", "preVerificationGas", "maxFeePerGas", "maxPriorityFeePerGas")
+
+def _q(v) -> int:
+    return int(v, 0) if isinstance(v, str) else int(v or 0)
+
+def _b(v) -> bytes:
+    v = v or ""
+    return bytes.fromhex(v[2:] if v.startswith("0x") else v)
+
+def encode_simulate_handle_op(userop: UserOperation, target: str = "0x" + "00" * 20, target_data: bytes = b"") -> str:
+    from eth_abi import encode as abi_encode
+    op = (userop.sender, _q(userop.nonce), _b(userop.initCode), _b(userop.callData),
+          *(_q(getattr(userop, k)) for k in _GAS_FIELDS), _b(userop.paymasterAndData), _b(userop.signature))
+    return "0x" + (SEL_SIMULATE_HANDLE_OP + abi_encode([USEROP_ABI, "address", "bytes"], [op, target, target_data])).hex()
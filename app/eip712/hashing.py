@@ -0,0 +1,159 @@
+"""
+EIP-712 hashing with the per-schema work done once.
+
+Production traffic signs a few dozen (types, domain) combinations, so the
+encodeType strings, type hashes, field plans and domain separators are
+compiled once per canonical `types` and kept in bounded LRUs. Per request
+only the message struct hash is computed. Semantics (including which inputs
+are rejected) follow eth_account's encode_structured_data exactly.
+"""
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+from eth_abi import is_encodable_type
+from eth_abi.exceptions import EncodingError
+from eth_abi.grammar import parse
+from eth_abi.registry import registry
+from eth_account._utils.structured_data.hashing import encode_type, get_array_dimensions
+from eth_account._utils.structured_data.validation import validate_structured_data
+from eth_hash.auto import keccak
+from app.core.metrics import register_cache
+
+CACHE_SIZE = 512
+
+# field plan kinds
+_STRUCT, _BYTES, _STRING, _ARRAY, _ATOMIC, _BAD = range(6)
+
+class TypeEncoder:
+    """Compiled encoder for one `types` mapping."""
+    def __init__(self, types: Dict[str, List[Dict[str, str]]]):
+        self.types = types
+        self._type_hash: Dict[str, bytes] = {}
+        self._plans: Dict[str, Tuple] = {}
+        self._fields: Dict[str, List[Tuple[str, Tuple]]] = {}
+
+    def type_hash(self, struct: str) -> bytes:
+        h = self._type_hash.get(struct)
+        if h is None:
+            h = self._type_hash[struct] = keccak(encode_type(struct, self.types).encode("utf-8"))
+        return h
+
+    def _plan(self, ftype: str) -> Tuple:
+        p = self._plans.get(ftype)
+        if p is None:
+            if ftype in self.types:
+                p = (_STRUCT, ftype)
+            elif ftype == "bytes":
+                p = (_BYTES,)
+            elif ftype == "string":
+                p = (_STRING,)
+            elif ftype.endswith("]"):
+                # parse() can raise; that must surface per value, like eth_account
+                p = (_ARRAY, ftype, ftype[: ftype.rindex("[")])
+            elif is_encodable_type(ftype):
+                p = (_ATOMIC, ftype, registry.get_encoder(ftype))
+            else:
+                p = (_BAD, ftype)
+            self._plans[ftype] = p
+        return p
+
+    def fields(self, struct: str) -> List[Tuple[str, Tuple]]:
+        f = self._fields.get(struct)
+        if f is None:
+            f = self._fields[struct] = [(fd["name"], self._plan(fd["type"])) for fd in self.types[struct]]
+        return f
+
+    def encode_field(self, name: str, plan: Tuple, value) -> bytes:
+        """
+        One 32-byte encodeData member. Every member is static (a hash or an
+        elementary type), so a struct's encoding is the plain concatenation.
+        """
+        kind = plan[0]
+        if value is None:
+            raise ValueError(f"Missing value for field {name}")
+        if kind == _STRUCT:
+            return keccak(self.encode_data(plan[1], value))
+        if kind == _BYTES:
+            if not isinstance(value, bytes):
+                raise TypeError(f"Value of field `{name}` is not bytes")
+            return keccak(value)
+        if kind == _STRING:
+            if not isinstance(value, str):
+                raise TypeError(f"Value of field `{name}` is not a string")
+            return keccak(value.encode("utf-8"))
+        if kind == _ARRAY:
+            dims = get_array_dimensions(value)
+            declared = parse(plan[1]).arrlist
+            for i in range(len(dims)):
+                if len(declared[i]) and dims[i] != declared[i][0]:
+                    raise TypeError(f"Array data for `{name}` does not match {plan[1]}")
+            inner = self._plan(plan[2])
+            return keccak(b"".join([self.encode_field(name, inner, item) for item in value]))
+        if kind == _BAD:
+            raise TypeError(f"Received Invalid type `{plan[1]}` in field `{name}`")
+        enc = plan[2]
+        # same acceptance test as eth_abi.is_encodable
+        try:
+            enc.validate_value(value)
+        except EncodingError:
+            raise TypeError(f"Value of `{name}` is not encodable as type `{plan[1]}`")
+        except AttributeError:
+            try:
+                enc(value)
+            except EncodingError:
+                raise TypeError(f"Value of `{name}` is not encodable as type `{plan[1]}`")
+        return enc(value)
+
+    def encode_data(self, struct: str, data) -> bytes:
+        words = [self.type_hash(struct)]
+        for name, plan in self.fields(struct):
+            words.append(self.encode_field(name, plan, data[name]))
+        return b"".join(words)
+
+    def hash_struct(self, struct: str, data) -> bytes:
+        return keccak(self.encode_data(struct, data))
+
+def _canonical(obj) -> str:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _schema(types_key: str, primary_type: str) -> TypeEncoder | str:
+    types = json.loads(types_key)
+    try:
+        validate_structured_data({"types": types, "primaryType": primary_type, "domain": {}, "message": {}})
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"   # remembered: a schema that fails validation fails every time
+    return TypeEncoder(types)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _domain_separator(types_key: str, primary_type: str, domain_key: str) -> bytes:
+    enc = _schema(types_key, primary_type)
+    return enc.hash_struct("EIP712Domain", json.loads(domain_key))
+
+def typed_data_hash(data: Dict[str, Any]) -> bytes:
+    """
+    keccak256("\\x19\\x01" ‖ domainSeparator ‖ hashStruct(message)), the digest a
+    wallet signs. Raises for any input encode_structured_data rejects.
+    """
+    types_key = _canonical(data["types"])
+    primary = data["primaryType"]
+    enc = _schema(types_key, primary)
+    if isinstance(enc, str):
+        raise ValueError(enc)
+    domain = data["domain"]
+    try:
+        sep = _domain_separator(types_key, primary, _canonical(domain))
+    except TypeError:
+        # bytes values are not JSON: encode this domain uncached
+        sep = enc.hash_struct("EIP712Domain", domain)
+    return keccak(b"\x19\x01" + sep + enc.hash_struct(primary, data["message"]))
+
+def cache_info() -> Dict[str, Any]:
+    return {"schemas": _schema.cache_info()._asdict(), "domains": _domain_separator.cache_info()._asdict()}
+
+def _lru_counts(fn) -> Dict[str, int]:
+    info = fn.cache_info()
+    return {"hit": info.hits, "miss": info.misses}
+
+register_cache("eip712_schema", lambda: _lru_counts(_schema))
+register_cache("eip712_domain", lambda: _lru_counts(_domain_separator))
@@ -1,8 +1,8 @@
 from app.models.schemas import EIP712TypedData
-from eth_account.messages import encode_structured_data
 from app.core.utils import stable_hash
 
 def eip712_hash(typed: EIP712TypedData) -> str:
+    from app.eip712.hashing import typed_data_hash   # eth_account/eth_abi load with the first EIP-712 request
     data = {
         "types": typed.types,
         "primaryType": typed.primaryType,
@@ -10,9 +10,8 @@ def eip712_hash(typed: EIP712TypedData) -> str:
         "message": typed.message
     }
     try:
-        # eth_account is strict; if types/domain/message mismatch, this can raise
-        msg = encode_structured_data(primitive=data)
-        return "0x" + msg.hash.hex()
+        # strict like eth_account; if types/domain/message mismatch, this can raise
+        return "0x" + typed_data_hash(data).hex()
     except Exception:
         # Fall back to a stable structural hash so the API never 500s
         return stable_hash(data)
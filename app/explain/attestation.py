@@ -1,11 +1,49 @@
-from typing import Dict, Any
-from app.core.utils import stable_hash
+import json
+from typing import Dict, Any, List
+from app.core.config import snapshot
+from app.core.utils import keccak_hex, stable_hash
+from app.explain.merkle import call_tree_root, edge_root
+from app.models.schemas import SimCallNode
 
-def attestation(payload: Dict[str, Any]) -> Dict[str, str]:
-    # Hash nested structures into short fields for logs
+def _structural(v) -> str | None:
+    if isinstance(v, SimCallNode):
+        return "0x" + call_tree_root(v).hex()
+    if isinstance(v, list) and v and all(isinstance(e, tuple) for e in v):
+        return "0x" + edge_root(v).hex()  # DAG edge list
+    return None
+
+def _tree_json(tree: SimCallNode) -> str:
+    """
+    json.dumps(tree.model_dump(), sort_keys=True, separators=(",", ":")) built
+    without recursion; traced call trees nest deeper than model_dump/json allow.
+    """
+    out: List[str] = []
+    stack: List[Any] = [tree]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            out.append(item)
+            continue
+        out.append('{"children":[')
+        tail = '],"selector":' + json.dumps(item.selector) + ',"target":' + json.dumps(item.target) + "}"
+        stack.append(tail)
+        for i in range(len(item.children) - 1, -1, -1):
+            stack.append(item.children[i])
+            if i:
+                stack.append(",")
+    return "".join(out)
+
+def attestation(payload: Dict[str, Any], mode: str | None = None) -> Dict[str, str]:
+    # Hash nested structures into short fields for logs; "merkle" mode hashes
+    # call trees and edge lists structurally (see app.explain.merkle)
+    mode = mode or snapshot().attestation_mode
     out = {}
     for k,v in payload.items():
-        if isinstance(v, (dict, list)):
+        if mode == "merkle" and (root := _structural(v)) is not None:
+            out[k] = root
+        elif isinstance(v, SimCallNode):
+            out[k] = keccak_hex(_tree_json(v).encode())
+        elif isinstance(v, (dict, list)):
             out[k] = stable_hash(v)
         else:
             out[k] = str(v)
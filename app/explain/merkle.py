@@ -0,0 +1,134 @@
+"""
+Structural (Merkle) attestation for call trees and edge sets.
+
+Call tree: every SimCallNode hashes to
+    keccak(0x01 ‖ header ‖ child₁ ‖ … ‖ childₙ),  header = keccak(0x00 ‖ len(target) ‖ target ‖ selector)
+so identical subtrees have identical hashes and are only hashed once (a bounded
+cache keyed by header and child hashes). Trees are walked iteratively, so depth
+is not limited by the recursion limit.
+
+Edge sets: a binary Merkle tree over keccak(0x02 ‖ json([u, v, data])) leaves in
+the given order, interior nodes keccak(0x03 ‖ left ‖ right), an odd node being
+carried up unchanged.
+
+Both produce inclusion proofs that verify against the root alone.
+"""
+import json, threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Iterable, List, Sequence, Tuple
+from eth_hash.auto import keccak
+from app.core.metrics import register_cache
+from app.models.schemas import SimCallNode
+
+CACHE_SIZE = 65536
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _header(target: str, selector: str) -> bytes:
+    t = target.encode("utf-8")
+    return keccak(b"\x00" + len(t).to_bytes(4, "big") + t + selector.encode("utf-8"))
+
+class _NodeCache:
+    """LRU of (header, child hashes) -> node hash."""
+    def __init__(self, size: int):
+        self.size = size
+        self._d: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, header: bytes, children: Tuple[bytes, ...]) -> bytes:
+        key = (header, children)
+        with self._lock:
+            h = self._d.get(key)
+            if h is not None:
+                self._d.move_to_end(key)
+                self.hits += 1
+                return h
+            self.misses += 1
+        h = keccak(b"\x01" + header + b"".join(children))
+        with self._lock:
+            self._d[key] = h
+            if len(self._d) > self.size:
+                self._d.popitem(last=False)
+        return h
+
+_NODES = _NodeCache(CACHE_SIZE)
+
+def node_hash(header: bytes, children: Sequence[bytes]) -> bytes:
+    return _NODES.get(header, tuple(children))
+
+def call_tree_root(tree: SimCallNode) -> bytes:
+    # post-order without recursion: a node is hashed once all its children are
+    done: dict[int, bytes] = {}
+    stack: List[Tuple[SimCallNode, bool]] = [(tree, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            done[id(node)] = node_hash(_header(node.target, node.selector), [done[id(c)] for c in node.children])
+            continue
+        stack.append((node, True))
+        stack.extend((c, False) for c in node.children if id(c) not in done)
+    return done[id(tree)]
+
+ProofStep = Tuple[bytes, List[bytes], List[bytes]]   # (parent header, left siblings, right siblings)
+
+def call_tree_proof(tree: SimCallNode, path: Sequence[int]) -> Tuple[bytes, List[ProofStep]]:
+    """
+    Hash of the node at `path` (child indices from the root) and the steps
+    from it up to the root, innermost first.
+    """
+    chain = [tree]
+    for i in path:
+        chain.append(chain[-1].children[i])
+    steps: List[ProofStep] = []
+    for parent, i in zip(reversed(chain[:-1]), reversed(path)):
+        sibs = [call_tree_root(c) for c in parent.children]
+        steps.append((_header(parent.target, parent.selector), sibs[:i], sibs[i + 1:]))
+    return call_tree_root(chain[-1]), steps
+
+def verify_call_tree_proof(root: bytes, leaf: bytes, steps: Iterable[ProofStep]) -> bool:
+    h = leaf
+    for header, left, right in steps:
+        h = keccak(b"\x01" + header + b"".join(left) + h + b"".join(right))
+    return h == root
+
+def edge_leaf(edge: Any) -> bytes:
+    return keccak(b"\x02" + json.dumps(edge, sort_keys=True, separators=(",", ":")).encode())
+
+def _levels(leaves: List[bytes]) -> List[List[bytes]]:
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        cur = levels[-1]
+        nxt = [keccak(b"\x03" + cur[k] + cur[k + 1]) for k in range(0, len(cur) - 1, 2)]
+        if len(cur) % 2:
+            nxt.append(cur[-1])
+        levels.append(nxt)
+    return levels
+
+def edge_root(edges: Iterable[Any]) -> bytes:
+    leaves = [edge_leaf(e) for e in edges]
+    return _levels(leaves)[-1][0] if leaves else keccak(b"\x03")
+
+def edge_proof(edges: Sequence[Any], index: int) -> List[Tuple[bytes, bool]]:
+    """Sibling hashes from leaf `index` to the root; the flag is True when the sibling is on the left."""
+    levels = _levels([edge_leaf(e) for e in edges])
+    proof = []
+    for level in levels[:-1]:
+        sib = index ^ 1
+        if sib < len(level):
+            proof.append((level[sib], sib < index))
+        index //= 2
+    return proof
+
+def verify_edge_proof(root: bytes, edge: Any, proof: Iterable[Tuple[bytes, bool]]) -> bool:
+    h = edge_leaf(edge)
+    for sib, left in proof:
+        h = keccak(b"\x03" + sib + h) if left else keccak(b"\x03" + h + sib)
+    return h == root
+
+def cache_info() -> dict:
+    return {"headers": _header.cache_info()._asdict(),
+            "nodes": {"hits": _NODES.hits, "misses": _NODES.misses, "size": len(_NODES._d)}}
+
+register_cache("merkle_header", lambda: {"hit": _header.cache_info().hits, "miss": _header.cache_info().misses})
+register_cache("merkle_node", lambda: {"hit": _NODES.hits, "miss": _NODES.misses})
@@ -1,29 +1,49 @@
-from typing import List
+from typing import Callable, Iterator, List, Tuple
 from app.models.schemas import SimCallNode, UserOperation
-from app.core.config import POLICY
+from app.core.config import snapshot
 from app.eip4337.userop import has_suspicious_selectors
 
 class Issue:
     def __init__(self, code, msg, sev="warn"): self.code, self.msg, self.sev = code, msg, sev
 
-def _scan_delegatecall(node: SimCallNode, out: List[Issue]):
-    if node.selector.lower().startswith("delegatecall"):
-        out.append(Issue("AA-DEL", f"delegatecall at {node.target}", "error"))
-    for ch in node.children:
-        _scan_delegatecall(ch, out)
+MAX_FINDINGS = 16   # per scan; one is enough to decide, the rest only pad the rationale
+
+def walk(node: SimCallNode) -> Iterator[Tuple[SimCallNode | None, SimCallNode]]:
+    """(parent, node) in pre-order, with an explicit stack (real traces nest deeper than the recursion limit)."""
+    stack: List[Tuple[SimCallNode | None, SimCallNode]] = [(None, node)]
+    while stack:
+        parent, n = stack.pop()
+        yield parent, n
+        stack.extend((n, c) for c in reversed(n.children))
+
+def _scan(node: SimCallNode, match: Callable[[SimCallNode | None, SimCallNode], bool],
+          limit: int = MAX_FINDINGS) -> List[SimCallNode]:
+    found = []
+    for parent, n in walk(node):
+        if match(parent, n):
+            found.append(n)
+            if len(found) >= limit:
+                break
+    return found
+
+def _scan_delegatecall(node: SimCallNode, vetted: frozenset, out: List[Issue]):
+    # every delegatecall counts: the selector is the caller's to choose, so only the target
+    # (an implementation listed in policies.eip4337.vetted_implementations) can clear one
+    def match(parent: SimCallNode | None, n: SimCallNode) -> bool:
+        return n.selector.lower().startswith("delegatecall") and (n.target or "").lower() not in vetted
+    for n in _scan(node, match):
+        out.append(Issue("AA-DEL", f"delegatecall at {n.target}", "error"))
 
 def lint_userop(call_tree: SimCallNode, userop: UserOperation) -> List[Issue]:
     issues: List[Issue] = []
-    pol = POLICY["eip4337"]
-    vetted_factories = set(a.lower() for a in pol.get("vetted_factories", []))
-    vetted_pm = set(a.lower() for a in pol.get("vetted_paymasters", []))
-    block_delegatecall = pol.get("block_delegatecall", True)
+    pol = snapshot().eip4337
+    vetted_factories = pol.vetted_factories
+    vetted_pm = pol.vetted_paymasters
+    block_delegatecall = pol.block_delegatecall
 
     # delegatecall
-    tmp: List[Issue] = []
-    _scan_delegatecall(call_tree, tmp)
     if block_delegatecall:
-        issues.extend(tmp)
+        _scan_delegatecall(call_tree, pol.vetted_implementations, issues)
 
     # factory/paymaster allowlists (trivial parsing from userop)
     if userop.paymasterAndData and len(userop.paymasterAndData) >= 42:
@@ -33,5 +53,5 @@ def lint_userop(call_tree: SimCallNode, userop: UserOperation) -> List[Issue]:
 
     # suspicious selectors
     if has_suspicious_selectors(userop.callData):
-        issues.append(Issue("AA-APR", f"approval/permit-like selector in callData", "warn"))
+        issues.append(Issue("AA-APR", "approval/permit-like selector (or an unreadable batch wrapper) in callData", "warn"))
     return issues
@@ -1,6 +1,6 @@
 from typing import List
 from app.models.schemas import EIP712TypedData
-from app.core.config import POLICY
+from app.core.config import snapshot
 from app.eip712.parser import infer_permit_like, numeric_field, expiry_field
 
 class Issue:  # tiny struct
@@ -9,11 +9,11 @@ class Issue:  # tiny struct
 
 def lint_eip712(typed: EIP712TypedData) -> List[Issue]:
     issues: List[Issue] = []
-    p = POLICY["eip712"]
-    trusted_chain_ids = set(p.get("trusted_chain_ids", []))
-    trusted_vc = set(a.lower() for a in p.get("trusted_verifying_contracts", []))
-    max_allowance = int(p.get("max_allowance", 10**21))
-    max_expiry = int(p.get("max_expiry_seconds", 7*24*3600))
+    p = snapshot().eip712
+    trusted_chain_ids = p.trusted_chain_ids
+    trusted_vc = p.trusted_verifying_contracts
+    max_allowance = p.max_allowance
+    max_expiry = p.max_expiry_seconds
 
     if trusted_chain_ids and typed.domain.chainId not in trusted_chain_ids:
         issues.append(Issue("P712-CHAIN", f"Untrusted chainId {typed.domain.chainId}", "warn"))
@@ -1,20 +1,68 @@
 from app.models.schemas import SimCallNode, UserOperation
-from app.core.config import BUNDLER_RPC
-import requests
+from app.core.rpc import REGISTRY
+from app.eip4337.userop import encode_simulate_handle_op
+from app.simulate.cache import get_sim_cache, sim_key
+from app.simulate.eth import trace_call
+from app.simulate.trace import CALL_TRACER, call_tree_from_parity, parse_call_trace
+import os
 
-def simulate_validation(userop: UserOperation) -> SimCallNode:
+ZERO = "0x" + "00" * 20
+
+def aa_chain_id() -> int:
+    return int(os.getenv("AA_CHAIN_ID", "1"))
+
+def simulate_validation(userop: UserOperation, entry_point: str | None = None, block: str = "latest") -> SimCallNode:
     """
-    Adapter to a bundler/EntryPoint simulateValidation.
-    MVP: return a tiny fabricated call-tree (replace with real call-tree parsing).
+    Call tree of the UserOperation (validation and execution) as traced by the
+    node, behind the simulation cache (repeat submissions of the same
+    UserOperation within a block are traced once).
+    Raises RuntimeError when no EntryPoint/RPC is configured, ValueError on RPC errors.
     """
-    # If you have a bundler RPC, call it here. Else stub a tree:
-    return SimCallNode(
-        target=userop.sender,
-        selector="0x",
-        children=[
-            SimCallNode(target="0xFactory", selector="create()", children=[
-                # Use "delegatecall" to test policy blocking
-                SimCallNode(target="0xTarget", selector="delegatecall", children=[])
-            ])
-        ]
-    )
+    ep = entry_point or os.getenv("ENTRY_POINT", "").strip()
+    if not ep:
+        raise RuntimeError("No EntryPoint configured (ENTRY_POINT)")
+    op = userop.model_dump(exclude_none=True)
+    return get_sim_cache().get(sim_key("simulateValidation", op, ep, block),
+                               lambda: _simulate_validation(userop, ep, block, aa_chain_id()))
+
+def _simulate_validation(userop: UserOperation, ep: str, block: str, chain_id: int) -> SimCallNode:
+    # EntryPoint.simulateHandleOp always reverts (with the result); the trace up to there is what we want
+    tx = {"from": ZERO, "to": ep, "data": encode_simulate_handle_op(userop)}
+    client = REGISTRY.for_chain(chain_id)
+    try:
+        return client.call_stream("debug_traceCall", [tx, block, CALL_TRACER], parse_call_trace)
+    except ValueError as e:
+        err = e.args[0] if e.args else None
+        if not (isinstance(err, dict) and err.get("code") == -32601):
+            raise
+    # no debug namespace on this node: fall back to the trace module
+    res = trace_call(chain_id, tx, block)
+    if res.get("error"):
+        raise ValueError(res["error"])
+    return call_tree_from_parity(res["result"]["trace"])
+
+async def simulate_validation_async(userop: UserOperation, entry_point: str | None = None,
+                                    block: str = "latest") -> SimCallNode:
+    """simulate_validation on the async upstream client; shares the cache (and in-flight calls) with it."""
+    ep = entry_point or os.getenv("ENTRY_POINT", "").strip()
+    if not ep:
+        raise RuntimeError("No EntryPoint configured (ENTRY_POINT)")
+    op = userop.model_dump(exclude_none=True)
+    return await get_sim_cache().get_async(sim_key("simulateValidation", op, ep, block),
+                                           lambda: _simulate_validation_async(userop, ep, block, aa_chain_id()))
+
+async def _simulate_validation_async(userop: UserOperation, ep: str, block: str, chain_id: int) -> SimCallNode:
+    import aiohttp
+    tx = {"from": ZERO, "to": ep, "data": encode_simulate_handle_op(userop)}
+    client = REGISTRY.for_chain_async(chain_id)
+    try:
+        try:
+            return await client.call_stream("debug_traceCall", [tx, block, CALL_TRACER], parse_call_trace)
+        except ValueError as e:
+            err = e.args[0] if e.args else None
+            if not (isinstance(err, dict) and err.get("code") == -32601):
+                raise
+        return call_tree_from_parity((await client.call("trace_call", [tx, ["trace"], block]))["trace"])
+    except aiohttp.ClientError as e:
+        # transport failures surface as OSError on both paths, like requests' do
+        raise OSError(f"{client.name}: {e}") from e
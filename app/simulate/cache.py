@@ -0,0 +1,173 @@
+"""
+Cache for bundler simulations (eth_estimateUserOperationGas, simulateValidation).
+
+Entries are keyed by (method, canonical UserOperation hash, EntryPoint, block).
+Results for a moving tag ("latest", "pending", ...) live for one block time;
+results for a pinned block number never go stale and only leave by LRU
+eviction. Concurrent identical requests, sync or async, share one upstream
+call; failures are handed to every waiter and never cached.
+"""
+import asyncio, threading, time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Tuple
+from app.core.config import snapshot
+from app.core.deadline import DeadlineExceeded, remaining
+from app.core.metrics import register_cache
+from app.core.utils import stable_hash
+
+_NUMERIC = ("nonce", "callGasLimit", "verificationGasLimit", "preVerificationGas",
+            "maxFeePerGas", "maxPriorityFeePerGas")
+
+def _cache_cfg() -> dict:
+    return (snapshot().raw.get("global", {}) or {}).get("sim_cache", {}) or {}
+
+def userop_key(userop: Mapping[str, Any]) -> str:
+    """
+    Hash of a UserOperation that ignores encoding differences: quantities as
+    ints ("0x10" == "16" == 16), hex data lowercased, absent and None alike.
+    """
+    canon = {}
+    for k, v in userop.items():
+        if v is None:
+            continue
+        if k in _NUMERIC:
+            try:
+                v = int(v, 0) if isinstance(v, str) else int(v)
+            except ValueError:
+                pass   # let the bundler reject it; still a stable key
+        elif isinstance(v, str):
+            v = v.lower()
+        canon[k] = v
+    return stable_hash(canon)
+
+def sim_key(method: str, userop: Mapping[str, Any], entry_point: str | None, block: str | int = "latest") -> Tuple:
+    return (method, userop_key(userop), (entry_point or "").lower(), str(block).lower())
+
+def _pinned(block: str) -> bool:
+    try:
+        int(block, 0)
+        return True
+    except ValueError:
+        return False
+
+class SimCache:
+    """Bounded LRU with block-time TTL and in-flight coalescing."""
+    def __init__(self, max_entries: int = 1024, block_time_s: float = 12.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.block_time_s = block_time_s
+        self._clock = clock
+        self._d: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = self.evictions = self.expired = 0
+
+    def _claim(self, key: Tuple) -> Tuple[str, Any]:
+        """("hit", value) | ("wait", future) | ("lead", future)"""
+        with self._lock:
+            entry = self._d.get(key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._d.move_to_end(key)
+                    self.hits += 1
+                    return "hit", entry[1]
+                del self._d[key]
+                self.expired += 1
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                return "wait", fut
+            self.misses += 1
+            fut = self._inflight[key] = Future()
+            return "lead", fut
+
+    def _settle(self, key: Tuple, fut: Future, value: Any = None, exc: BaseException | None = None):
+        with self._lock:
+            self._inflight.pop(key, None)
+            if exc is None:
+                ttl = float("inf") if _pinned(key[-1]) else self.block_time_s
+                self._d[key] = (self._clock() + ttl, value)
+                self._d.move_to_end(key)
+                while len(self._d) > self.max_entries:
+                    self._d.popitem(last=False)
+                    self.evictions += 1
+        if exc is None:
+            fut.set_result(value)
+        elif isinstance(exc, (CancelledError, asyncio.CancelledError)):
+            fut.cancel()   # waiters retry and one of them takes over
+        else:
+            fut.set_exception(exc)
+
+    def get(self, key: Tuple, compute: Callable[[], Any]) -> Any:
+        while True:
+            state, v = self._claim(key)
+            if state == "hit":
+                return v
+            if state == "lead":
+                try:
+                    value = compute()
+                except BaseException as e:
+                    self._settle(key, v, exc=e)
+                    raise
+                self._settle(key, v, value)
+                return value
+            left = remaining()
+            try:
+                return v.result(timeout=None if left is None else max(left, 0.0))
+            except CancelledError:
+                continue
+            except TimeoutError:
+                raise DeadlineExceeded("request deadline exceeded") from None
+
+    async def get_async(self, key: Tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            state, v = self._claim(key)
+            if state == "hit":
+                return v
+            if state == "lead":
+                try:
+                    value = await compute()
+                except BaseException as e:
+                    self._settle(key, v, exc=e)
+                    raise
+                self._settle(key, v, value)
+                return value
+            left = remaining()
+            # shield: a waiter giving up must not cancel the shared call
+            waiter = asyncio.shield(asyncio.wrap_future(v))
+            try:
+                return await (waiter if left is None else asyncio.wait_for(waiter, max(left, 0.0)))
+            except asyncio.CancelledError:
+                if v.cancelled():
+                    continue
+                raise
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("request deadline exceeded") from None
+
+    def clear(self):
+        with self._lock:
+            self._d.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._d), "max_entries": self.max_entries, "block_time_s": self.block_time_s,
+                    "inflight": len(self._inflight), "hits": self.hits, "misses": self.misses,
+                    "coalesced": self.coalesced, "evictions": self.evictions, "expired": self.expired}
+
+_CACHE: SimCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+def get_sim_cache() -> SimCache:
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                cfg = _cache_cfg()
+                _CACHE = SimCache(int(cfg.get("max_entries", 1024)), float(cfg.get("block_time_s", 12)))
+    return _CACHE
+
+def _counts() -> Dict[str, int]:
+    c = _CACHE
+    return {"hit": c.hits, "miss": c.misses, "coalesced": c.coalesced} if c else {}
+
+register_cache("sim", _counts)
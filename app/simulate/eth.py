@@ -1,26 +1,31 @@
-from web3 import Web3
-from app.core.config import rpc_for_chain, DEFAULT_BLOCK_TAG
-from typing import Any, Dict, Optional
+from app.core.config import snapshot
+from app.core.rpc import REGISTRY, BatchResult, RpcBatch, get_w3
+from typing import Any, Dict, List, Optional
 
-def get_w3(chain_id: int) -> Web3:
-    url = rpc_for_chain(chain_id)
-    if not url:
-        raise RuntimeError(f"No RPC configured for chain {chain_id}")
-    return Web3(Web3.HTTPProvider(url, request_kwargs={"timeout": 20}))
-
-def eth_call(chain_id: int, tx: Dict[str, Any], block_tag: str | int = DEFAULT_BLOCK_TAG) -> str:
+def eth_call(chain_id: int, tx: Dict[str, Any], block_tag: str | int | None = None) -> str:
+    block_tag = block_tag if block_tag is not None else snapshot().default_block_tag
     w3 = get_w3(chain_id)
     return w3.eth.call(tx, block_identifier=block_tag).hex()
 
-def create_access_list(chain_id: int, tx: Dict[str, Any], block_tag: str | int = DEFAULT_BLOCK_TAG):
+def eth_call_many(chain_id: int, txs: List[Dict[str, Any]], block_tag: str | int | None = None) -> List[BatchResult]:
+    # one round-trip for all calls, every one pinned to the same block
+    block_tag = block_tag if block_tag is not None else snapshot().default_block_tag
+    batch = RpcBatch(REGISTRY.for_chain(chain_id), block_tag)
+    for tx in txs:
+        batch.add("eth_call", [tx, batch.block])
+    return batch.execute()
+
+def create_access_list(chain_id: int, tx: Dict[str, Any], block_tag: str | int | None = None):
+    block_tag = block_tag if block_tag is not None else snapshot().default_block_tag
     w3 = get_w3(chain_id)
     try:
         return w3.provider.make_request("eth_createAccessList", [tx, block_tag])
     except Exception as e:
         return {"error": str(e)}
 
-def trace_call(chain_id: int, tx: Dict[str, Any], block_tag: str | int = DEFAULT_BLOCK_TAG):
+def trace_call(chain_id: int, tx: Dict[str, Any], block_tag: str | int | None = None):
     # requires trace_call support; not all nodes enable
+    block_tag = block_tag if block_tag is not None else snapshot().default_block_tag
     w3 = get_w3(chain_id)
     try:
         return w3.provider.make_request("trace_call", [tx, ["trace"], block_tag])
@@ -0,0 +1,148 @@
+"""
+debug_traceCall (callTracer) output -> SimCallNode tree, parsed as it streams in.
+
+Traces of large bundles run to many megabytes, nearly all of it call input
+and output data. The tokenizer keeps at most `max_str` bytes of any string,
+so memory grows with the number of call frames rather than the size of the
+trace, and each frame becomes a SimCallNode as soon as it closes. Nothing
+here recurses.
+
+`selector` carries the call kind: the 4-byte selector for CALL/STATICCALL,
+"delegatecall:0x…"/"callcode:0x…" for calls that run foreign code in the
+caller's context, and the bare kind ("create", "create2", "selfdestruct")
+otherwise.
+"""
+import json, re
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from app.models.schemas import SimCallNode
+
+MAX_STR = 1024
+CALL_TRACER = {"tracer": "callTracer"}
+
+_LBRACE, _RBRACE, _LBRACK, _RBRACK = b"{}[]"
+_STRING, _VALUE = "s", "v"
+
+_SKIP = re.compile(rb"[\s,:]*")
+_LIT = re.compile(rb"-?[0-9][0-9.eE+-]*|true|false|null")
+_WORD = re.compile(rb'[^\s,:{}\[\]"]*')
+_STR_BODY = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+
+def _decode(raw: bytes) -> str:
+    try:
+        return json.loads(b'"' + raw + b'"')
+    except ValueError:
+        # cut inside an escape sequence by the length cap
+        return raw.decode("utf-8", "replace")
+
+def tokens(chunks: Iterable[bytes], max_str: int = MAX_STR) -> Iterator[Tuple[Any, Any]]:
+    """
+    JSON tokens from a byte stream: (brace/bracket byte, None), ("s", str) or
+    ("v", number/bool/None). Separators are dropped; strings are cut to `max_str` bytes.
+    """
+    buf, pos = b"", 0
+    part: bytes | None = None        # string being read across chunk boundaries
+    for chunk in chunks:
+        buf = buf[pos:] + chunk
+        pos, n = 0, len(buf)
+        while True:
+            if part is not None:
+                end = _STR_BODY.match(buf, pos).end()
+                if len(part) < max_str:
+                    part += buf[pos:min(end, pos + max_str - len(part))]
+                if end < n and buf[end] == 0x22:
+                    yield _STRING, _decode(part)
+                    part, pos = None, end + 1
+                    continue
+                pos = end                # keep a dangling backslash for the next chunk
+                break
+            pos = _SKIP.match(buf, pos).end()
+            if pos >= n:
+                break
+            c = buf[pos]
+            if c == 0x22:
+                part, pos = b"", pos + 1
+            elif c in (_LBRACE, _RBRACE, _LBRACK, _RBRACK):
+                yield c, None
+                pos += 1
+            else:
+                end = _WORD.match(buf, pos).end()
+                if end == n:
+                    break                # the literal may continue in the next chunk
+                if not _LIT.fullmatch(buf, pos, end):
+                    raise ValueError(f"invalid JSON near {buf[pos:pos + 32]!r}")
+                yield _VALUE, json.loads(buf[pos:end])
+                pos = end
+    if part is not None:
+        raise ValueError("truncated JSON: unterminated string")
+    rest = buf[pos:].strip(b" \t\r\n,:")
+    if rest:
+        if not _LIT.fullmatch(rest):
+            raise ValueError(f"invalid JSON near {rest[:32]!r}")
+        yield _VALUE, json.loads(rest)
+
+def _selector(kind: str, data: str) -> str:
+    sel = data[:10].lower() if len(data) >= 10 else "0x"
+    if kind in ("call", "staticcall"):
+        return sel
+    if kind in ("delegatecall", "callcode"):
+        return f"{kind}:{sel}"
+    return kind
+
+def _is_frame(obj: Dict[str, Any]) -> bool:
+    return isinstance(obj.get("type"), str) and ("to" in obj or "from" in obj)
+
+def _frame_node(obj: Dict[str, Any]) -> SimCallNode:
+    return SimCallNode(target=obj.get("to") or "0x", selector=_selector(obj["type"].lower(), obj.get("input") or ""),
+                       children=[c for c in obj.get("calls") or [] if isinstance(c, SimCallNode)])
+
+def parse_call_trace(chunks: Iterable[bytes], max_str: int = MAX_STR) -> SimCallNode:
+    """Call tree from a streamed JSON-RPC response to debug_traceCall with the callTracer."""
+    stack: List[list] = []          # [container, pending key] for each open object/array
+    root: Any = None
+    for kind, v in tokens(chunks, max_str):
+        if kind == _LBRACE or kind == _LBRACK:
+            stack.append([{} if kind == _LBRACE else [], None])
+            continue
+        if kind == _RBRACE or kind == _RBRACK:
+            v = stack.pop()[0]
+            if kind == _RBRACE and _is_frame(v):
+                v = _frame_node(v)
+        elif stack and isinstance(stack[-1][0], dict) and stack[-1][1] is None:
+            stack[-1][1] = v        # an object key
+            continue
+        if not stack:
+            root = v
+            continue
+        top = stack[-1]
+        if isinstance(top[0], list):
+            top[0].append(v)
+        else:
+            top[0][top[1]] = v
+            top[1] = None
+    if stack or not isinstance(root, dict):
+        raise ValueError("truncated or malformed JSON-RPC response")
+    if root.get("error") is not None:
+        raise ValueError(root["error"])
+    if not isinstance(root.get("result"), SimCallNode):
+        raise ValueError("response carries no callTracer frame")
+    return root["result"]
+
+def call_tree_from_parity(traces: List[Dict[str, Any]]) -> SimCallNode:
+    """Call tree from trace_call's flat "trace" list (pre-order, addressed by traceAddress)."""
+    nodes: Dict[tuple, SimCallNode] = {}
+    for t in traces:
+        action, result = t.get("action") or {}, t.get("result") or {}
+        kind = (action.get("callType") or t.get("type") or "call").lower()
+        if kind == "suicide":
+            kind, target = "selfdestruct", action.get("refundAddress")
+        elif kind in ("create", "create2"):
+            target = result.get("address")
+        else:
+            target = action.get("to")
+        addr = tuple(t.get("traceAddress") or ())
+        node = nodes[addr] = SimCallNode(target=target or "0x", selector=_selector(kind, action.get("input") or ""))
+        if addr:
+            nodes[addr[:-1]].children.append(node)
+    if () not in nodes:
+        raise ValueError("trace_call returned no root frame")
+    return nodes[()]
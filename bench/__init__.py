@@ -0,0 +1,12 @@
+"""
+Performance suite for the hot paths (linkers, DAG, policies, hashing, attestation).
+
+    python -m bench                         # default sizes, results in bench/results/
+    python -m bench --filter link --sizes 1000 1000000
+    python -m bench --compare bench/results/<old>.json
+
+Workloads come from bench.generators; cases live in bench.suite.
+"""
+from bench.suite import CASES, compare, run_suite, write_results
+
+__all__ = ["CASES", "compare", "run_suite", "write_results"]
@@ -0,0 +1,44 @@
+import argparse, json, sys
+from bench.suite import CASES, compare, run_suite, write_results
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bench", description="Run the performance suite.")
+    p.add_argument("--filter", nargs="+", default=None, help="run cases whose name contains any of these")
+    p.add_argument("--sizes", type=int, nargs="+", default=None, help="override every case's default sizes")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--quick", action="store_true", help="smallest default size only, one repeat")
+    p.add_argument("--out", default=None, help="results file (default bench/results/<time>-<rev>.json)")
+    p.add_argument("--no-save", action="store_true")
+    p.add_argument("--compare", default=None, help="earlier results file to compare against")
+    p.add_argument("--max-regression", type=float, default=None,
+                   help="with --compare: exit 1 if any case is slower by more than this ratio (e.g. 1.25)")
+    p.add_argument("--list", action="store_true")
+    args = p.parse_args(argv)
+
+    if args.list:
+        for c in CASES.values():
+            print(f"{c.name:<20} {c.unit:<28} default sizes {list(c.sizes)}")
+        return 0
+    names = [n for n in CASES if not args.filter or any(f in n for f in args.filter)]
+    print(f"{'case':<20} {'size':>9} {'best_s':>10} {'median_s':>10} {'ns/op':>12}")
+
+    def show(row):
+        print(f"{row['case']:<20} {row['size']:>9} {row['best_s']:>10.4f} {row['median_s']:>10.4f} "
+              f"{row['ns_per_op'] or 0:>12.0f}", flush=True)
+
+    report = run_suite(names, args.sizes, 1 if args.quick else args.repeat, show, quick=args.quick)
+    if not args.no_save:
+        print(f"saved {write_results(report, args.out)}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            rows = compare(json.load(f), report)
+        print(f"\n{'case':<20} {'size':>9} {'old_s':>10} {'new_s':>10} {'ratio':>7}")
+        for r in rows:
+            print(f"{r['case']:<20} {r['size']:>9} {r['old_s']:>10.4f} {r['new_s']:>10.4f} {r['ratio']:>7.2f}")
+        if args.max_regression and any(r["ratio"] > args.max_regression for r in rows):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
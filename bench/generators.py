@@ -0,0 +1,178 @@
+"""
+Seeded synthetic workloads. Every generator is deterministic for a given
+(size, seed) so runs are comparable over time. The fixed payloads at the end
+(calldata builders, sample typed data) are shared by the tests and scripts.
+"""
+import random
+from typing import List, Tuple
+from eth_abi import encode
+from app.correlate.dag import IntentEvent
+from app.eip4337.calldata import selector_int
+from app.models.schemas import EIP712TypedData, SimCallNode, UserOperation
+
+TOKENS = ["USDC", "USDT", "WETH", "DAI", "WBTC", "OP", "ARB", "LINK"]
+L2S = [10, 8453, 42161]
+T0 = 1_700_000_000
+
+def crosschain_events(n: int, seed: int = 1, message_ids: float = 0.5, fee_bps: float = 10.0) -> List[IntentEvent]:
+    """
+    n events as bridge_out (chain 1) / bridge_in (an L2) pairs, the destination
+    short by up to `fee_bps`. A `message_ids` share of pairs carry a shared
+    messageId (deterministic linking); the rest only match on token, amount and
+    time. n=2 is the scripts/mock_events.py case: 1000 USDC out, 999 in.
+    """
+    if n == 2:
+        return [IntentEvent("e1", 1, "bridge_out", "USDC", 1000.0, {"messageId": "m1", "timestamp": T0}),
+                IntentEvent("e2", 10, "bridge_in", "USDC", 999.0, {"messageId": "m1", "timestamp": T0 + 60})]
+    rnd = random.Random(seed)
+    evs = []
+    for k in range(n // 2):
+        tkn = rnd.choice(TOKENS)
+        amt = round(rnd.lognormvariate(8, 2), 6)
+        ts = T0 + k
+        out_meta, in_meta = {"timestamp": ts}, {"timestamp": ts + rnd.randint(30, 600)}
+        if rnd.random() < message_ids:
+            out_meta["messageId"] = in_meta["messageId"] = f"0x{k:064x}"
+        evs.append(IntentEvent(f"o{k}", 1, "bridge_out", tkn, amt, out_meta))
+        evs.append(IntentEvent(f"i{k}", rnd.choice(L2S), "bridge_in", tkn,
+                               amt * (1 - rnd.random() * fee_bps / 10000), in_meta))
+    return evs
+
+DOMAIN_T = [{"name": "name", "type": "string"}, {"name": "version", "type": "string"},
+             {"name": "chainId", "type": "uint256"}, {"name": "verifyingContract", "type": "address"}]
+_SCHEMAS = {
+    "Permit": [{"name": "owner", "type": "address"}, {"name": "spender", "type": "address"},
+               {"name": "value", "type": "uint256"}, {"name": "nonce", "type": "uint256"},
+               {"name": "deadline", "type": "uint256"}],
+    "Order": [{"name": "maker", "type": "address"}, {"name": "sellToken", "type": "address"},
+              {"name": "buyToken", "type": "address"}, {"name": "sellAmount", "type": "uint256"},
+              {"name": "buyAmount", "type": "uint256"}, {"name": "validTo", "type": "uint32"},
+              {"name": "appData", "type": "bytes32"}, {"name": "kind", "type": "string"}],
+    "Mail": [{"name": "from", "type": "address"}, {"name": "to", "type": "address"},
+             {"name": "contents", "type": "string"}],
+}
+
+def _addr(rnd: random.Random) -> str:
+    return "0x" + rnd.randbytes(20).hex()
+
+def eip712_payloads(n: int, seed: int = 1, domains: int = 8) -> List[EIP712TypedData]:
+    """n typed-data requests over a few schemas and `domains` distinct domains (production-like reuse)."""
+    rnd = random.Random(seed)
+    doms = [{"name": f"Token{i}", "version": "1", "chainId": rnd.choice([1] + L2S), "verifyingContract": _addr(rnd)}
+            for i in range(domains)]
+    out = []
+    for _ in range(n):
+        primary = rnd.choice(["Permit", "Permit", "Order", "Mail"])
+        if primary == "Permit":
+            msg = {"owner": _addr(rnd), "spender": _addr(rnd), "value": rnd.choice([2**256 - 1, rnd.randrange(10**24)]),
+                   "nonce": rnd.randrange(100), "deadline": T0 + rnd.randrange(10**7)}
+        elif primary == "Order":
+            msg = {"maker": _addr(rnd), "sellToken": _addr(rnd), "buyToken": _addr(rnd),
+                   "sellAmount": rnd.randrange(10**24), "buyAmount": rnd.randrange(10**24),
+                   "validTo": T0 + rnd.randrange(10**5), "appData": "0x" + rnd.randbytes(32).hex(), "kind": "sell"}
+        else:
+            msg = {"from": _addr(rnd), "to": _addr(rnd), "contents": f"hello {rnd.random()}"}
+        out.append(EIP712TypedData(types={"EIP712Domain": DOMAIN_T, primary: _SCHEMAS[primary]},
+                                   primaryType=primary, domain=rnd.choice(doms), message=msg))
+    return out
+
+def call_tree(nodes: int, depth: int, seed: int = 1, delegatecall_share: float = 0.02) -> SimCallNode:
+    """
+    A call tree of `nodes` frames: one spine `depth` deep (nested proxies,
+    re-entrant routers) with the rest hung off it as shallow fan-out, built
+    bottom-up without recursion.
+    """
+    rnd = random.Random(seed)
+    spine = max(1, min(depth, nodes))
+    leaves_per_level = [0] * spine
+    for _ in range(nodes - spine):
+        # leaves hang one level below their spine frame, so the deepest frame takes none
+        leaves_per_level[rnd.randrange(max(1, spine - 1))] += 1
+
+    def frame(children) -> SimCallNode:
+        sel = "0x" + rnd.randbytes(4).hex()
+        if rnd.random() < delegatecall_share:
+            sel = "delegatecall:" + sel
+        return SimCallNode(target=_addr(rnd), selector=sel, children=children)
+
+    node = None
+    for level in range(spine - 1, -1, -1):
+        children = [frame([]) for _ in range(leaves_per_level[level])]
+        if node is not None:
+            children.insert(rnd.randrange(len(children) + 1), node)
+        node = frame(children)
+    return node
+
+def userops_with_trees(n: int, nodes: int = 200, depth: int = 64, seed: int = 1) -> List[Tuple[UserOperation, SimCallNode]]:
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        op = UserOperation(sender=_addr(rnd), nonce=hex(i), initCode="0x", callData="0x" + rnd.randbytes(68).hex(),
+                           callGasLimit=hex(200_000), verificationGasLimit=hex(100_000), preVerificationGas=hex(50_000),
+                           maxFeePerGas=hex(10**9), maxPriorityFeePerGas=hex(10**9), paymasterAndData="0x",
+                           signature="0x" + rnd.randbytes(65).hex())
+        out.append((op, call_tree(nodes, depth, seed=seed * 7919 + i)))
+    return out
+
+# --- fixed payloads, shared by the tests and the scripts/bench_*.py comparisons ---
+
+USDC = "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+PERMIT2_ADDRESS = "0x000000000022d473030f116ddee9f6b43ac78ba3"
+ROUTER = "0x3fc91a3afd70395cd496c647d5a6cc9d4b2b7fad"
+DEAD = "0x000000000000000000000000000000000000dEaD"
+MAX_UINT = 2**256 - 1
+_USDC = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"   # checksummed, as wallets send it in typed data
+
+def call(sig: str, types, args) -> bytes:
+    return selector_int(sig).to_bytes(4, "big") + encode(types, args)
+
+def approve(spender=PERMIT2_ADDRESS, amount=MAX_UINT) -> bytes:
+    return call("approve(address,uint256)", ["address", "uint256"], [spender, amount])
+
+def transfer() -> bytes:
+    return call("transfer(address,uint256)", ["address", "uint256"], [ROUTER, 5])
+
+def nested_execute(inner: bytes, depth: int) -> bytes:
+    for _ in range(depth):
+        inner = call("execute(address,uint256,bytes)", ["address", "uint256", "bytes"], [USDC, 0, inner])
+    return inner
+
+def multi_send(txs) -> bytes:
+    packed = b"".join(op.to_bytes(1, "big") + bytes.fromhex(to[2:]) + (0).to_bytes(32, "big")
+                      + len(data).to_bytes(32, "big") + data for op, to, data in txs)
+    return call("multiSend(bytes)", ["bytes"], [packed])
+
+PERMIT = {
+    "types": {"EIP712Domain": DOMAIN_T,
+              "Permit": [{"name": "owner", "type": "address"}, {"name": "spender", "type": "address"},
+                         {"name": "value", "type": "uint256"}, {"name": "nonce", "type": "uint256"},
+                         {"name": "deadline", "type": "uint256"}]},
+    "primaryType": "Permit",
+    "domain": {"name": "USD Coin", "version": "2", "chainId": 1, "verifyingContract": _USDC},
+    "message": {"owner": DEAD, "spender": _USDC, "value": 10**18, "nonce": 0, "deadline": 1900000000},
+}
+PERMIT2 = {
+    "types": {"EIP712Domain": [{"name": "name", "type": "string"}, {"name": "chainId", "type": "uint256"},
+                               {"name": "verifyingContract", "type": "address"}],
+              "PermitBatch": [{"name": "details", "type": "PermitDetails[]"}, {"name": "spender", "type": "address"},
+                              {"name": "sigDeadline", "type": "uint256"}],
+              "PermitDetails": [{"name": "token", "type": "address"}, {"name": "amount", "type": "uint160"},
+                                {"name": "expiration", "type": "uint48"}, {"name": "nonce", "type": "uint48"}]},
+    "primaryType": "PermitBatch",
+    "domain": {"name": "Permit2", "chainId": 1, "verifyingContract": "0x000000000022D473030F116dDEE9F6B43aC78BA3"},
+    "message": {"details": [{"token": _USDC, "amount": 5, "expiration": 1, "nonce": 0},
+                            {"token": DEAD, "amount": 2**160 - 1, "expiration": 2, "nonce": 1}],
+                "spender": DEAD, "sigDeadline": 7},
+}
+MAIL = {
+    "types": {"EIP712Domain": DOMAIN_T,
+              "Person": [{"name": "name", "type": "string"}, {"name": "wallets", "type": "address[]"}],
+              "Mail": [{"name": "from", "type": "Person"}, {"name": "to", "type": "Person[2]"},
+                       {"name": "contents", "type": "string"}, {"name": "attachment", "type": "bytes"},
+                       {"name": "grid", "type": "uint8[2][]"}]},
+    "primaryType": "Mail",
+    "domain": {"name": "Ether Mail", "version": "1", "chainId": 1, "verifyingContract": "0x" + "cc" * 20},
+    "message": {"from": {"name": "Cow", "wallets": [DEAD]},
+                "to": [{"name": "Bob", "wallets": []}, {"name": "Eve", "wallets": [_USDC, DEAD]}],
+                "contents": "Hello", "attachment": b"\x01\x02", "grid": [[1, 2], [3, 4], [5, 6]]},
+}
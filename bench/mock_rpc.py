@@ -0,0 +1,147 @@
+"""
+Tiny in-process JSON-RPC node for tests and load scripts: a ThreadingHTTPServer on 127.0.0.1
+that answers single and batch requests from a method -> handler table.
+"""
+import json, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+
+from eth_abi import encode as abi_encode
+from eth_utils import keccak
+
+DEPOSIT_SIG = "ERC20DepositInitiated(address,address,address,address,uint256,bytes)"
+BRIDGE = "0x99c9fc46f92e8a1c0dec1b1747d010903e884be1"
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code, self.message = code, message
+
+def _topic_addr(a: str) -> str:
+    return "0x" + "00" * 12 + a[2:].lower()
+
+def deposit_log(block: int, index: int, amount: int, token: str = "0x" + "11" * 20,
+                address: str = BRIDGE, extra: bytes = b"") -> Dict[str, Any]:
+    """An ERC20DepositInitiated log in JSON-RPC wire format."""
+    data = abi_encode(["address", "uint256", "bytes"], ["0x" + "44" * 20, amount, extra])
+    return {
+        "address": address,
+        "topics": ["0x" + keccak(text=DEPOSIT_SIG).hex(), _topic_addr(token),
+                   _topic_addr("0x" + "22" * 20), _topic_addr("0x" + "33" * 20)],
+        "data": "0x" + data.hex(),
+        "blockNumber": hex(block),
+        "blockHash": "0x" + keccak(block.to_bytes(32, "big")).hex(),
+        "transactionHash": "0x" + keccak(f"{block}:{index}".encode()).hex(),
+        "transactionIndex": hex(index),
+        "logIndex": hex(index),
+        "removed": False,
+    }
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 256   # the default backlog of 5 refuses bursts of concurrent clients
+
+    def handle_error(self, request, client_address):
+        # clients giving up on a slow node (deadlines, load tests) are expected
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+class MockNode:
+    """
+    Default methods: eth_chainId, eth_blockNumber and eth_getLogs over `logs`
+    (a list of wire-format logs). `max_range` / `max_results` make eth_getLogs
+    reject large queries the way hosted providers do; `latency` delays every
+    HTTP request. Extra methods go in `handlers`.
+    """
+    def __init__(self, logs: List[Dict[str, Any]] | None = None, head: int = 0, chain_id: int = 1,
+                 max_range: int | None = None, max_results: int | None = None, latency: float = 0.0):
+        self.logs = logs or []
+        self.head = head or max([int(l["blockNumber"], 16) for l in self.logs] or [0])
+        self.chain_id = chain_id
+        self.max_range, self.max_results, self.latency = max_range, max_results, latency
+        self.calls: List[tuple] = []
+        self.http_requests = 0
+        self.active = self.peak_active = 0   # concurrent HTTP requests being served
+        self.handlers: Dict[str, Callable[..., Any]] = {
+            "eth_chainId": lambda: hex(self.chain_id),
+            "eth_blockNumber": lambda: hex(self.head),
+            "eth_getLogs": self._get_logs,
+        }
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler_cls())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _get_logs(self, flt):
+        lo = int(flt.get("fromBlock", "0x0"), 16)
+        hi = int(flt.get("toBlock", hex(self.head)), 16) if flt.get("toBlock") != "latest" else self.head
+        if self.max_range is not None and hi - lo + 1 > self.max_range:
+            raise RpcError(-32600, f"block range too large, max is {self.max_range}")
+        topics = flt.get("topics") or []
+        addr = flt.get("address") or []
+        addrs = {a.lower() for a in ([addr] if isinstance(addr, str) else addr)}
+        out = [l for l in self.logs
+               if lo <= int(l["blockNumber"], 16) <= hi
+               and (not addrs or l["address"].lower() in addrs)
+               and (not topics or not topics[0] or l["topics"][0] == topics[0])]
+        if self.max_results is not None and len(out) > self.max_results:
+            raise RpcError(-32005, f"query returned more than {self.max_results} results")
+        return out
+
+    def _dispatch(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        method, params = req.get("method"), req.get("params") or []
+        with self._lock:
+            self.calls.append((method, params))
+        base = {"jsonrpc": "2.0", "id": req.get("id")}
+        fn = self.handlers.get(method)
+        if fn is None:
+            return {**base, "error": {"code": -32601, "message": f"method {method} not found"}}
+        try:
+            return {**base, "result": fn(*params)}
+        except RpcError as e:
+            return {**base, "error": {"code": e.code, "message": e.message}}
+
+    def _handler_cls(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with node._lock:
+                    node.http_requests += 1
+                    node.active += 1
+                    node.peak_active = max(node.peak_active, node.active)
+                try:
+                    if node.latency:
+                        time.sleep(node.latency)
+                    if isinstance(body, list):
+                        out = [node._dispatch(r) for r in body]
+                    else:
+                        out = node._dispatch(body)
+                finally:
+                    with node._lock:
+                        node.active -= 1
+                raw = json.dumps(out).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,76 @@
+"""
+Cold-start benchmark: `python -X importtime -c "import main"` in fresh
+interpreters, with a time budget and a list of modules that must not load
+at import (they belong to subsystems that load on first use).
+
+    python -m bench.startup                  # report, exit 1 over budget
+    python -m bench.startup --budget-ms 900 --repeat 7
+"""
+import argparse, re, statistics, subprocess, sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+BUDGET_MS = 1500.0      # `import main`, median of the runs; FastAPI itself is most of it
+DEFERRED = ("web3", "eth_account", "eth_abi", "eth_utils", "aiohttp", "requests", "sqlalchemy",
+            "networkx", "yaml")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int, int]]:
+    """module -> (self µs, cumulative µs, nesting level) from -X importtime output."""
+    out = {}
+    for ln in stderr.splitlines():
+        m = _LINE.match(ln)
+        if m:
+            out[m.group(4)] = (int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2)
+    return out
+
+def measure(module: str = "main") -> Dict[str, Tuple[int, int, int]]:
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                       cwd=ROOT, capture_output=True, text=True, timeout=120)
+    if r.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{r.stderr[-2000:]}")
+    return parse_importtime(r.stderr)
+
+def top_level(times: Dict[str, Tuple[int, int, int]], n: int = 10) -> List[Tuple[str, int]]:
+    """The n slowest packages imported (cumulative µs), counting each top-level package once."""
+    best: Dict[str, int] = {}
+    for mod, (_, cum, _) in times.items():
+        pkg = mod.split(".")[0]
+        best[pkg] = max(best.get(pkg, 0), cum)
+    return sorted(best.items(), key=lambda kv: -kv[1])[:n]
+
+def run(module: str = "main", repeat: int = 5) -> Dict[str, object]:
+    measure(module)                       # warm the bytecode cache; the first run also compiles
+    runs = [measure(module) for _ in range(repeat)]
+    totals = [t[module][1] / 1000 for t in runs]
+    last = runs[-1]
+    return {"module": module, "median_ms": statistics.median(totals), "min_ms": min(totals),
+            "deferred_loaded": sorted(m for m in DEFERRED if m in last),
+            "top": [(pkg, us / 1000) for pkg, us in top_level(last) if pkg != module]}
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bench.startup", description="Measure the API's import time.")
+    p.add_argument("--module", default="main")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = p.parse_args(argv)
+
+    res = run(args.module, args.repeat)
+    print(f"import {res['module']}: median {res['median_ms']:.0f} ms, min {res['min_ms']:.0f} ms "
+          f"(budget {args.budget_ms:.0f} ms)")
+    for pkg, ms in res["top"]:
+        print(f"  {pkg:<24} {ms:>8.1f} ms")
+    ok = True
+    if res["deferred_loaded"]:
+        print(f"FAIL: loaded at import, should load on first use: {', '.join(res['deferred_loaded'])}")
+        ok = False
+    if res["median_ms"] > args.budget_ms:
+        print("FAIL: over budget")
+        ok = False
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
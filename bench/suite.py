@@ -0,0 +1,154 @@
+"""
+Benchmark cases and the runner.
+
+A case builds its inputs in `setup(size, seed)` (untimed) and `run(state)`
+does the measured work, returning how many operations it performed so
+results are reported per operation as well as per run. Cases that consume
+their inputs (linkers add to a DAG) or that would otherwise hit warm caches
+get fresh inputs, with a new seed, for every repeat.
+"""
+import json, os, platform, statistics, subprocess, sys, time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+from bench import generators as gen
+from app.correlate.batch import EventBatch
+from app.correlate.dag import IntentDAG
+from app.correlate.linkers import deterministic_link, probabilistic_link
+from app.eip712.parser import eip712_hash
+from app.explain.attestation import attestation
+from app.policies.crosschain import conservation_by_component, conservation_check
+from app.policies.eip4337 import lint_userop
+from app.policies.eip712 import lint_eip712
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    setup: Callable[[int, int], Any]      # (size, seed) -> state
+    run: Callable[[Any], int]             # state -> operations performed
+    sizes: Tuple[int, ...]                # default sizes
+    unit: str                             # what `size` counts
+    fresh: bool = False                   # new inputs (and seed) every repeat
+
+def _linked_dag(n: int, seed: int, starts: int = 1000):
+    evs = gen.crosschain_events(n, seed)
+    dag = IntentDAG()
+    deterministic_link(dag, evs)
+    step = max(1, len(evs) // starts)
+    return dag, [ev.eid for ev in evs[::step] if ev.kind == "bridge_out"] or [evs[0].eid]
+
+def _link(fn) -> Callable[[Tuple[Any, list]], int]:
+    def run(st):
+        fn(*st)
+        return len(st[1])
+    return run
+
+def _each(fn) -> Callable[[List[Any]], int]:
+    def run(items):
+        for it in items:
+            fn(it)
+        return len(items)
+    return run
+
+def _whole_dag(fn) -> Callable[[Tuple[Any, list]], int]:
+    def run(st):
+        fn(st[0])
+        return len(st[0])
+    return run
+
+def _attest(mode: str):
+    def setup(n, seed):
+        return [{"type": "4337", "sender": op.sender, "callTree": tree, "blockTag": "latest"}
+                for op, tree in gen.userops_with_trees(n, seed=seed)]
+    return setup, _each(lambda p: attestation(p, mode=mode))
+
+CASES: Dict[str, Case] = {c.name: c for c in [
+    Case("deterministic_link", lambda n, s: (IntentDAG(), gen.crosschain_events(n, s)),
+         _link(deterministic_link),
+         (2, 10_000, 200_000), "events", fresh=True),
+    Case("probabilistic_link", lambda n, s: (IntentDAG(), gen.crosschain_events(n, s, message_ids=0.0)),
+         _link(probabilistic_link),
+         (2, 10_000, 100_000), "events", fresh=True),
+    Case("probabilistic_link_batch",
+         lambda n, s: (IntentDAG(), EventBatch.from_events(gen.crosschain_events(n, s, message_ids=0.0))),
+         _link(probabilistic_link),
+         (2, 10_000, 100_000), "events", fresh=True),
+    Case("path_amounts", _linked_dag, lambda st: _each(st[0].path_amounts)(st[1]),
+         (2, 10_000, 200_000), "events in the DAG"),
+    Case("conservation_check", _linked_dag, lambda st: _each(lambda e: conservation_check(st[0], e))(st[1]),
+         (2, 10_000, 200_000), "events in the DAG"),
+    Case("conservation_by_component", _linked_dag, _whole_dag(conservation_by_component),
+         (2, 10_000, 200_000), "events in the DAG", fresh=True),
+    Case("lint_eip712", lambda n, s: gen.eip712_payloads(n, s), _each(lint_eip712), (100, 5_000), "payloads"),
+    Case("eip712_hash", lambda n, s: gen.eip712_payloads(n, s), _each(eip712_hash), (100, 5_000), "payloads"),
+    Case("lint_userop", lambda n, s: gen.userops_with_trees(n, nodes=2_000, depth=512, seed=s),
+         _each(lambda it: lint_userop(it[1], it[0])), (10, 100), "userops (2000-frame trees)"),
+    Case("attestation_json", *_attest("json"), (10, 100), "userops (200-frame trees)", fresh=True),
+    Case("attestation_merkle", *_attest("merkle"), (10, 100), "userops (200-frame trees)", fresh=True),
+]}
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def environment() -> Dict[str, Any]:
+    return {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "git_rev": _git_rev(),
+            "python": sys.version.split()[0], "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "dag_backend": os.getenv("INTENT_GUARD_DAG_BACKEND", "compact")}
+
+def run_case(case: Case, size: int, repeat: int) -> Dict[str, Any]:
+    times, ops = [], 0
+    state = None if case.fresh else case.setup(size, 1)
+    for r in range(repeat):
+        if case.fresh:
+            state = case.setup(size, r + 1)
+        t0 = time.perf_counter()
+        ops = case.run(state)
+        times.append(time.perf_counter() - t0)
+    best = min(times)
+    return {"case": case.name, "size": size, "unit": case.unit, "repeat": repeat, "ops": ops,
+            "best_s": best, "median_s": statistics.median(times), "mean_s": statistics.fmean(times),
+            "ns_per_op": best / ops * 1e9 if ops else None}
+
+def run_suite(names: Iterable[str] | None = None, sizes: Sequence[int] | None = None, repeat: int = 5,
+              progress: Callable[[Dict[str, Any]], None] | None = None, quick: bool = False) -> Dict[str, Any]:
+    """
+    Run the selected cases (all by default) at their default sizes, or at
+    `sizes` when given; `quick` keeps only each case's smallest default size.
+    """
+    results = []
+    for name in names or CASES:
+        case = CASES[name]
+        for size in sizes or (case.sizes[:1] if quick else case.sizes):
+            row = run_case(case, size, repeat)
+            results.append(row)
+            if progress:
+                progress(row)
+    return {"environment": environment(), "results": results}
+
+def write_results(report: Dict[str, Any], path: str | Path | None = None) -> Path:
+    if path is None:
+        env = report["environment"]
+        stamp = env["timestamp"].replace(":", "").replace("-", "").replace("+0000", "Z")
+        path = RESULTS_DIR / f"{stamp}-{env['git_rev'] or 'nogit'}.json"
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + "\n")
+    return path
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rows present in both reports with new/old best-time ratios (> 1 is slower)."""
+    before = {(r["case"], r["size"]): r for r in old["results"]}
+    out = []
+    for r in new["results"]:
+        o = before.get((r["case"], r["size"]))
+        if o and o["best_s"] > 0:
+            out.append({"case": r["case"], "size": r["size"], "old_s": o["best_s"], "new_s": r["best_s"],
+                        "ratio": r["best_s"] / o["best_s"]})
+    return out
@@ -1,15 +1,67 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.api import bridge
 from app.api.routes import router as api_router
-from app.core.logging import configure_logging
+from app.core.logging import RequestContextMiddleware, configure_logging
 from app.api.bridge import router as bridge_router
-from app.api import sim_4337
+from app.api import sim, sim_4337
+from app.core.deadline import DeadlineExceeded, DeadlineMiddleware
+from app.core import metrics, profiling, warmup
+from app.core.rpc import REGISTRY
+from app.simulate.cache import get_sim_cache
 
-app = FastAPI(title="Intent Guard", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup.warm_in_background(warmup.startup_warm_list())
+    yield
+    await REGISTRY.aclose()
+
+# liveness/readiness probes skip the per-request middlewares that have nothing to do for them
+PROBE_PATHS = ("/health", "/ready")
+
+app = FastAPI(title="Intent Guard", version="0.1.0", lifespan=lifespan)
 configure_logging()
+app.add_middleware(profiling.ProfilingMiddleware, skip_paths=PROBE_PATHS)
+app.add_middleware(DeadlineMiddleware, skip_paths=PROBE_PATHS)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
+app.include_router(api_router)
 app.include_router(bridge.router)
+app.include_router(sim.router, tags=["simulate"])
 app.include_router(sim_4337.router, tags=["simulate"]) # Include sim_4337 router
 
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
 @app.get("/health")
 def health():
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
+
+@app.get("/ready")
+def ready(require: str | None = None):
+    """Which lazily loaded subsystems are warm; 503 if any of `require` (comma-separated) is not."""
+    subsystems = warmup.readiness()
+    missing = [n for n in (require or "").split(",") if n and not subsystems.get(n, {}).get("warm")]
+    return JSONResponse({"ready": not missing, "subsystems": subsystems}, status_code=503 if missing else 200)
+
+@app.get("/health/rpc")
+def health_rpc():
+    return REGISTRY.stats()
+
+@app.get("/health/sim_cache")
+def health_sim_cache():
+    return get_sim_cache().stats()
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profiles/{pid}", include_in_schema=False)
+def debug_profile(pid: str, x_profile: str | None = Header(None)):
+    """Collapsed stacks of a profiled request (X-Profile-Id of its response); needs the profiling token."""
+    text = profiling.load(pid) if profiling.token_ok(x_profile) else None
+    if text is None:
+        raise HTTPException(404, "unknown profile")
+    return PlainTextResponse(text)
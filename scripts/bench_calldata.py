@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Nested selector screening on large batched UserOperations: app.eip4337.calldata
+(one memoryview, slices only) against decoding every wrapper level with
+eth_abi and re-slicing hex strings, the obvious way to do it.
+
+    python scripts/bench_calldata.py --calls 2000 --n 200
+"""
+import argparse, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from eth_abi import decode
+from app.eip4337.userop import APPROVAL_SELECTORS, has_suspicious_selectors
+from bench.generators import USDC, approve, call, transfer
+
+EXECUTE_BATCH = "0x18dfb3c7"
+
+def naive(calldata_hex: str) -> bool:
+    todo = [calldata_hex.lower().replace("0x", "", 1)]
+    while todo:
+        h = todo.pop()
+        if len(h) < 8:
+            continue
+        sel = "0x" + h[:8]
+        if sel in APPROVAL_SELECTORS:
+            return True
+        if sel == EXECUTE_BATCH:
+            _, datas = decode(["address[]", "bytes[]"], bytes.fromhex(h[8:]))
+            todo.extend(d.hex() for d in datas)
+    return False
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--calls", type=int, default=2000, help="inner calls per batch")
+    p.add_argument("--n", type=int, default=200, help="batches screened")
+    args = p.parse_args()
+    data = "0x" + call("executeBatch(address[],bytes[])", ["address[]", "bytes[]"],
+                       [[USDC] * args.calls, [transfer()] * (args.calls - 1) + [approve()]]).hex()
+    print(f"payload {len(data) // 2 - 1} bytes, {args.calls} inner calls")
+    for name, fn in (("eth_abi + hex copies", naive), ("memoryview walk", has_suspicious_selectors)):
+        assert fn(data)
+        t0 = time.perf_counter()
+        for _ in range(args.n):
+            fn(data)
+        dt = (time.perf_counter() - t0) / args.n
+        print(f"{name:>22}: {dt * 1000:8.2f} ms/batch")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Memory and traversal benchmark: compact vs networkx IntentDAG backends.
+
+    python scripts/bench_dag.py --sizes 10000 100000 1000000
+
+Each graph holds n/2 bridge_out -> bridge_in pairs plus a sparse layer of
+cross links, built from freshly decoded-looking events (meta included).
+"""
+import argparse, gc, random, sys, time, tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.correlate.dag import CompactIntentDAG, IntentEvent, NxIntentDAG
+
+TOKENS = ["USDC", "USDT", "WETH", "DAI"]
+
+def build(cls, n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    dag = cls()
+    for k in range(n // 2):
+        tkn = rnd.choice(TOKENS)
+        amt = rnd.uniform(1, 10_000)
+        mid = f"0x{k:064x}"
+        dag.add(IntentEvent(f"0x{k:064x}:0", 1, "bridge_out", tkn, amt, {"messageId": mid, "adapter": "bench"}))
+        dag.add(IntentEvent(f"0x{k:064x}:1", 10, "bridge_in", tkn, amt, {"messageId": mid, "adapter": "bench"}))
+        dag.link(f"0x{k:064x}:0", f"0x{k:064x}:1", 1.0)
+        if k and rnd.random() < 0.1:
+            dag.link(f"0x{k:064x}:1", f"0x{rnd.randrange(k):064x}:0", 0.7)
+    return dag
+
+def measure(cls, n: int, starts: int):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    dag = build(cls, n)
+    build_s = time.perf_counter() - t0
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    rnd = random.Random(2)
+    keys = [f"0x{rnd.randrange(n // 2):064x}:0" for _ in range(starts)]
+    dag.path_amounts(keys[0])  # builds the CSR for the compact backend
+    t0 = time.perf_counter()
+    for k in keys:
+        dag.path_amounts(k)
+    walk_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    n_edges = sum(1 for _ in dag.edges())
+    edges_s = time.perf_counter() - t0
+    return mem, build_s, walk_s / starts, edges_s, n_edges
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p.add_argument("--starts", type=int, default=1000, help="path_amounts calls per size")
+    p.add_argument("--backends", nargs="+", default=["compact", "networkx"])
+    args = p.parse_args()
+    classes = {"compact": CompactIntentDAG, "networkx": NxIntentDAG}
+    print(f"{'backend':>9} {'nodes':>9} {'edges':>9} {'MiB':>9} {'B/node':>8} {'build_s':>8} {'path_us':>8} {'edges_s':>8}")
+    for n in args.sizes:
+        for name in args.backends:
+            mem, build_s, walk_s, edges_s, n_edges = measure(classes[name], n, args.starts)
+            print(f"{name:>9} {n:>9} {n_edges:>9} {mem/2**20:>9.1f} {mem/n:>8.0f} {build_s:>8.2f} {walk_s*1e6:>8.1f} {edges_s:>8.2f}")
+
+if __name__ == "__main__":
+    main()
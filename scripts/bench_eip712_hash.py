@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+EIP-712 digest throughput: eth_account's encode_structured_data (re-derives
+type hashes and the domain separator every call) against app.eip712.hashing
+(compiled once per schema, cached domain separators).
+
+    python scripts/bench_eip712_hash.py --n 20000
+"""
+import argparse, copy, random, sys, time, warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from eth_account.messages import _hash_eip191_message, encode_structured_data
+from app.eip712.hashing import cache_info, typed_data_hash
+from bench.generators import MAIL, PERMIT, PERMIT2
+
+def workload(n: int, seed: int = 1) -> list[dict]:
+    # a handful of schemas and domains, fresh message values every request
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        d = copy.deepcopy(rnd.choice([PERMIT, PERMIT, PERMIT2, MAIL]))
+        d["domain"]["chainId"] = rnd.choice([1, 10, 8453, 42161])
+        if d["primaryType"] == "Permit":
+            d["message"]["value"] = rnd.randrange(2**128)
+        elif d["primaryType"] == "PermitBatch":
+            d["message"]["sigDeadline"] = rnd.randrange(2**40)
+        else:
+            d["message"]["contents"] = f"hello {rnd.random()}"
+        out.append(d)
+    return out
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--n", type=int, default=20000)
+    args = p.parse_args()
+    data = workload(args.n)
+
+    warnings.simplefilter("ignore", DeprecationWarning)
+    t0 = time.perf_counter()
+    ref = [_hash_eip191_message(encode_structured_data(primitive=d)) for d in data]
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    got = [typed_data_hash(d) for d in data]
+    t_new = time.perf_counter() - t0
+
+    assert got == ref, "digests differ"
+    print(f"n={args.n}  eth_account {args.n / t_ref:9.0f}/s   cached {args.n / t_new:9.0f}/s   x{t_ref / t_new:.1f}")
+    print(cache_info())
+
+if __name__ == "__main__":
+    main()
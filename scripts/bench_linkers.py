@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for probabilistic_link.
+
+    python scripts/bench_linkers.py --max 1000000
+
+Prints wall time per size and the time normalised by n*log2(n); a flat last
+column means the linker scales close to O(n log n).
+"""
+import argparse, math, random, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.correlate.dag import IntentDAG, IntentEvent
+from app.correlate.linkers import probabilistic_link
+
+TOKENS = ["USDC", "USDT", "WETH", "DAI", "WBTC", "OP", "ARB", "LINK"]
+
+def synth_events(n: int, seed: int = 1) -> list[IntentEvent]:
+    # half bridge_out on L1, half matching bridge_in on an L2 with a small fee taken
+    rnd = random.Random(seed)
+    evs = []
+    for k in range(n // 2):
+        tkn = rnd.choice(TOKENS)
+        amt = round(rnd.lognormvariate(8, 2), 6)
+        ts = 1_700_000_000 + k
+        evs.append(IntentEvent(f"o{k}", 1, "bridge_out", tkn, amt, {"timestamp": ts}))
+        evs.append(IntentEvent(f"i{k}", rnd.choice([10, 8453, 42161]), "bridge_in", tkn,
+                               amt * (1 - rnd.random() * 0.0005), {"timestamp": ts + 60}))
+    return evs
+
+def naive_link(dag: IntentDAG, events: list[IntentEvent], tol_bps: float, window: float | None) -> int:
+    # the previous all-pairs implementation, kept for comparison at small n
+    links = 0
+    for i in range(len(events)):
+        for j in range(i+1, len(events)):
+            a, b = events[i], events[j]
+            if a.token != b.token or a.chain == b.chain: continue
+            if window and abs(a.meta["timestamp"] - b.meta["timestamp"]) > window: continue
+            if abs(a.amount - b.amount) <= (tol_bps/10000)*max(abs(a.amount), 1e-12):
+                dag.link(a.eid, b.eid, confidence=0.7)
+                links += 1
+    return links
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--min", type=int, default=1_000)
+    p.add_argument("--max", type=int, default=1_000_000)
+    p.add_argument("--window", type=float, default=600, help="time_window_s for the run (0 = amount/token only)")
+    p.add_argument("--naive-max", type=int, default=4_000, help="largest n to also run the all-pairs linker on")
+    args = p.parse_args()
+
+    from app.core.config import snapshot
+    tol_bps = snapshot().crosschain.amount_tol_bps
+
+    print(f"{'n':>10} {'links':>10} {'indexed_s':>10} {'naive_s':>10} {'ns/(n log n)':>13}")
+    sizes, n = [], args.min
+    while n < args.max:
+        sizes.append(n); n *= 10
+    sizes.append(args.max)
+    for n in sizes:
+        evs = synth_events(n)
+        t0 = time.perf_counter()
+        links = len(probabilistic_link(IntentDAG(), evs, time_window_s=args.window))
+        dt = time.perf_counter() - t0
+        naive = "-"
+        if n <= args.naive_max:
+            t0 = time.perf_counter()
+            naive_link(IntentDAG(), evs, tol_bps, args.window or None)
+            naive = f"{time.perf_counter() - t0:.3f}"
+        print(f"{n:>10} {links:>10} {dt:>10.3f} {naive:>10} {dt*1e9/(n*math.log2(n)):>13.1f}")
+
+if __name__ == "__main__":
+    main()
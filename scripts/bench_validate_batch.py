@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Throughput of the batch validation endpoints against the single-item ones.
+
+    uvicorn main:app --port 8000 &
+    python scripts/bench_validate_batch.py --n 500
+
+Both modes reuse one keep-alive session, so the difference is per-request
+HTTP, routing and model overhead.
+"""
+import argparse, json, time
+import requests
+
+PERMIT = {
+    "types": {"Permit": [{"name": "spender", "type": "address"}, {"name": "value", "type": "uint256"},
+                         {"name": "deadline", "type": "uint256"}]},
+    "primaryType": "Permit",
+    "domain": {"name": "USD Coin", "version": "2", "chainId": 1,
+               "verifyingContract": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"},
+    "message": {"spender": "0x000000000000000000000000000000000000dEaD", "value": 0, "deadline": 1900000000},
+}
+USEROP = {
+    "sender": "0x000000000000000000000000000000000000bEEF", "nonce": "0x0", "initCode": "0x",
+    "callData": "0x", "callGasLimit": "0x5208", "verificationGasLimit": "0x186a0",
+    "preVerificationGas": "0xc350", "maxFeePerGas": "0x3b9aca00", "maxPriorityFeePerGas": "0x3b9aca00",
+    "paymasterAndData": "0x",
+}
+
+def items(kind: str, n: int):
+    if kind == "eip712":
+        return [{**PERMIT, "message": {**PERMIT["message"], "value": k}} for k in range(n)]
+    return [{**USEROP, "nonce": hex(k)} for k in range(n)]
+
+def run(url: str, kind: str, n: int):
+    s = requests.Session()
+    data = items(kind, n)
+    t0 = time.perf_counter()
+    single = [s.post(f"{url}/v1/validate/{kind}", json=d).json() for d in data]
+    t_single = time.perf_counter() - t0
+
+    body = "\n".join(json.dumps(d) for d in data)
+    t0 = time.perf_counter()
+    r = s.post(f"{url}/v1/validate/{kind}/batch", data=body, headers={"Content-Type": "application/x-ndjson"})
+    batch = [json.loads(ln) for ln in r.iter_lines() if ln]
+    t_batch = time.perf_counter() - t0
+
+    assert batch == single, "batch verdicts differ from single-item verdicts"
+    print(f"{kind:>7} n={n:<6} single {n / t_single:9.0f} items/s   batch {n / t_batch:9.0f} items/s"
+          f"   x{t_single / t_batch:.1f}")
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--url", default="http://127.0.0.1:8000")
+    p.add_argument("--n", type=int, default=500)
+    args = p.parse_args()
+    for kind in ("eip712", "4337"):
+        run(args.url, kind, args.n)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tail latency of a healthy upstream while another upstream is slow.
+
+    python scripts/load_async_rpc.py --slow-latency 3 --requests 300
+
+Starts two stand-in RPC nodes (chain 1 slow, chain 8453 fast) and the API
+in a uvicorn subprocess, then measures /v1/simulate/eoa latency against the fast chain
+alone and again while a flood of requests is stuck on the slow chain. With
+the async RPC path the two distributions should match; on the old blocking
+path the slow requests held every threadpool worker and the fast ones queued.
+"""
+import argparse, asyncio, os, socket, statistics, subprocess, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import aiohttp
+import requests
+from bench.mock_rpc import MockNode
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))]
+
+async def _hit(session, url, chain, out):
+    t0 = time.perf_counter()
+    async with session.post(url, json={"chainId": chain, "from": "0x" + "22" * 20, "to": "0x" + "11" * 20, "data": "0x"}) as r:
+        ok = r.status == 200 and (await r.json()).get("will_succeed")
+        out.append((time.perf_counter() - t0, ok))
+
+async def _phase(base, n_fast, n_slow, concurrency):
+    url = f"{base}/v1/simulate/eoa"
+    fast, slow = [], []
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as s:
+        slow_tasks = [asyncio.create_task(_hit(s, url, 1, slow)) for _ in range(n_slow)]
+        await asyncio.sleep(0.2)   # let the slow requests occupy the server first
+        sem = asyncio.Semaphore(concurrency)
+        async def one():
+            async with sem:
+                await _hit(s, url, 8453, fast)
+        await asyncio.gather(*[one() for _ in range(n_fast)])
+        await asyncio.gather(*slow_tasks)
+    return fast, slow
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--requests", type=int, default=300, help="fast-chain requests per phase")
+    p.add_argument("--slow", type=int, default=200, help="concurrent requests parked on the slow chain")
+    p.add_argument("--slow-latency", type=float, default=3.0)
+    p.add_argument("--fast-latency", type=float, default=0.01)
+    p.add_argument("--concurrency", type=int, default=10)
+    args = p.parse_args()
+
+    slow_node = MockNode(latency=args.slow_latency, chain_id=1)
+    fast_node = MockNode(latency=args.fast_latency, chain_id=8453)
+    for n in (slow_node, fast_node):
+        n.handlers["eth_call"] = lambda tx, block: "0x"
+        n.__enter__()
+    port = _free_port()
+    env = {**os.environ, "RPC_MAINNET": slow_node.url, "RPC_BASE": fast_node.url}
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                               "--log-level", "warning"], cwd=ROOT, env=env)
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{base}/health", timeout=1)
+            break
+        except requests.ConnectionError:
+            time.sleep(0.1)
+
+    for label, n_slow in (("fast chain alone", 0), (f"with {args.slow} stuck on slow chain", args.slow)):
+        fast, slow = asyncio.run(_phase(base, args.requests, n_slow, args.concurrency))
+        lat = [t * 1000 for t, _ in fast]
+        print(f"{label:>32}: p50 {statistics.median(lat):7.1f} ms  p95 {_pct(lat, 95):7.1f} ms  "
+              f"p99 {_pct(lat, 99):7.1f} ms  max {max(lat):7.1f} ms  errors {sum(not ok for _, ok in fast)}")
+        if slow:
+            print(f"{'':>32}  slow chain: {sum(ok for _, ok in slow)}/{len(slow)} ok, max {max(t for t, _ in slow):.2f} s")
+
+    server.terminate()
+    server.wait()
+    for n in (slow_node, fast_node):
+        n.__exit__(None, None, None)
+
+if __name__ == "__main__":
+    main()
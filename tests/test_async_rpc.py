@@ -0,0 +1,98 @@
+import asyncio, json, threading, time
+import pytest
+from web3 import Web3
+from app.core.deadline import DEADLINE_HEADER, DeadlineExceeded, DeadlineMiddleware, deadline, remaining
+from app.core.rpc import AsyncRpcClient, PoolSettings
+from app.correlate.linkers import BridgeAdapter
+from app.correlate.logfetch import AsyncLogFetcher, FetchSettings, LogFetcher
+from app.correlate.store import EventStore, fetch_bridge_src_events_cached, fetch_bridge_src_events_cached_async
+from bench.mock_rpc import BRIDGE, DEPOSIT_SIG, MockNode, deposit_log
+
+def test_async_fetcher_matches_sync():
+    logs = [deposit_log(b, i, b) for b in range(1, 3000, 3) for i in range(2)]
+    st = FetchSettings(chunk_blocks=2000, concurrency=3)
+    flt = {"address": Web3.to_checksum_address(BRIDGE)}
+    with MockNode(logs, head=3000, max_range=400, max_results=300) as node:
+        want = LogFetcher(Web3(Web3.HTTPProvider(node.url)), -1, st).fetch(flt, 0, 3000)
+
+        async def run():
+            c = AsyncRpcClient("t", node.url, PoolSettings())
+            f = AsyncLogFetcher(c.w3, -1, st)
+            try:
+                return await f.fetch(flt, 0, 3000), f.splits
+            finally:
+                await c.aclose()
+        got, splits = asyncio.run(run())
+    assert got == want and splits > 0
+
+def test_deadline_cuts_slow_upstream_short():
+    with MockNode(head=1, latency=1.0) as node:
+        async def run():
+            c = AsyncRpcClient("slow", node.url, PoolSettings(timeout_s=20))
+            try:
+                with deadline(0.2):
+                    await c.call("eth_blockNumber", [])
+            finally:
+                await c.aclose()
+        t0 = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            asyncio.run(run())
+        assert time.monotonic() - t0 < 0.8
+
+def test_deadline_header_only_shortens(monkeypatch):
+    monkeypatch.setattr("app.core.deadline.default_deadline_s", lambda: 2.0)
+    seen = []
+    async def app(scope, receive, send):
+        seen.append(remaining())
+    mw = DeadlineMiddleware(app)
+    for ms in (b"500", b"3600000", b"junk"):
+        asyncio.run(mw({"type": "http", "path": "/", "headers": [(DEADLINE_HEADER.encode(), ms)]}, None, None))
+    assert 0.4 < seen[0] <= 0.5 and 1.9 < seen[1] <= 2.0 and 1.9 < seen[2] <= 2.0
+
+def test_inflight_limit_per_upstream():
+    with MockNode(head=5, latency=0.05) as node:
+        async def run():
+            c = AsyncRpcClient("t", node.url, PoolSettings(max_inflight=2))
+            res = await asyncio.gather(*[c.call("eth_blockNumber", []) for _ in range(8)])
+            await c.aclose()
+            return res, c.stats()
+        res, st = asyncio.run(run())
+    assert res == ["0x5"] * 8 and st["calls"] == 8
+    assert node.peak_active <= 2
+
+def test_streamed_call_is_consumed_off_the_loop():
+    result = ["ab" * 50] * 20000     # ~2 MB response
+    with MockNode() as node:
+        node.handlers["debug_big"] = lambda: result
+
+        def consume(chunks):
+            parts = list(chunks)
+            return threading.get_ident(), len(parts), json.loads(b"".join(parts))["result"]
+
+        async def run():
+            c = AsyncRpcClient("t", node.url, PoolSettings())
+            try:
+                return threading.get_ident(), await c.call_stream("debug_big", [], consume, chunk_size=1 << 14)
+            finally:
+                await c.aclose()
+        loop_thread, (consumer, n, got) = asyncio.run(run())
+    assert consumer != loop_thread and n > 1 and got == result
+
+def test_async_store_path_matches_sync(tmp_path):
+    fields = {"message_id_components": ["l1Token", "to", "amount"], "token": "l1Token", "amount": "amount"}
+    adapter = BridgeAdapter("op", 1, 10, BRIDGE, DEPOSIT_SIG, fields, from_block="latest-999")
+    logs = [deposit_log(b, 0, b) for b in range(1, 1001, 4)]
+    with MockNode(logs, head=1000) as node:
+        want = fetch_bridge_src_events_cached(Web3(Web3.HTTPProvider(node.url)), adapter,
+                                              EventStore(f"sqlite:///{tmp_path}/a.db"), confirmations=10)
+        store = EventStore(f"sqlite:///{tmp_path}/b.db")
+
+        async def run():
+            c = AsyncRpcClient("t", node.url, PoolSettings())
+            await fetch_bridge_src_events_cached_async(c.w3, adapter, store, confirmations=10)
+            evs = await fetch_bridge_src_events_cached_async(c.w3, adapter, store, confirmations=10)
+            await c.aclose()
+            return evs
+        got = asyncio.run(run())
+    assert [(e.eid, e.amount) for e in got] == [(e.eid, e.amount) for e in want]
+    assert got[0].meta["decode_stats"]["from_store"] > 0
@@ -0,0 +1,98 @@
+import gzip, json, multiprocessing, os
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from web3 import Web3
+from app.correlate.backfill import _LIMITERS, Checkpoint, RateLimiter, _init_worker, backfill, gaps, merge, shards
+from app.correlate.columnar import iter_events, read_batch, read_shard, write_shard
+from app.correlate.linkers import BridgeAdapter, decode_bridge_batch, fetch_bridge_src_events, src_log_filter
+from app.correlate.logfetch import LogFetcher
+from bench.mock_rpc import BRIDGE, DEPOSIT_SIG, MockNode, deposit_log
+
+CFG = {"name": "op", "src_chain": 1, "dst_chain": 10, "src_address": BRIDGE, "event_signature": DEPOSIT_SIG,
+       "fields": {"message_id_components": ["l1Token", "to", "amount"], "token": "l1Token", "amount": "amount"}}
+LOGS = [deposit_log(b, b % 3, 10**18 + b, token="0x" + ("11" if b % 2 else "55") * 20) for b in range(3, 1000, 7)]
+
+def _strip(evs):
+    return [(e.eid, e.chain, e.kind, e.token, e.amount, {k: v for k, v in e.meta.items() if k != "decode_stats"})
+            for e in evs]
+
+def _fetch(lo, hi):
+    adapter = BridgeAdapter.from_config({**CFG, "from_block": str(lo), "to_block": str(hi)})
+    with MockNode(LOGS, head=hi) as node:
+        return fetch_bridge_src_events(Web3(Web3.HTTPProvider(node.url)), adapter)
+
+def _fetch_batch(lo, hi):
+    adapter = BridgeAdapter.from_config(CFG)
+    with MockNode(LOGS, head=hi) as node:
+        logs = LogFetcher(Web3(Web3.HTTPProvider(node.url)), 1).fetch(src_log_filter(adapter), lo, hi)
+    return decode_bridge_batch(adapter, logs)[0]
+
+def _read_all(out):
+    d = os.path.join(out, "op")
+    return [e for f in sorted(os.listdir(d)) if f.endswith(".cols.json.gz") for e in iter_events(os.path.join(d, f))]
+
+def _get_logs_ranges(node):
+    return [(int(p[0]["fromBlock"], 16), int(p[0]["toBlock"], 16)) for m, p in node.calls if m == "eth_getLogs"]
+
+def test_ranges():
+    assert merge([(6, 9), (1, 5), (20, 30), (25, 26)]) == [(1, 9), (20, 30)]
+    assert gaps([(1, 9), (20, 30)], 0, 40) == [(0, 0), (10, 19), (31, 40)]
+    assert gaps([(0, 100)], 10, 20) == []
+    assert shards([(0, 24), (40, 44)], 10) == [(0, 9), (10, 19), (20, 24), (40, 44)]
+
+def test_columns_round_trip(tmp_path):
+    evs = _fetch(0, 999)
+    batch = _fetch_batch(0, 999)
+    path = str(tmp_path / "s.cols.json.gz")
+    assert write_shard(path, "op", 1, 0, 999, batch) == len(evs)
+    doc = read_shard(path)
+    assert (doc["from_block"], doc["to_block"], doc["rows"]) == (0, 999, len(evs))
+    with gzip.open(path, "rt") as f:
+        assert len(f.read()) < len(json.dumps([e.__dict__ for e in evs])) / 2
+    assert _strip(iter_events(path)) == _strip(evs)
+    # the token amounts are written and read back exactly, not as the floats they round to
+    exact = [10**18 + int(l["blockNumber"], 16) for l in LOGS]
+    assert doc["columns"]["amount"] == [str(a) for a in exact]
+    assert read_batch(path).amounts() == exact
+
+def test_backfill_resumes_from_checkpoint(tmp_path):
+    out = str(tmp_path / "out")
+    with MockNode(LOGS, head=1100) as node:
+        kw = dict(workers=2, shard_blocks=200, rps=0, confirmations=100, rpc={1: node.url})
+        first = backfill([CFG], out, "0", **kw, max_shards=2)
+        assert first["op"]["written"] == 2 and first["op"]["to_block"] == 1000
+        done = Checkpoint(os.path.join(out, "op"), BridgeAdapter.from_config(CFG)).done
+        assert done == [(0, 399)]
+        node.calls.clear()
+        second = backfill([CFG], out, "0", **kw)
+        assert second["op"]["written"] == 4 and second["op"]["failed"] == 0
+        assert min(lo for lo, _ in _get_logs_ranges(node)) == 400
+        # nothing left to do
+        assert backfill([CFG], out, "0", **kw)["op"]["shards"] == 0
+    assert _strip(_read_all(out)) == _strip(_fetch(0, 1000))
+    d = os.path.join(out, "op")
+    got = [a for f in sorted(os.listdir(d)) if f.endswith(".cols.json.gz") for a in read_batch(os.path.join(d, f)).amounts()]
+    assert got == [10**18 + int(l["blockNumber"], 16) for l in LOGS]
+    assert Checkpoint(os.path.join(out, "op"), BridgeAdapter.from_config(CFG)).done == [(0, 1000)]
+
+def test_checkpoint_rejects_changed_adapter(tmp_path):
+    Checkpoint(str(tmp_path), BridgeAdapter.from_config(CFG)).mark(0, 9, 1)
+    with pytest.raises(ValueError, match="--reset"):
+        Checkpoint(str(tmp_path), BridgeAdapter.from_config({**CFG, "event_signature": "Other(uint256)"}))
+
+def _take(n):
+    return [_LIMITERS["u"].acquire() for _ in range(n)]
+
+def test_rate_limit_spans_worker_processes(tmp_path):
+    # the slots the shared limiter hands out, not wall-clock arrival times: those jitter with process start-up
+    ctx = multiprocessing.get_context("forkserver")
+    limiter = RateLimiter(20, ctx)
+    with ProcessPoolExecutor(4, mp_context=ctx, initializer=_init_worker, initargs=({"u": limiter},)) as ex:
+        slots = sorted(s for got in ex.map(_take, [2] * 4) for s in got)
+    assert len(slots) == 8
+    assert all(b - a >= 0.05 * (1 - 1e-9) for a, b in zip(slots, slots[1:]))
+
+    with MockNode(LOGS, head=1000) as node:
+        res = backfill([CFG], str(tmp_path), "0", "799", workers=4, shard_blocks=100, rps=20,
+                       confirmations=0, rpc={1: node.url})
+        assert res["op"]["written"] == 8 and [c[0] for c in node.calls].count("eth_getLogs") == 8
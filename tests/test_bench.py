@@ -0,0 +1,35 @@
+import json
+from bench.__main__ import main
+from bench.generators import call_tree, crosschain_events, eip712_payloads
+from bench.suite import CASES, compare, run_suite, write_results
+from app.policies.eip4337 import walk
+
+def test_generators_are_seeded():
+    assert [e.eid for e in crosschain_events(2)] == ["e1", "e2"]          # scripts/mock_events.py
+    a, b = crosschain_events(1000, seed=3), crosschain_events(1000, seed=3)
+    assert len(a) == 1000 and [(e.eid, e.amount) for e in a] == [(e.eid, e.amount) for e in b]
+    assert eip712_payloads(20, seed=3) == eip712_payloads(20, seed=3)
+    tree = call_tree(500, depth=300)
+    depth, deepest = {id(tree): 1}, 1
+    for parent, n in walk(tree):
+        if parent is not None:
+            depth[id(n)] = depth[id(parent)] + 1
+            deepest = max(deepest, depth[id(n)])
+    assert len(depth) == 500 and deepest == 300
+
+def test_suite_runs_every_case_and_round_trips(tmp_path):
+    report = run_suite(sizes=[2], repeat=1)
+    assert {r["case"] for r in report["results"]} == set(CASES)
+    assert all(r["ops"] > 0 and r["best_s"] >= 0 for r in report["results"])
+    path = write_results(report, tmp_path / "run.json")
+    again = json.loads(path.read_text())
+    assert again["environment"]["python"] and {r["ratio"] for r in compare(again, report)} == {1.0}
+
+def test_cli(tmp_path, capsys):
+    out = tmp_path / "r.json"
+    assert main(["--quick", "--filter", "link", "--out", str(out)]) == 0
+    assert [r["case"] for r in json.loads(out.read_text())["results"]] == ["deterministic_link", "probabilistic_link",
+                                                                             "probabilistic_link_batch"]
+    assert main(["--quick", "--filter", "deterministic", "--no-save", "--compare", str(out),
+                 "--max-regression", "1e9"]) == 0
+    assert "ratio" in capsys.readouterr().out
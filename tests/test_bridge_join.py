@@ -0,0 +1,80 @@
+import asyncio
+from collections import Counter
+from app.core.rpc import AsyncRpcClient, PoolSettings
+from app.correlate.dag import IntentEvent
+from app.correlate.join import StreamingJoin, join_bridge_events
+from app.correlate.linkers import BridgeAdapter
+from bench.mock_rpc import BRIDGE, DEPOSIT_SIG, MockNode, deposit_log
+
+L2_BRIDGE = "0x4200000000000000000000000000000000000010"
+CFG = {"name": "op", "src_chain": 1, "dst_chain": 10, "src_address": BRIDGE, "event_signature": DEPOSIT_SIG,
+       "fields": {"message_id_components": ["l1Token", "to", "amount"], "token": "l1Token", "amount": "amount"},
+       "dst_address": L2_BRIDGE, "dst_event_signature": DEPOSIT_SIG,
+       "from_block": "1", "to_block": "latest", "dst_from_block": "1", "dst_to_block": "latest"}
+
+def _ev(mid, eid=None):
+    return IntentEvent(eid or mid, 1, "bridge_out", "T", 1.0, {"messageId": mid})
+
+def test_join_matches_expires_and_caps():
+    j = StreamingJoin(max_delay_s=100, skew_s=10, max_pending=3)
+    assert j.push("src", _ev("a"), 0) == [] and j.push("src", _ev("b"), 5) == []
+    [m] = j.push("dst", _ev("a", "a-in"), 30)
+    assert (m.status, m.src.eid, m.dst.eid, m.delay_s) == ("matched", "a", "a-in", 30)
+    assert j.push("dst", _ev("x"), 40) == []
+    assert j.advance("dst", 104) == []                         # b waits until dst passes 5 + 100
+    [e] = j.advance("dst", 105)
+    assert (e.status, e.src.eid, e.dst) == ("expired", "b", None)
+    [e] = j.advance("src", 50)                                  # x: no deposit up to 40 + 10
+    assert (e.status, e.dst.eid) == ("expired", "x")
+    # identical deposits pair first-in, first-out
+    for k, t in enumerate((200, 201, 202)):
+        j.push("src", _ev("dup", f"d{k}"), t)
+    assert [r.src.eid for r in j.push("src", _ev("z"), 203)] == ["d0"]    # over max_pending: oldest evicted
+    assert j.push("dst", _ev("dup", "in"), 210)[0].src.eid == "d1"
+    assert sorted((r.status, (r.src or r.dst).eid) for r in j.close()) == [("open", "d2"), ("open", "z")]
+    assert j.counts == {"matched": 2, "expired": 2, "evicted": 1, "open": 2}
+
+def _block_handler(t0, block_time):
+    def get_block(number, full=False):
+        b = int(number, 16)
+        return {"number": hex(b), "hash": "0x" + f"{b:064x}", "parentHash": "0x" + f"{max(b - 1, 0):064x}",
+                "timestamp": hex(t0 + b * block_time), "transactions": []}
+    return get_block
+
+def test_streaming_join_across_two_nodes():
+    # deposits every 10 L1 blocks (12 s); each lands on L2 (2 s blocks) 120 s later, except every 7th
+    src_logs, dst_logs, want = [], [], set()
+    for k, b in enumerate(range(10, 2000, 10)):
+        src_logs.append(deposit_log(b, 0, 1000 + k))
+        if k % 7:
+            dst_logs.append(deposit_log(b * 6 + 60, 0, 1000 + k, address=L2_BRIDGE))
+            want.add(k)
+    # deposits made before the source range: their bridge_in has no counterpart
+    dst_logs[:0] = [deposit_log(b, 1, 5, address=L2_BRIDGE) for b in (1, 2)]
+    adapter = BridgeAdapter.from_config(CFG)
+    with MockNode(src_logs, head=2000, max_range=300) as l1, \
+            MockNode(dst_logs, head=12000, chain_id=10, max_range=1500) as l2:
+        l1.handlers["eth_getBlockByNumber"] = _block_handler(0, 12)
+        l2.handlers["eth_getBlockByNumber"] = _block_handler(0, 2)
+
+        join = StreamingJoin(max_delay_s=600)
+
+        async def run():
+            c1, c2 = AsyncRpcClient("l1", l1.url, PoolSettings()), AsyncRpcClient("l2", l2.url, PoolSettings())
+            try:
+                return [r async for r in join_bridge_events(c1.w3, c2.w3, adapter, queue_chunks=1, join=join)]
+            finally:
+                await c1.aclose()
+                await c2.aclose()
+        res = asyncio.run(run())
+    by = Counter(r.status for r in res)
+    matched = [r for r in res if r.status == "matched"]
+    assert {int(r.src.amount) - 1000 for r in matched} == want
+    assert all(r.src.kind == "bridge_out" and r.dst.kind == "bridge_in" and r.dst.chain == 10 for r in matched)
+    assert {round(r.delay_s) for r in matched} == {120}
+    unmatched_src = [r for r in res if r.src and not r.dst]
+    assert len(unmatched_src) == len(src_logs) - len(want)
+    assert sum(1 for r in res if r.dst and not r.src) == 2
+    assert by["evicted"] == 0 and by["expired"] >= 20
+    # only the events inside the delay window (plus a chunk) are ever held
+    assert max(join.peak.values()) < len(src_logs) / 3
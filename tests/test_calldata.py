@@ -0,0 +1,64 @@
+import pytest
+from app.eip4337.calldata import MAX_DEPTH, UNREADABLE, iter_calls
+from app.eip4337.userop import extract_selectors_from_calldata, has_suspicious_selectors
+from bench.generators import ROUTER, USDC, approve, call, multi_send, nested_execute, transfer
+
+def _sels(data):
+    return [(t, "unreadable" if s == UNREADABLE else f"0x{s:08x}") for t, s in iter_calls(data, target="0xacc")]
+
+def test_simple_account_batch():
+    data = call("executeBatch(address[],bytes[])", ["address[]", "bytes[]"],
+                [[USDC, USDC], [transfer(), approve()]])
+    assert _sels(data) == [("0xacc", "0x18dfb3c7"), (USDC, "0xa9059cbb"), (USDC, "0x095ea7b3")]
+    assert has_suspicious_selectors("0x" + data.hex())
+    assert not has_suspicious_selectors("0x" + call("executeBatch(address[],bytes[])", ["address[]", "bytes[]"],
+                                                    [[USDC], [transfer()]]).hex())
+
+def test_safe_executeuserop_multisend():
+    inner = multi_send([(0, USDC, transfer()), (0, USDC, approve()), (0, ROUTER, b"")])
+    data = call("executeUserOp(address,uint256,bytes,uint8)", ["address", "uint256", "bytes", "uint8"],
+                ["0x9641d764fc13c8b624c04430c7356c1c7c8102e2", 0, inner, 1])
+    assert _sels(data) == [("0xacc", "0x7bb37428"), ("0x9641d764fc13c8b624c04430c7356c1c7c8102e2", "0x8d80ff0a"),
+                           (USDC, "0xa9059cbb"), (USDC, "0x095ea7b3")]
+
+def test_multicall3_router_multicall_and_coinbase_batch():
+    router = call("multicall(uint256,bytes[])", ["uint256", "bytes[]"], [2**40, [transfer(), approve()]])
+    agg = call("aggregate3((address,bool,bytes)[])", ["(address,bool,bytes)[]"],
+               [[(ROUTER, True, router), (USDC, False, transfer())]])
+    data = call("executeBatch((address,uint256,bytes)[])", ["(address,uint256,bytes)[]"],
+                [[("0xca11bde05977b3631167028862be2a173976ca11", 0, agg)]])
+    assert _sels(data) == [("0xacc", "0x34fcd5be"), ("0xca11bde05977b3631167028862be2a173976ca11", "0x82ad56cb"),
+                           (ROUTER, "0x5ae401dc"), (ROUTER, "0xa9059cbb"), (ROUTER, "0x095ea7b3"),
+                           (USDC, "0xa9059cbb")]
+
+def test_malformed_wrappers_do_not_stop_the_scan():
+    good = call("execute(address,uint256,bytes)", ["address", "uint256", "bytes"], [USDC, 0, approve()])
+    truncated = good[:-40]
+    bad_len = bytearray(good)
+    bad_len[4 + 96 + 31] = 0xff                      # inner length past the end
+    for data in (truncated, bytes(bad_len)):
+        assert _sels(data) == [("0xacc", "0xb61d27f6"), ("0xacc", "unreadable")]
+        assert has_suspicious_selectors("0x" + data.hex())
+    # a broken wrapper inside a batch flags its own branch; the rest is still read
+    batch = call("executeBatch(address[],bytes[])", ["address[]", "bytes[]"], [[USDC, USDC], [truncated, transfer()]])
+    assert _sels(batch)[1:] == [(USDC, "0xb61d27f6"), (USDC, "unreadable"), (USDC, "0xa9059cbb")]
+    assert extract_selectors_from_calldata("0x") == []
+    assert extract_selectors_from_calldata("0x095ea7b3zz") == ["0x095ea7b3"]
+    assert extract_selectors_from_calldata("not hex") == []
+
+def test_nesting_depth_is_bounded():
+    sels = extract_selectors_from_calldata(nested_execute(approve(), 20).hex())
+    assert len(sels) == MAX_DEPTH + 2 and sels[-1] == "unreadable" and "0x095ea7b3" not in sels
+    # past the limit the payload cannot be shown clean, whatever it hides
+    assert has_suspicious_selectors("0x" + nested_execute(approve(), MAX_DEPTH + 1).hex())
+    assert has_suspicious_selectors("0x" + nested_execute(transfer(), MAX_DEPTH + 1).hex())
+    assert has_suspicious_selectors("0x" + nested_execute(approve(), MAX_DEPTH).hex())
+    assert not has_suspicious_selectors("0x" + nested_execute(transfer(), MAX_DEPTH).hex())
+
+@pytest.mark.parametrize("n", [1, 2000])
+def test_large_batch_is_scanned_in_one_pass(n):
+    data = call("executeBatch(address[],bytes[])", ["address[]", "bytes[]"],
+                [[USDC] * n, [transfer()] * (n - 1) + [approve()]])
+    assert len(data) > 100_000 or n == 1
+    assert extract_selectors_from_calldata("0x" + data.hex())[-1] == "0x095ea7b3"
+    assert has_suspicious_selectors("0x" + data.hex())
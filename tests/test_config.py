@@ -0,0 +1,42 @@
+import os
+import pytest
+from app.core.config import ConfigStore
+
+BASE = """
+global: {default_block_tag: latest}
+policies:
+  eip712: {trusted_chain_ids: [1, 8453], trusted_verifying_contracts: ["0xAbC"]}
+  eip4337: {vetted_factories: ["0xFaC"], vetted_implementations: ["0xImPl"]}
+crosschain: {probabilistic: {amount_tol_bps: 25}}
+bridges: [{name: op-standard, src_chain: 1}]
+"""
+
+def _write(path, text, mtime):
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+
+def test_snapshot_is_compiled(tmp_path):
+    p = tmp_path / "config.yaml"
+    _write(p, BASE, 1_000_000)
+    s = ConfigStore(str(p), check_interval=0).get()
+    assert s.eip712.trusted_chain_ids == {1, 8453}
+    assert "0xabc" in s.eip712.trusted_verifying_contracts
+    assert "0xfac" in s.eip4337.vetted_factories and s.eip4337.vetted_implementations == {"0ximpl"}
+    assert s.crosschain.amount_tol_bps == 25.0 and s.crosschain.time_window_s is None
+    assert s.bridges["op-standard"]["src_chain"] == 1
+    with pytest.raises(TypeError):
+        s.bridges["x"] = {}
+
+def test_reload_on_mtime_change_and_keep_old_on_error(tmp_path):
+    p = tmp_path / "config.yaml"
+    _write(p, BASE, 1_000_000)
+    store = ConfigStore(str(p), check_interval=0)
+    first = store.get()
+    assert store.get() is first  # unchanged file: same object, no re-parse
+
+    _write(p, BASE.replace("amount_tol_bps: 25", "amount_tol_bps: 50"), 1_000_010)
+    second = store.get()
+    assert second is not first and second.crosschain.amount_tol_bps == 50.0
+
+    _write(p, "policies: [unclosed", 1_000_020)
+    assert store.get() is second
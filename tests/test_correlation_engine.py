@@ -0,0 +1,85 @@
+import random
+import pytest
+from fastapi import HTTPException
+from app.api import routes
+from app.correlate.dag import IntentDAG, IntentEvent
+from app.correlate.engine import CorrelationEngine
+from app.correlate.linkers import probabilistic_link
+from app.policies.crosschain import conservation_by_component
+
+def test_stream_links_and_verdict():
+    eng = CorrelationEngine(horizon_s=600)
+    eng.ingest(IntentEvent("a", 1, "bridge_out", "USDC", 1000.0, {"messageId": "m1", "timestamp": 100}))
+    logs = eng.ingest(IntentEvent("b", 10, "bridge_in", "USDC", 990.0, {"messageId": "m1", "timestamp": 160}))
+    assert "link a -> b" in logs
+    assert any(i.code == "XCC-CONS" for i in eng.check("a"))
+
+def test_stream_balanced_pair_is_clean():
+    eng = CorrelationEngine(horizon_s=600)
+    eng.ingest(IntentEvent("a", 1, "bridge_out", "USDC", 1000.0, {"messageId": "m1", "timestamp": 100}))
+    eng.ingest(IntentEvent("b", 10, "bridge_in", "USDC", 1000.0, {"messageId": "m1", "timestamp": 160}))
+    eng.ingest(IntentEvent("c", 1, "bridge_out", "USDC", 7.0, {"messageId": "m2", "timestamp": 170}))
+    assert eng.check("a") == [] and eng.check("b") == []
+    # an unrelated, unbalanced intent elsewhere in the window is reported against its own root only
+    assert [i.eid for i in eng.check("c")] == ["c"]
+
+def test_stream_evicts_past_horizon():
+    eng = CorrelationEngine(horizon_s=60)
+    eng.ingest(IntentEvent("a", 1, "bridge_out", "USDC", 1000.0, {"messageId": "m1", "timestamp": 0}))
+    eng.ingest(IntentEvent("b", 10, "bridge_in", "USDC", 5.0, {"timestamp": 1000}))
+    assert "a" not in eng and eng.check("a") is None
+    assert eng.ingest(IntentEvent("c", 10, "bridge_in", "USDC", 1000.0, {"messageId": "m1", "timestamp": 1001})) == []
+
+def test_stream_matches_batch_linker():
+    rnd = random.Random(3)
+    evs = [IntentEvent(f"e{i}", rnd.choice([1, 10]), "bridge_out", rnd.choice(["USDC", "DAI"]),
+                       rnd.choice([1000.0, 1000.5, 998.0, 0.0, 1e-13, rnd.uniform(1, 5000)]), {"timestamp": i})
+           for i in range(300)]
+    eng = CorrelationEngine(horizon_s=10**9, time_window_s=0)
+    streamed = set()
+    for ev in evs:
+        streamed |= set(eng.ingest(ev))
+    assert streamed == set(probabilistic_link(IntentDAG(), evs))
+
+@pytest.mark.parametrize("bad", [{"amount": "1000"}, {"meta": {"timestamp": "soon"}}, {"kind": None, "amount": None}])
+def test_bad_events_leave_no_trace(bad):
+    eng = CorrelationEngine(horizon_s=600)
+    eng.ingest(IntentEvent("a", 1, "bridge_out", "USDC", 1000.0, {"messageId": "m1", "timestamp": 100}))
+    ev = {"eid": "b", "chain": 10, "kind": "bridge_in", "token": "USDC", "amount": 1000.0,
+          "meta": {"messageId": "m1", "timestamp": 160}, **bad}
+    with pytest.raises((TypeError, ValueError)):
+        eng.ingest(IntentEvent(**ev))
+    assert len(eng) == len(eng.dag) == 1 and eng.check("a") is not None
+
+def test_stream_route_rejects_bad_payload_whole(monkeypatch):
+    eng = CorrelationEngine(horizon_s=600)
+    monkeypatch.setattr(routes, "get_engine", lambda: eng)
+    good = {"eid": "a", "chain": 1, "kind": "bridge_out", "token": "USDC", "amount": 5, "meta": {"timestamp": 1}}
+    for bad in ({**good, "eid": "b", "amount": "lots"}, {**good, "eid": "b", "meta": {"timestamp": "x"}},
+                {"eid": "b", "chain": 10}):
+        with pytest.raises(HTTPException) as e:
+            routes.stream_ingest([good, bad])
+        assert e.value.status_code == 422
+    assert len(eng) == len(eng.dag) == 0
+    assert routes.stream_ingest([good])["retained"] == 1
+
+def test_check_walks_only_the_component():
+    eng = CorrelationEngine(horizon_s=10**9, time_window_s=0)
+    for i in range(40):
+        eng.ingest(IntentEvent(f"o{i}", 1, "bridge_out", "USDC", 1000.0 + i * 50, {"messageId": f"m{i}", "timestamp": i}))
+        eng.ingest(IntentEvent(f"i{i}", 10, "bridge_in", "USDC", 1000.0 + i * 50 - (i % 2) * 20,
+                               {"messageId": f"m{i}", "timestamp": i}))
+    want = {(i.eid, i.msg) for i in conservation_by_component(eng.dag, tol_bps=eng.tol_bps)}
+    eng.dag.component_flows = eng.dag.component_index = None    # the whole-window pass is never used
+    got = {(i.eid, i.msg) for e in list(eng._events) for i in eng.check(e)}
+    assert got == want and len(want) == 20 and eng.check("i4") == []
+
+def test_kind_overflow_is_a_clean_rejection(monkeypatch):
+    eng = CorrelationEngine(horizon_s=10**9)
+    monkeypatch.setattr(routes, "get_engine", lambda: eng)
+    ev = lambda i, kind: {"eid": f"e{i}", "chain": 1, "kind": kind, "token": "T", "amount": 1, "meta": {"timestamp": i}}
+    routes.stream_ingest([ev(i, f"k{i}") for i in range(251)])
+    with pytest.raises(HTTPException) as e:
+        routes.stream_ingest([ev(251, "k251")])
+    assert e.value.status_code == 422 and len(eng) == len(eng.dag) == 251
+    assert routes.stream_ingest([ev(252, "k7")])["retained"] == 252
@@ -1,5 +1,5 @@
 from app.correlate.dag import IntentDAG, IntentEvent
-from app.policies.crosschain import conservation_check
+from app.policies.crosschain import conservation_by_component, conservation_check
 
 def test_conservation_warn():
     dag = IntentDAG()
@@ -8,3 +8,16 @@ def test_conservation_warn():
     dag.add(a); dag.add(b); dag.link("a","b",1.0)
     issues = conservation_check(dag, "a")
     assert any(i.code=="XCC-CONS" for i in issues)
+
+def test_conservation_per_component():
+    dag = IntentDAG()
+    evs = [IntentEvent("o1", 1, "bridge_out", "USDC", 1000.0, {}), IntentEvent("i1", 10, "bridge_in", "USDC", 1000.0, {}),
+           IntentEvent("o2", 1, "bridge_out", "WETH", 5.0, {}), IntentEvent("i2", 10, "bridge_in", "WETH", 4.0, {}),
+           IntentEvent("s2", 10, "swap", "WETH", 9.0, {}),
+           IntentEvent("o3", 1, "bridge_out", "DAI", 7.0, {})]
+    for e in evs:
+        dag.add(e)
+    dag.link("o1", "i1"); dag.link("o2", "i2"); dag.link("i2", "s2")
+    issues = conservation_by_component(dag)
+    assert [(i.code, i.eid) for i in issues] == [("XCC-CONS", "o2"), ("XCC-CONS", "o3")]
+    assert "net=1.0" in issues[0].msg and "in=0.0" in issues[1].msg
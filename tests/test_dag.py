@@ -0,0 +1,65 @@
+import random
+import pytest
+from app.correlate.dag import CompactIntentDAG, IntentEvent, NxIntentDAG
+
+def _build(cls, seed=11, n=300):
+    rnd = random.Random(seed)
+    dag = cls()
+    for i in range(n):
+        dag.add(IntentEvent(f"e{i}", rnd.choice([1, 10]), rnd.choice(["bridge_out", "bridge_in"]),
+                            rnd.choice(["USDC", "WETH"]), float(rnd.randint(1, 100)), {}))
+    for _ in range(2 * n):
+        dag.link(f"e{rnd.randrange(n)}", f"e{rnd.randrange(n)}", rnd.choice([1.0, 0.7]))
+    for i in rnd.sample(range(n), 40):
+        dag.remove(f"e{i}")
+    return dag
+
+def test_compact_matches_networkx():
+    nx_dag, cdag = _build(NxIntentDAG), _build(CompactIntentDAG)
+    assert list(cdag.edges()) == list(nx_dag.edges())
+    for i in range(0, 300, 7):
+        eid = f"e{i}"
+        if eid not in nx_dag:
+            continue
+        got, want = cdag.path_amounts(eid), nx_dag.path_amounts(eid)
+        assert got.keys() == want.keys()
+        assert all(got[k] == pytest.approx(want[k]) for k in want)
+
+def test_compact_event_roundtrip():
+    dag = CompactIntentDAG()
+    dag.add(IntentEvent("a", 8453, "settle", "DAI", 2.5, {"x": 1}))
+    ev = dag.event("a")
+    assert (ev.chain, ev.kind, ev.token, ev.amount) == (8453, "settle", "DAI", 2.5)
+
+def test_component_flows_match_networkx():
+    signs = {"bridge_out": 1, "bridge_in": -1}
+    nx_dag, cdag = _build(NxIntentDAG, n=400), _build(CompactIntentDAG, n=400)
+    cdag.link("e1", "late-node")             # link targets without an event join a component
+    nx_dag.link("e1", "late-node")
+    got, want = cdag.component_flows(signs), nx_dag.component_flows(signs)
+    assert [r[:2] for r in got] == [r[:2] for r in want]
+    assert all(g[2:] == pytest.approx(w[2:]) for g, w in zip(got, want))
+
+def test_components_roots():
+    dag = CompactIntentDAG()
+    for eid in "abcdef":
+        dag.add(IntentEvent(eid, 1, "bridge_out", "USDC", 1.0, {}))
+    dag.link("b", "a"); dag.link("b", "c")   # root b (a was added first but has an incoming edge)
+    dag.link("d", "e"); dag.link("e", "d")   # cycle: earliest member
+    label, roots = dag.components()
+    assert [dag._eids[r] for r in roots] == ["b", "d", "f"]
+    assert label[0] == label[1] == label[2] != label[3] == label[4] != label[5]
+    dag.remove("b")
+    assert [dag._eids[r] for r in dag.components()[1]] == ["a", "c", "d", "f"]
+
+def test_compact_refuses_too_many_kinds_without_changing():
+    dag = CompactIntentDAG()
+    for k in range(256 - len(dag._kinds)):
+        dag.add(IntentEvent(f"e{k}", 1, f"kind{k}", "T", 1.0, {}))
+    n, kinds = len(dag), len(dag._kinds)
+    for bad in (IntentEvent("x", 1, "one-too-many", "T", 1.0, {}), IntentEvent("y", 1, "swap", "T", "1", {})):
+        with pytest.raises((ValueError, TypeError)):
+            dag.add(bad)
+    assert (len(dag), len(dag._kinds)) == (n, kinds) and "x" not in dag and "y" not in dag
+    dag.add(IntentEvent("z", 1, "kind3", "T", 1.0, {}))     # known kinds still go in
+    assert dag.event("z").kind == "kind3"
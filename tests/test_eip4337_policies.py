@@ -10,3 +10,11 @@ def test_delegatecall_block():
         maxPriorityFeePerGas="0x0",paymasterAndData="0x")
     issues = lint_userop(tree, op)
     assert any(i.code=="AA-DEL" and i.sev=="error" for i in issues)
+
+def test_unreadable_calldata_is_flagged():
+    from bench.generators import nested_execute, transfer
+    op = UserOperation(sender="0xS",nonce="0x1",initCode="0x",callData="0x" + nested_execute(transfer(), 9).hex(),
+        callGasLimit="0x0",verificationGasLimit="0x0",preVerificationGas="0x0",maxFeePerGas="0x0",
+        maxPriorityFeePerGas="0x0",paymasterAndData="0x")
+    issues = lint_userop(SimCallNode(target="0xS", selector="0x"), op)
+    assert [i.code for i in issues] == ["AA-APR"]
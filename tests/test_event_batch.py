@@ -0,0 +1,147 @@
+import gc, random, tracemalloc
+from fractions import Fraction
+import pytest
+from fastapi import HTTPException
+from hexbytes import HexBytes
+from app.api.routes import validate_crosschain
+from app.correlate.batch import EventBatch, format_units, to_units
+from app.correlate.dag import CompactIntentDAG, IntentDAG, IntentEvent, NxIntentDAG
+from app.correlate.linkers import (BridgeAdapter, decode_bridge_batch, decode_bridge_logs, deterministic_link,
+                                   probabilistic_link)
+from app.policies.crosschain import conservation_by_component
+from bench.mock_rpc import BRIDGE, DEPOSIT_SIG, deposit_log
+
+TX = "0x" + "ab" * 32
+CFG = {"name": "op", "src_chain": 1, "dst_chain": 10, "src_address": BRIDGE, "event_signature": DEPOSIT_SIG,
+       "fields": {"message_id_components": ["l1Token", "to", "amount"], "token": "l1Token", "amount": "amount"}}
+
+def test_units():
+    assert to_units(0.1, 18) == 10**17 and to_units(1e-7, 7) == 1 and to_units("0x10", 0) == 16
+    assert to_units(2.5e-7, 6) == 0 and to_units(3.5e-6, 6) == 4          # half-even past the scale
+    assert to_units(10**30, 2) == 10**32 and to_units(-1.25, 2) == -125
+    assert format_units(-125, 2) == "-1.25" and format_units(10**17, 18) == "0.1" and format_units(7, 0) == "7"
+    assert to_units("1.5", 1, exact=True) == 15
+    for bad in ("1.25", float("nan"), float("inf")):
+        with pytest.raises(ValueError):
+            to_units(bad, 1, exact=True)
+
+@pytest.mark.parametrize("amount, msg", [("0." + "0" * 18 + "1", "more than 18 decimal places"),
+                                         (float("nan"), "not a finite number"), ("lots", "not a number")])
+def test_payload_amounts_must_be_exact(amount, msg):
+    rows = [{"eid": "ok", "chain": 1, "kind": "bridge_out", "token": "T", "amount": "1.5", "meta": {}},
+            {"eid": "bad", "chain": 10, "kind": "bridge_in", "token": "T", "amount": amount, "meta": {}}]
+    with pytest.raises(ValueError, match=f"event bad: .*{msg}"):
+        EventBatch.from_dicts(rows)
+    with pytest.raises(HTTPException) as e:
+        validate_crosschain(rows)
+    assert e.value.status_code == 422 and "event bad" in e.value.detail
+
+def test_events_round_trip():
+    evs = [IntentEvent(f"{TX}:3", 1, "bridge_out", "USDC", 1000.25, {"messageId": "0x" + "01" * 32, "timestamp": 5.5}),
+           IntentEvent(f"{TX.upper()}:03", 10, "bridge_in", None, -7.0, {"messageId": None, "to": None}),
+           IntentEvent("e3", 8453, "custom", "WETH", float(2**70), {"blockNumber": 12, "note": [1, 2], "from": {}}),
+           IntentEvent("e4", 1, "claim", "WETH", float("nan"), {"timestamp": "17", "blockNumber": "x"}),
+           IntentEvent(f"{TX}:x:0", 1, "swap", "WETH", 1e-9, {})]
+    b = EventBatch.from_events(evs)
+    assert (len(b), b.scale) == (5, 9)
+    got = b.to_events()
+    assert got[:3] + got[4:] == evs[:3] + evs[4:]
+    assert got[3].amount != got[3].amount and got[3].meta == evs[3].meta
+    assert b.timestamps() == [5.5, None, None, 17.0, None]
+    assert b.amount(2) == 11805916207174113 * 10**(5 + 9) and b[-1].eid == f"{TX}:x:0"
+    rows = [dict(e.__dict__) for e in evs[:3]]
+    assert EventBatch.from_dicts(rows).to_events() == evs[:3]
+    with pytest.raises(TypeError):
+        EventBatch.from_dicts([{"eid": "x", "chain": 1}])
+
+def _logs(n):
+    logs = []
+    for b in range(n):
+        lg = deposit_log(b, b % 5, 10**18 * (b % 97) + b, token="0x" + ("11" if b % 2 else "55") * 20)
+        lg["transactionHash"] = HexBytes(lg["transactionHash"])
+        lg["blockNumber"], lg["logIndex"] = int(lg["blockNumber"], 16), int(lg["logIndex"], 16)
+        logs.append(lg)
+    return logs
+
+def _allocated(fn):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        keep = fn()
+        return tracemalloc.get_traced_memory()[0], keep
+    finally:
+        tracemalloc.stop()
+
+def test_decoded_batch_matches_events_in_a_fraction_of_the_memory():
+    adapter, logs = BridgeAdapter.from_config(CFG), _logs(1000)
+    evs, stats = decode_bridge_logs(adapter, logs)
+    batch, batch_stats = decode_bridge_batch(adapter, logs)
+    assert batch_stats == stats and batch.to_events() == evs
+    assert batch.amount(999) == 10**18 * (999 % 97) + 999              # exact, unlike evs[999].amount
+    ev_bytes, _ = _allocated(lambda: decode_bridge_logs(adapter, logs)[0])
+    batch_bytes, _ = _allocated(lambda: decode_bridge_batch(adapter, logs)[0])
+    assert batch_bytes * 3 < ev_bytes
+
+def _exact_naive(evs, tol_bps, window=None):
+    tol = Fraction(tol_bps) / 10000
+    logs = []
+    for i, a in enumerate(evs):
+        for b in evs[i+1:]:
+            if a.token != b.token or a.chain == b.chain: continue
+            ta, tb = a.meta.get("timestamp"), b.meta.get("timestamp")
+            if window and ta is not None and tb is not None and abs(ta - tb) > window: continue
+            if abs(Fraction(a.amount) - Fraction(b.amount)) <= tol * abs(Fraction(a.amount)):
+                logs.append(f"p-link {a.eid} -> {b.eid} (0.7)")
+    return logs
+
+@pytest.mark.parametrize("window", [None, 30])
+def test_batch_link_is_exact(window):
+    rnd = random.Random(11)
+    base = 10**24
+    evs = []
+    for i in range(300):
+        amt = rnd.choice([base, base + base // 400, base + base // 400 + 1, base - 1, 0, rnd.randrange(base)])
+        meta = {"timestamp": rnd.randint(0, 300)} if rnd.random() < 0.8 else {}
+        evs.append(IntentEvent(f"e{i}", rnd.choice([1, 10]), "bridge_out", rnd.choice(["USDC", "WETH"]), amt, meta))
+    batch = EventBatch.from_events(evs)
+    got = probabilistic_link(IntentDAG(), batch, tol_bps=25, time_window_s=window or 0)
+    assert got == _exact_naive(evs, 25, window)
+    # on floats, pairs right at the tolerance (base vs base + base/400) come out wrong
+    floats = [IntentEvent(e.eid, e.chain, e.kind, e.token, float(e.amount), e.meta) for e in evs]
+    assert probabilistic_link(IntentDAG(), floats, tol_bps=25, time_window_s=window or 0) != got
+
+@pytest.mark.parametrize("backend", [CompactIntentDAG, NxIntentDAG])
+def test_batch_conservation_is_exact(backend):
+    wei = 10**24
+    rows = [{"eid": "o1", "chain": 1, "kind": "bridge_out", "token": "USDC", "amount": 0.1, "meta": {"messageId": "m1"}},
+            {"eid": "o1b", "chain": 1, "kind": "bridge_out", "token": "USDC", "amount": 0.2, "meta": {"messageId": "m2"}},
+            {"eid": "i1", "chain": 10, "kind": "bridge_in", "token": "USDC", "amount": 0.3, "meta": {"messageId": "m1"}},
+            {"eid": "o2", "chain": 1, "kind": "bridge_out", "token": "WETH", "amount": wei, "meta": {"messageId": "m3"}},
+            {"eid": "i2", "chain": 10, "kind": "bridge_in", "token": "WETH", "amount": wei - 1, "meta": {"messageId": "m3"}}]
+    batch = EventBatch.from_dicts(rows)
+    dag = backend()
+    deterministic_link(dag, batch)
+    dag.link("o1b", "i1")
+    issues = conservation_by_component(dag, batch=batch, tol_bps=0)
+    assert [i.eid for i in issues] == ["o2"]
+    assert f"in={wei - 1}, net=1)" in issues[0].msg
+    # the same graph judged on float amounts sees neither problem
+    assert [i.eid for i in conservation_by_component(dag, tol_bps=0)] == []
+
+@pytest.mark.parametrize("backend", [CompactIntentDAG, NxIntentDAG])
+def test_conservation_allows_the_link_tolerance(backend):
+    wei = 10**24
+    rows = [{"eid": "o1", "chain": 1, "kind": "bridge_out", "token": "WETH", "amount": wei, "meta": {}},
+            {"eid": "i1", "chain": 10, "kind": "bridge_in", "token": "WETH", "amount": wei - wei // 400, "meta": {}},
+            {"eid": "o2", "chain": 1, "kind": "bridge_out", "token": "USDC", "amount": 100.0, "meta": {}},
+            {"eid": "i2", "chain": 10, "kind": "bridge_in", "token": "USDC", "amount": 99.7, "meta": {}}]
+    batch = EventBatch.from_dicts(rows)
+    dag = backend()
+    dag.add_batch(batch)
+    dag.link("o1", "i1")
+    dag.link("o2", "i2")
+    # the WETH fee is exactly 25 bps, the USDC one 30 bps
+    flagged = lambda **kw: [i.eid for i in conservation_by_component(dag, **kw)]
+    assert flagged(batch=batch, tol_bps=30) == [] == flagged(tol_bps=30)
+    assert flagged(batch=batch, tol_bps=25) == ["o2"]
+    assert flagged(batch=batch, tol_bps=24.99) == ["o1", "o2"] == flagged(tol_bps=0)
@@ -0,0 +1,87 @@
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_engine
+from web3 import Web3
+from app.correlate.dag import IntentEvent
+from app.correlate.linkers import BridgeAdapter, fetch_bridge_src_events
+from app.correlate.store import EventStore, fetch_bridge_src_events_cached
+from bench.mock_rpc import BRIDGE, DEPOSIT_SIG, MockNode, deposit_log
+
+FIELDS = {"message_id_components": ["l1Token", "to", "amount"], "token": "l1Token", "amount": "amount"}
+
+def _strip(evs):
+    return [(e.eid, e.token, e.amount, {k: v for k, v in e.meta.items() if k != "decode_stats"}) for e in evs]
+
+def _uncached(logs, lo, hi, fields=FIELDS):
+    adapter = BridgeAdapter("op", 1, 10, BRIDGE, DEPOSIT_SIG, fields, from_block=str(lo), to_block=str(hi))
+    with MockNode(logs, head=hi) as node:
+        return fetch_bridge_src_events(Web3(Web3.HTTPProvider(node.url)), adapter)
+
+def test_store_serves_finalized_blocks_from_disk(tmp_path):
+    store = EventStore(f"sqlite:///{tmp_path}/ev.db")
+    adapter = BridgeAdapter("op", 1, 10, BRIDGE, DEPOSIT_SIG, FIELDS, from_block="latest-999")
+    logs = [deposit_log(b, 0, b) for b in range(1, 1201, 5)]
+    with MockNode(logs[:200], head=1000) as node:
+        w3 = Web3(Web3.HTTPProvider(node.url))
+        first = fetch_bridge_src_events_cached(w3, adapter, store, confirmations=10)
+        node.calls.clear()
+        node.logs, node.head = logs, 1200
+        second = fetch_bridge_src_events_cached(w3, adapter, store, confirmations=10)
+        ranges = [(int(p[0]["fromBlock"], 16), int(p[0]["toBlock"], 16)) for m, p in node.calls if m == "eth_getLogs"]
+    assert _strip(first) == _strip(_uncached(logs[:200], 1, 1000))
+    assert _strip(second) == _strip(_uncached(logs, 201, 1200))
+    # only blocks past the stored span (991..) went back to the RPC
+    assert min(lo for lo, _ in ranges) == 991
+    assert second[0].meta["decode_stats"]["from_store"] > 0
+
+def test_amounts_are_stored_exactly(tmp_path):
+    store = EventStore(f"sqlite:///{tmp_path}/ev.db")
+    evs = [IntentEvent(f"0xab:{i}", 1, "bridge_out", "T", a, {"blockNumber": 5})
+           for i, a in enumerate([10**30 + 1, 0.1 + 0.2, 2**53 + 1, 1e-30])]
+    store.put("op", "fp", evs, 5, 5, (5, 5))
+    got = store.load("op", 5, 5)
+    assert [e.amount for e in got] == [10**30 + 1, 0.1 + 0.2, 2**53 + 1, 1e-30]
+    assert type(got[0].amount) is int and type(got[1].amount) is float
+
+def test_log_amounts_are_stored_exactly(tmp_path):
+    store = EventStore(f"sqlite:///{tmp_path}/ev.db")
+    adapter = BridgeAdapter("op", 1, 10, BRIDGE, DEPOSIT_SIG, FIELDS, from_block="latest-99")
+    logs = [deposit_log(b, 0, 10**18 + b) for b in range(1, 101, 3)]
+    with MockNode(logs, head=100) as node:
+        w3 = Web3(Web3.HTTPProvider(node.url))
+        live = fetch_bridge_src_events_cached(w3, adapter, store, confirmations=10)
+        stored = fetch_bridge_src_events_cached(w3, adapter, store, confirmations=10)
+    want = [10**18 + b for b in range(1, 101, 3)]
+    assert [e.amount for e in live] == [e.amount for e in stored] == want
+    assert [e.amount for e in store.load("op", 1, 90)] == [a for a in want if a - 10**18 <= 90]
+    # a store written through floats is refetched rather than served
+    store.put("op", adapter.fingerprint, [IntentEvent("0xab:0", 1, "bridge_out", "T", 1e18, {"blockNumber": 1})], 1, 1, (1, 90))
+    assert EventStore(f"sqlite:///{tmp_path}/ev.db").span("op", adapter.fingerprint) is None
+
+def test_config_change_invalidates_stored_span(tmp_path):
+    store = EventStore(f"sqlite:///{tmp_path}/ev.db")
+    adapter = BridgeAdapter("op", 1, 10, BRIDGE, DEPOSIT_SIG, FIELDS, from_block="latest-999")
+    logs = [deposit_log(b, 0, b) for b in range(1, 1001, 5)]
+    with MockNode(logs, head=1000) as node:
+        w3 = Web3(Web3.HTTPProvider(node.url))
+        fetch_bridge_src_events_cached(w3, adapter, store, confirmations=10)
+        assert store.span("op", adapter.fingerprint) == (1, 990)
+        # same adapter name, different decoding: nothing stored may be served
+        edited = BridgeAdapter("op", 1, 10, BRIDGE, DEPOSIT_SIG, {**FIELDS, "message_id_components": ["to"]},
+                               from_block="latest-999")
+        assert store.span("op", edited.fingerprint) is None
+        node.calls.clear()
+        got = fetch_bridge_src_events_cached(w3, edited, store, confirmations=10)
+        ranges = [(int(p[0]["fromBlock"], 16), int(p[0]["toBlock"], 16)) for m, p in node.calls if m == "eth_getLogs"]
+    assert min(lo for lo, _ in ranges) == 1 and got[0].meta["decode_stats"]["from_store"] == 0
+    assert _strip(got) == _strip(_uncached(logs, 1, 1000, edited.fields))
+    assert store.span("op", edited.fingerprint) == (1, 990) and store.span("op", adapter.fingerprint) is None
+
+def test_cache_from_before_fingerprints_is_rebuilt(tmp_path):
+    url = f"sqlite:///{tmp_path}/ev.db"
+    old = MetaData()
+    Table("bridge_events", old, Column("adapter", String, primary_key=True), Column("amount", Float))
+    Table("sync_state", old, Column("adapter", String, primary_key=True), Column("lo", Integer), Column("hi", Integer))
+    old.create_all(create_engine(url))
+    store = EventStore(url)
+    assert store.span("op", "fp") is None
+    store.put("op", "fp", [], 1, 2, (1, 2))
+    assert store.span("op", "fp") == (1, 2)
@@ -0,0 +1,69 @@
+import random
+import pytest
+from hexbytes import HexBytes
+from app.core.config import snapshot
+from app.correlate import linkers
+from app.correlate.dag import IntentDAG, IntentEvent
+from app.correlate.linkers import BridgeAdapter, decode_bridge_logs, probabilistic_link
+from bench.mock_rpc import BRIDGE, DEPOSIT_SIG, deposit_log
+
+def _naive(events, window=None):
+    tol_bps = snapshot().crosschain.amount_tol_bps
+    logs = []
+    for i in range(len(events)):
+        for j in range(i+1, len(events)):
+            a, b = events[i], events[j]
+            if a.token != b.token or a.chain == b.chain: continue
+            ta, tb = a.meta.get("timestamp"), b.meta.get("timestamp")
+            if window and ta is not None and tb is not None and abs(ta - tb) > window: continue
+            if abs(a.amount - b.amount) <= (tol_bps/10000)*max(abs(a.amount), 1e-12):
+                logs.append(f"p-link {a.eid} -> {b.eid} (0.7)")
+    return logs
+
+@pytest.mark.parametrize("window", [None, 30])
+def test_probabilistic_link_matches_pairwise(window):
+    rnd = random.Random(7)
+    evs = []
+    for i in range(400):
+        amt = rnd.choice([1000.0, 999.99, 1000.01, 250.0, 0.0, -5.0, rnd.uniform(1, 2000)])
+        meta = {"timestamp": rnd.randint(0, 300)} if rnd.random() < 0.8 else {}
+        evs.append(IntentEvent(f"e{i}", rnd.choice([1, 10, 8453]), "bridge_out",
+                               rnd.choice(["USDC", "WETH", None]), amt, meta))
+    assert probabilistic_link(IntentDAG(), evs, time_window_s=window or 0) == _naive(evs, window)
+
+def _irregular_logs():
+    rnd = random.Random(3)
+    logs = []
+    for k in range(300):
+        lg = deposit_log(k, k % 4, rnd.randrange(10**30), token=rnd.choice(["0x" + "11" * 20, "0x" + "ab" * 20]),
+                         extra=rnd.choice([b"", b"\x01", bytes(40)]))
+        data = bytes.fromhex(lg["data"][2:])
+        case = k % 10
+        if case == 1:    # dirty address padding
+            data = b"\x01" + data[1:]
+        elif case == 2:  # non-canonical bytes offset
+            data = data[:64] + (128).to_bytes(32, "big") + bytes(32) + data[96:]
+        elif case == 3:  # trailing garbage
+            data += b"\x00" * 32
+        elif case == 4:  # truncated
+            data = data[:50]
+        elif case == 5:
+            lg["topics"] = lg["topics"][:2]
+        lg["data"] = HexBytes(data) if k % 2 else "0x" + data.hex()
+        lg["topics"] = [HexBytes(t) for t in lg["topics"]] if k % 3 else lg["topics"]
+        lg["transactionHash"] = HexBytes(lg["transactionHash"])
+        lg["blockNumber"] = int(lg["blockNumber"], 16)
+        logs.append(lg)
+    return logs
+
+def test_batch_decoder_matches_per_log_path(monkeypatch):
+    adapter = BridgeAdapter("op", 1, 10, BRIDGE, DEPOSIT_SIG,
+                            {"indexed": ["l1Token", "l2Token", "from"], "data": ["to", "amount", "extraData"],
+                             "message_id_components": ["l1Token", "to", "amount"], "token": "l1Token", "amount": "amount"})
+    logs = _irregular_logs()
+    fast_evs, fast_stats = decode_bridge_logs(adapter, logs)
+    monkeypatch.setattr(linkers, "_decode_columns", lambda logs, i, d: ({}, [False] * len(logs)))
+    slow_evs, slow_stats = decode_bridge_logs(adapter, logs)
+    assert fast_evs == slow_evs
+    assert fast_stats["decoded"] == slow_stats["decoded"] and fast_stats["skipped"] == slow_stats["skipped"]
+    assert fast_stats["slow_path"] == len(logs) // 2   # cases 1-5 above
@@ -0,0 +1,58 @@
+import pytest
+from web3 import Web3
+from app.correlate.linkers import BridgeAdapter, fetch_bridge_src_events
+from app.correlate.logfetch import FetchSettings, LogFetcher, is_range_error, is_rate_limited
+from bench.mock_rpc import BRIDGE, DEPOSIT_SIG, MockNode, RpcError, deposit_log
+
+def _logs(n_blocks=5000, every=7):
+    return [deposit_log(b, i, 10**18 + b) for b in range(1, n_blocks + 1, every) for i in range(2)]
+
+def test_fetcher_splits_and_keeps_order():
+    logs = _logs()
+    with MockNode(logs, head=5000, max_range=700, max_results=150) as node:
+        w3 = Web3(Web3.HTTPProvider(node.url))
+        f = LogFetcher(w3, chain_id=-1, settings=FetchSettings(chunk_blocks=4000, concurrency=3))
+        got = f.fetch({"address": Web3.to_checksum_address(BRIDGE)}, 0, 5000)
+    assert [(g["blockNumber"], g["logIndex"]) for g in got] == \
+           [(int(l["blockNumber"], 16), int(l["logIndex"], 16)) for l in logs]
+    assert f.splits > 0
+
+def test_fetch_bridge_src_events_uses_chunks():
+    with MockNode(_logs(3000), head=3000, max_range=500) as node:
+        w3 = Web3(Web3.HTTPProvider(node.url))
+        adapter = BridgeAdapter("op", 1, 10, BRIDGE, DEPOSIT_SIG,
+                                {"indexed": ["l1Token", "l2Token", "from"], "data": ["to", "amount", "extraData"],
+                                 "message_id_components": ["l1Token", "to", "amount"], "token": "l1Token", "amount": "amount"},
+                                from_block="latest-2999")
+        evs = fetch_bridge_src_events(w3, adapter)
+        assert sum(1 for m, _ in node.calls if m == "eth_getLogs") > 1
+    assert len(evs) == 2 * len(range(1, 3001, 7))
+    assert evs[0].meta["decode_stats"]["skipped"] == 0
+
+@pytest.mark.parametrize("err, range_, rate", [
+    ({"code": -32005, "message": "query returned more than 10000 results"}, True, False),
+    ({"code": -32602, "message": "exceeds max block range 10000"}, True, False),
+    ({"code": -32000, "message": "Log response size exceeded."}, True, False),
+    ({"code": -32005, "message": "daily request count exceeded, request rate limited"}, False, True),
+    ({"code": 429, "message": "Your app has exceeded its compute units per second capacity"}, False, True),
+    ({"code": -32000, "message": "gas limit exceeded"}, False, False),
+    ({"code": -32000, "message": "execution timed out"}, False, False),
+])
+def test_range_and_rate_errors_are_told_apart(err, range_, rate):
+    assert (is_range_error(ValueError(err)), is_rate_limited(ValueError(err))) == (range_, rate)
+
+def test_rate_limited_chunks_back_off_instead_of_splitting():
+    logs = _logs(2000)
+    with MockNode(logs, head=2000) as node:
+        get_logs, hits = node.handlers["eth_getLogs"], []
+
+        def flaky(flt):
+            hits.append(1)
+            if len(hits) % 3:
+                raise RpcError(-32005, "project ID request rate exceeded")
+            return get_logs(flt)
+        node.handlers["eth_getLogs"] = flaky
+        f = LogFetcher(Web3(Web3.HTTPProvider(node.url)), chain_id=-2,
+                       settings=FetchSettings(chunk_blocks=1000, concurrency=1, backoff_ms=1))
+        got = f.fetch({"address": Web3.to_checksum_address(BRIDGE)}, 0, 1999)
+    assert len(got) == len(logs) and f.splits == 0 and f.rate_limited == 4 and f.calls == 6
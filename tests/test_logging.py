@@ -0,0 +1,92 @@
+import asyncio, io, json, logging, queue
+import pytest
+from app.core import logging as ig_logging
+from app.core.logging import AsyncQueueHandler, DROPS, RequestContextMiddleware, configure_logging, stop_logging
+from app.core.metrics import stage
+
+@pytest.fixture
+def logs():
+    root = logging.getLogger()
+    saved, level = list(root.handlers), root.level
+    out = io.StringIO()
+
+    def start(**cfg):
+        configure_logging(out, cfg)
+        return out
+
+    def records():
+        stop_logging()
+        return [json.loads(ln) for ln in out.getvalue().splitlines()]
+    start.records = records
+    yield start
+    stop_logging()
+    root.handlers[:] = saved
+    root.setLevel(level)
+
+def test_json_records_with_extra_fields(logs):
+    logs()
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logging.getLogger("t.json").exception("failed %d", 7, extra={"chain": 10})
+    [r] = logs.records()
+    assert r["msg"] == "failed 7" and r["name"] == "t.json" and r["level"] == "ERROR"
+    assert r["chain"] == 10 and "ZeroDivisionError" in r["exc_info"]
+    assert "request_id" not in r
+
+def test_sampling_spares_warnings(logs):
+    logs(sample={"t.sampled": 0.0})
+    before = DROPS.counts["sampled"]
+    log = logging.getLogger("t.sampled.child")
+    for _ in range(10):
+        log.info("noise")
+    log.warning("kept")
+    assert [r["msg"] for r in logs.records()] == ["kept"]
+    assert DROPS.counts["sampled"] == before + 10
+
+def test_rate_limit_per_logger(logs):
+    logs(rate_limit={"t.rl": 5})
+    for i in range(100):
+        logging.getLogger("t.rl").info("r%d", i)
+    logging.getLogger("t.other").info("unlimited")
+    msgs = [r["msg"] for r in logs.records()]
+    assert "unlimited" in msgs
+    assert 5 <= len(msgs) - 1 <= 7
+
+def test_slow_rate_limit_still_passes_and_spares_warnings(logs):
+    logs(rate_limit={"t.slow": 0.2})
+    log = logging.getLogger("t.slow")
+    for i in range(10):
+        log.info("r%d", i)
+        log.warning("w%d", i)
+    msgs = [r["msg"] for r in logs.records()]
+    assert [m for m in msgs if m[0] == "r"] == ["r0"]
+    assert [m for m in msgs if m[0] == "w"] == [f"w{i}" for i in range(10)]
+
+def test_full_queue_drops_instead_of_blocking(logs):
+    h = AsyncQueueHandler(queue.Queue(), {"queue_size": 1})
+    before = DROPS.counts["queue_full"]
+    for _ in range(3):
+        h.handle(logging.makeLogRecord({"msg": "x", "levelno": logging.INFO}))
+    assert DROPS.counts["queue_full"] == before + 2
+
+def test_request_context_and_access_record(logs):
+    logs()
+
+    async def app(scope, receive, send):
+        with stage("test.request"):
+            logging.getLogger("t.req").info("inside")
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    sent = []
+
+    async def send(msg):
+        sent.append(msg)
+    scope = {"type": "http", "method": "GET", "path": "/x", "headers": [(b"x-request-id", b"abc123")]}
+    asyncio.run(RequestContextMiddleware(app)(scope, None, send))
+    assert dict(sent[0]["headers"])[b"x-request-id"] == b"abc123"
+    inside, access = logs.records()
+    assert inside["request_id"] == access["request_id"] == "abc123"
+    assert access["name"] == "intent_guard.access" and access["status"] == 201
+    assert set(access["stages_ms"]) == {"test.request"}
+    assert ig_logging.current_request_id() is None
@@ -0,0 +1,52 @@
+import random
+from app.core.utils import stable_hash
+from app.explain.attestation import attestation
+from app.explain.merkle import (call_tree_proof, call_tree_root, edge_proof, edge_root, verify_call_tree_proof,
+                                verify_edge_proof)
+from app.models.schemas import SimCallNode
+
+def _tree(rnd, depth):
+    kids = [_tree(rnd, depth - 1) for _ in range(rnd.randint(0, 3))] if depth else []
+    return SimCallNode(target=rnd.choice(["0xA", "0xB", "0xC"]), selector=rnd.choice(["0x", "call", "delegatecall"]),
+                       children=kids)
+
+def _paths(node, prefix=()):
+    yield list(prefix)
+    for i, c in enumerate(node.children):
+        yield from _paths(c, prefix + (i,))
+
+def test_call_tree_proofs_verify_and_detect_tampering():
+    tree = _tree(random.Random(5), 4)
+    root = call_tree_root(tree)
+    assert root == call_tree_root(tree.model_copy(deep=True))
+    for path in _paths(tree):
+        leaf, steps = call_tree_proof(tree, path)
+        assert verify_call_tree_proof(root, leaf, steps)
+        assert not verify_call_tree_proof(root, bytes(32), steps)
+
+def test_structure_changes_root_and_deep_trees_work():
+    a = SimCallNode(target="0xA", selector="x", children=[SimCallNode(target="0xB", selector="y")])
+    b = SimCallNode(target="0xA", selector="x", children=[SimCallNode(target="0xB", selector="z")])
+    c = SimCallNode(target="0xAx", selector="", children=[SimCallNode(target="0xB", selector="y")])
+    assert len({call_tree_root(a), call_tree_root(b), call_tree_root(c)}) == 3
+    deep = SimCallNode(target="0x0", selector="s")
+    for k in range(5000):
+        deep = SimCallNode(target=f"0x{k}", selector="s", children=[deep])
+    assert len(call_tree_root(deep)) == 32
+
+def test_edge_proofs():
+    for n in range(1, 12):
+        edges = [(f"a{k}", f"b{k}", {"confidence": 0.7}) for k in range(n)]
+        root = edge_root(edges)
+        for k in range(n):
+            assert verify_edge_proof(root, edges[k], edge_proof(edges, k))
+            assert not verify_edge_proof(root, (f"a{k}", f"b{k}", {"confidence": 1.0}), edge_proof(edges, k))
+
+def test_attestation_modes():
+    tree = _tree(random.Random(1), 3)
+    edges = [("a", "b", {"confidence": 1.0})]
+    payload = {"type": "4337", "callTree": tree, "edges": edges}
+    assert attestation(payload, mode="json") == {
+        "type": "4337", "callTree": stable_hash(tree.model_dump()), "edges": stable_hash(edges)}
+    assert attestation(payload, mode="merkle") == {
+        "type": "4337", "callTree": "0x" + call_tree_root(tree).hex(), "edges": "0x" + edge_root(edges).hex()}
@@ -0,0 +1,81 @@
+import time
+import pytest
+from app.core import metrics
+from app.core.metrics import Counter, Histogram, Registry, STAGE_SECONDS, stage
+from app.core.rpc import PoolSettings, RpcClient
+from app.eip712.hashing import typed_data_hash
+from bench.mock_rpc import MockNode, RpcError
+
+def _sample(text: str, prefix: str) -> float:
+    return sum(float(ln.rsplit(" ", 1)[1]) for ln in text.splitlines() if ln.startswith(prefix))
+
+def test_text_format():
+    reg = Registry()
+    h = reg.register(Histogram("t_seconds", "Test.", ("stage",), buckets=(0.1, 1.0)))
+    c = reg.register(Counter("t_total", "Test.", ("path",)))
+    h.observe(0.05, "a")
+    h.observe(0.5, "a")
+    h.observe(5, "a")
+    c.inc(2, 'we"ird\n')
+    text = reg.render()
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="a",le="1.0"} 2' in text
+    assert 't_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 't_seconds_count{stage="a"} 3' in text
+    assert 't_seconds_sum{stage="a"} 5.55' in text
+    assert 't_total{path="we\\"ird\\n"} 2' in text
+
+def test_stage_context_and_decorator():
+    before = STAGE_SECONDS.snapshot("test.stage")[0]
+    with stage("test.stage"):
+        pass
+
+    @stage("test.stage")
+    def f(x):
+        return x + 1
+    assert f(1) == 2
+    with pytest.raises(ZeroDivisionError):
+        with stage("test.stage"):
+            1 / 0
+    assert STAGE_SECONDS.snapshot("test.stage")[0] == before + 3
+
+def test_rpc_latency_and_errors():
+    node = MockNode(head=7)
+    def fail(*a):
+        raise RpcError(-32000, "boom")
+    node.handlers["eth_fail"] = fail
+    with node:
+        c = RpcClient("metrics-test", node.url, PoolSettings(retries=0))
+        c.call("eth_blockNumber", [])
+        with pytest.raises(ValueError):
+            c.call("eth_fail", [])
+    text = metrics.render()
+    assert _sample(text, 'intent_guard_rpc_seconds_count{upstream="metrics-test",method="eth_blockNumber"}') == 1
+    assert _sample(text, 'intent_guard_rpc_errors_total{upstream="metrics-test",method="eth_fail"}') == 1
+    assert 'intent_guard_rpc_errors_total{upstream="metrics-test",method="eth_blockNumber"}' not in text
+
+def test_cache_samples():
+    typed = {"types": {"EIP712Domain": [{"name": "name", "type": "string"}],
+                       "M": [{"name": "v", "type": "uint256"}]},
+             "primaryType": "M", "domain": {"name": "metrics"}, "message": {"v": 1}}
+    key = 'intent_guard_cache_requests_total{cache="eip712_domain",result="hit"}'
+    before = _sample(metrics.render(), key)
+    typed_data_hash(typed)
+    typed_data_hash(typed)
+    assert _sample(metrics.render(), key) >= before + 1
+
+def test_broken_collector_does_not_break_render():
+    reg = Registry()
+    reg.register(metrics.Gauge("broken", "Test.", lambda: 1 / 0))
+    assert "# broken unavailable" in reg.render()
+
+def test_stage_overhead_is_microseconds():
+    n = 20_000
+    s = stage("test.overhead")
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with s:
+            pass
+    per_call = (time.perf_counter() - t0) / n
+    assert per_call < 20e-6
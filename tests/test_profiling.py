@@ -0,0 +1,78 @@
+import asyncio, time
+from app.core import config, profiling
+from app.core.deadline import default_deadline_s
+from app.core.profiling import ProfilingMiddleware, ProfilingSettings
+
+def _burn_cpu(ticks=20, cap_s=10.0):
+    # spin until the sampler has ticked `ticks` times while we are on the stack, not for a wall time
+    sampler = profiling._SAMPLER
+    start, end = sampler.ticks, time.perf_counter() + cap_s
+    while sampler._active and sampler.ticks - start < ticks and time.perf_counter() < end:
+        pass
+
+def sync_endpoint():
+    _burn_cpu()
+
+async def _app(scope, receive, send):
+    if scope["path"] == "/sync":
+        scope["endpoint"] = sync_endpoint
+        await asyncio.to_thread(sync_endpoint)
+    else:
+        _burn_cpu()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+def _request(path, headers=(), skip_paths=()):
+    sent = []
+    scope = {"type": "http", "method": "POST", "path": path, "headers": list(headers)}
+
+    async def send(msg):
+        sent.append(msg)
+    asyncio.run(ProfilingMiddleware(_app, skip_paths)(scope, None, send))
+    return dict(sent[0]["headers"])
+
+def _use(monkeypatch, tmp_path, **kw):
+    cfg = ProfilingSettings(dir=str(tmp_path), interval_ms=2, **kw)
+    monkeypatch.setattr(profiling, "settings", lambda: cfg)
+    return cfg
+
+def test_disabled_and_unauthorised_requests_are_not_profiled(monkeypatch, tmp_path):
+    _use(monkeypatch, tmp_path)
+    assert profiling.ID_HEADER not in _request("/a", [(b"x-profile", b"anything")])
+    _use(monkeypatch, tmp_path, token="secret")
+    assert profiling.ID_HEADER not in _request("/a")
+    assert profiling.ID_HEADER not in _request("/a", [(b"x-profile", b"wrong")])
+    assert not list(tmp_path.iterdir())
+
+def test_header_profile_of_async_handler(monkeypatch, tmp_path):
+    _use(monkeypatch, tmp_path, token="secret")
+    pid = _request("/a", [(b"x-profile", b"secret")])[profiling.ID_HEADER].decode()
+    text = profiling.load(pid)
+    assert text and (tmp_path / f"{pid}.collapsed").exists()
+    lines = text.splitlines()
+    assert all(ln.startswith("POST /a;ProfilingMiddleware.__call__") for ln in lines)
+    # every tick after the first lands inside _burn_cpu
+    assert sum(int(ln.rsplit(" ", 1)[1]) for ln in lines if "_burn_cpu" in ln) >= 19
+
+def test_sampled_profile_of_sync_handler(monkeypatch, tmp_path):
+    _use(monkeypatch, tmp_path, sample_pct=100)
+    pid = _request("/sync")[profiling.ID_HEADER].decode()
+    text = profiling.load(pid)
+    assert any(ln.startswith("POST /sync;sync_endpoint (") and "_burn_cpu" in ln for ln in text.splitlines())
+
+def test_load_rejects_bad_ids(monkeypatch, tmp_path):
+    _use(monkeypatch, tmp_path, token="secret")
+    (tmp_path / "x.collapsed").write_text("a 1\n")
+    assert profiling.load("../x") is None
+    assert profiling.load("x") is None
+
+def test_probes_are_not_profiled(monkeypatch, tmp_path):
+    _use(monkeypatch, tmp_path, token="secret")
+    assert profiling.ID_HEADER not in _request("/health", [(b"x-profile", b"secret")], skip_paths=("/health",))
+    assert not list(tmp_path.iterdir())
+
+def test_request_path_settings_never_load_the_config(monkeypatch):
+    monkeypatch.setattr(config, "_STORE", None)
+    monkeypatch.delenv("INTENT_GUARD_PROFILE_TOKEN", raising=False)
+    assert not profiling.settings().enabled and default_deadline_s() == 25.0
+    assert config._STORE is None
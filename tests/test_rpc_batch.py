@@ -0,0 +1,57 @@
+from eth_abi import encode
+from app.core.rpc import PoolSettings, RpcBatch, RpcClient
+from app.eip4337.account import SEL_ENTRY_POINT, SEL_GET_OWNERS, SEL_OWNER, detect_accounts
+from bench.mock_rpc import MockNode, RpcError
+
+SA, SAFE, EOA = "0x" + "aa" * 20, "0x" + "bb" * 20, "0x" + "cc" * 20
+EP = "0x5FF137D4b0FDCD49DcA30c7CF57E578a026d2789"
+
+def _node():
+    node = MockNode(head=100)
+    def get_code(addr, block):
+        return "0x" if addr.lower() == EOA else "0x6080604052"
+    def call(tx, block):
+        to, sel = tx["to"].lower(), bytes.fromhex(tx["data"][2:])
+        if to == SA and sel == SEL_ENTRY_POINT:
+            return "0x" + encode(["address"], [EP]).hex()
+        if to == SA and sel == SEL_OWNER:
+            return "0x" + encode(["address"], [EOA]).hex()
+        if to == SAFE and sel == SEL_GET_OWNERS:
+            return "0x" + encode(["address[]"], [[EOA, SA]]).hex()
+        raise RpcError(3, "execution reverted")
+    node.handlers.update(eth_getCode=get_code, eth_call=call,
+                         eth_getStorageAt=lambda a, s, b: "0x" + "00" * 32)
+    return node
+
+def test_batch_typed_results_and_item_errors():
+    with _node() as node:
+        b = RpcBatch(RpcClient("t", node.url, PoolSettings()), block=100)
+        i_code = b.get_code(SA)
+        i_ep = b.call(SA, SEL_ENTRY_POINT, ["address"])
+        i_bad = b.call(EOA, SEL_OWNER, ["address"])
+        res = b.execute()
+        assert node.http_requests == 1
+        assert all(p[-1] == "0x64" for m, p in node.calls)
+    assert res[i_code].value == bytes.fromhex("6080604052")
+    assert res[i_ep].value == EP.lower()
+    assert not res[i_bad].ok and res[i_bad].error["code"] == 3
+
+def test_batch_pins_latest_once():
+    with _node() as node:
+        b = RpcBatch(RpcClient("t", node.url, PoolSettings()))
+        b.get_code(SA)
+        node.head = 101           # the head moves while reads are being queued
+        b.get_code(EOA)
+        b.execute()
+        assert [m for m, _ in node.calls] == ["eth_blockNumber", "eth_getCode", "eth_getCode"]
+        assert all(p[-1] == "0x64" for m, p in node.calls[1:])
+
+def test_detect_accounts_round_trips():
+    with _node() as node:
+        got = list(detect_accounts(RpcClient("t", node.url, PoolSettings()), [SA, SAFE, EOA], batch_size=2))
+        # one request pins "latest", then one per batch of two addresses, all at that block
+        assert node.http_requests == 3 and node.calls[0][0] == "eth_blockNumber"
+        assert all(p[-1] == "0x64" for m, p in node.calls[1:])
+    assert [r["stack"] for r in got] == ["simple-account", "safe", "undeployed"]
+    assert got[0]["entryPoint"] == EP
+    assert [o.lower() for o in got[1]["owners"]] == [EOA, SA]
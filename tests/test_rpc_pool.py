@@ -0,0 +1,14 @@
+from app.core.rpc import PoolSettings, RpcClient
+from bench.mock_rpc import MockNode
+
+def test_client_reuses_connections_and_counts_calls():
+    with MockNode(head=77) as node:
+        c = RpcClient("t", node.url, PoolSettings(pool_size=2))
+        assert c.w3.eth.block_number == 77
+        assert int(c.call("eth_chainId", []), 16) == 1
+        for _ in range(5):
+            c.w3.eth.block_number
+        st = c.stats()
+    assert st["calls"] == 7 and st["errors"] == 0
+    assert st["methods"]["eth_blockNumber"]["calls"] == 6
+    assert st["connections_opened"] == 1
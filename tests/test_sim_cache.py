@@ -0,0 +1,116 @@
+import asyncio, threading
+import pytest
+from app.simulate.cache import SimCache, sim_key, userop_key
+
+OP = {"sender": "0xAbC0000000000000000000000000000000000001", "nonce": "0x1", "initCode": "0x",
+      "callData": "0xB61D27F6", "callGasLimit": 100000, "paymasterAndData": "0x", "signature": None}
+
+class Clock:
+    t = 0.0
+    def __call__(self):
+        return self.t
+
+def test_userop_key_ignores_encoding():
+    same = {**OP, "sender": OP["sender"].lower(), "nonce": 1, "callData": "0xb61d27f6", "callGasLimit": "0x186a0"}
+    same.pop("signature")
+    assert userop_key(same) == userop_key(OP)
+    assert userop_key({**OP, "nonce": 2}) != userop_key(OP)
+    assert sim_key("m", OP, "0xEP", "latest") != sim_key("m", OP, "0xEP", "0x10")
+
+def test_concurrent_identical_requests_share_one_call():
+    cache = SimCache()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"callGasLimit": "0x1"}
+
+    async def main():
+        key = sim_key("eth_estimateUserOperationGas", OP, "0xEP")
+        return await asyncio.gather(*[cache.get_async(key, upstream) for _ in range(20)])
+
+    out = asyncio.run(main())
+    assert len(calls) == 1 and all(o == {"callGasLimit": "0x1"} for o in out)
+    assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 19
+
+def test_sync_callers_coalesce_across_threads():
+    cache = SimCache()
+    calls, gate = [], threading.Event()
+
+    def upstream():
+        calls.append(1)
+        gate.wait(1)
+        return "tree"
+
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(cache.get(("k", "latest"), upstream))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    while cache.stats()["coalesced"] < 7:
+        pass
+    gate.set()
+    for t in threads:
+        t.join()
+    assert calls == [1] and out == ["tree"] * 8
+
+def test_ttl_follows_block_time_and_pinned_blocks_stay():
+    clock = Clock()
+    cache = SimCache(block_time_s=12, clock=clock)
+    n = iter(range(100))
+    latest, pinned = ("k", "latest"), ("k", "0x10")
+    assert cache.get(latest, lambda: next(n)) == 0
+    assert cache.get(pinned, lambda: next(n)) == 1
+    clock.t = 11.9
+    assert cache.get(latest, lambda: next(n)) == 0
+    clock.t = 12.1
+    assert cache.get(latest, lambda: next(n)) == 2
+    clock.t = 10_000
+    assert cache.get(pinned, lambda: next(n)) == 1
+    assert cache.stats()["expired"] == 1 and cache.stats()["hits"] == 2
+
+def test_lru_eviction():
+    cache = SimCache(max_entries=2)
+    cache.get(("a", "latest"), lambda: "a")
+    cache.get(("b", "latest"), lambda: "b")
+    cache.get(("a", "latest"), lambda: "x")            # touch a
+    cache.get(("c", "latest"), lambda: "c")            # evicts b
+    assert cache.get(("a", "latest"), lambda: "x") == "a"
+    assert cache.get(("b", "latest"), lambda: "b2") == "b2"
+    assert cache.stats()["evictions"] == 2 and cache.stats()["size"] == 2
+
+def test_failures_reach_waiters_and_are_not_cached():
+    cache = SimCache()
+
+    async def boom():
+        await asyncio.sleep(0.02)
+        raise ValueError("AA21 didn't pay prefund")
+
+    async def main():
+        return await asyncio.gather(*[cache.get_async(("k", "latest"), boom) for _ in range(5)],
+                                    return_exceptions=True)
+
+    out = asyncio.run(main())
+    assert all(isinstance(e, ValueError) for e in out)
+    assert cache.get(("k", "latest"), lambda: "ok") == "ok"
+
+def test_cancelled_leader_hands_over_to_a_waiter():
+    cache = SimCache()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        leader = asyncio.create_task(cache.get_async(("k", "latest"), upstream))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_async(("k", "latest"), upstream))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == 2
@@ -0,0 +1,28 @@
+import json
+from bench.startup import DEFERRED, measure, parse_importtime
+from app.core import warmup
+
+def test_import_main_defers_heavy_dependencies():
+    times = measure("main")
+    assert "main" in times and "fastapi" in times
+    assert [m for m in DEFERRED if m in times] == []
+
+def test_parse_importtime():
+    sample = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        120 |     yaml.error\n"
+              "import time:      3000 |       3120 |   yaml\n"
+              "import time:       500 |       3620 | main\n")
+    assert parse_importtime(sample) == {"yaml.error": (120, 120, 2), "yaml": (3000, 3120, 1), "main": (500, 3620, 0)}
+
+def test_warm_and_readiness():
+    warmup.warm("eip712")
+    assert warmup.is_warm("eip712") and warmup.warm("eip712") == 0.0
+    report = warmup.readiness()
+    assert set(report) == set(warmup.SUBSYSTEMS) and report["eip712"]["warm"]
+
+def test_ready_endpoint_requires():
+    import main
+    ok = main.ready(require="eip712")
+    assert ok.status_code == 200 and json.loads(ok.body)["ready"]
+    missing = main.ready(require="eip712,nope")
+    assert missing.status_code == 503 and not json.loads(missing.body)["ready"]
@@ -0,0 +1,196 @@
+import asyncio, dataclasses, json, tracemalloc
+from pathlib import Path
+import pytest
+from app.api.routes import _ndjson, batch_verdicts_4337, parse_batch, verdict_4337, verdict_4337_async
+from app.core.deadline import deadline
+from app.core.utils import stable_hash
+from app.explain.attestation import attestation
+from app.models.schemas import SimCallNode, UserOperation
+from app.core.config import snapshot
+from app.policies import eip4337
+from app.policies.eip4337 import MAX_FINDINGS, lint_userop
+from app.core.rpc import REGISTRY
+from app.simulate.aa import simulate_validation, simulate_validation_async
+from app.simulate.cache import get_sim_cache
+from app.simulate.trace import parse_call_trace, tokens
+from bench.generators import call, transfer
+from bench.mock_rpc import MockNode
+
+FIXTURES = Path(__file__).parent / "fixtures" / "traces"
+EP = "0x5FF137D4b0FDCD49DcA30c7CF57E578a026d2789"
+OP = UserOperation(sender="0x9e1c0a2b3c4d5e6f708192a3b4c5d6e7f8091a2b", nonce="0x1", initCode="0x",
+                   callData="0x" + call("executeUserOp(address,uint256,bytes,uint8)", ["address", "uint256", "bytes", "uint8"],
+                                        ["0x" + "11" * 20, 0, transfer(), 0]).hex(), callGasLimit="0x30d40", verificationGasLimit="0x186a0",
+                   preVerificationGas="0xb798", maxFeePerGas="0x3b9aca00", maxPriorityFeePerGas="0x3b9aca00",
+                   paymasterAndData="0x", signature="0x" + "ff" * 65)
+
+def _fixture(name):
+    return json.loads((FIXTURES / name).read_text())
+
+def _envelope(result) -> bytes:
+    return json.dumps({"jsonrpc": "2.0", "id": 1, "result": result}).encode()
+
+def _chunks(raw: bytes, size: int):
+    return (raw[i:i + size] for i in range(0, len(raw), size))
+
+def _shape(node: SimCallNode):
+    return [node.target, node.selector, [_shape(c) for c in node.children]]
+
+def _ref_shape(frame):
+    # straightforward recursive reading of the same callTracer frame
+    kind, data = frame["type"].lower(), frame.get("input") or ""
+    sel = data[:10] if len(data) >= 10 else "0x"
+    sel = sel if kind in ("call", "staticcall") else f"{kind}:{sel}" if kind in ("delegatecall", "callcode") else kind
+    return [frame.get("to"), sel, [_ref_shape(c) for c in frame.get("calls", [])]]
+
+SAFE_SINGLETON = "0xa6b71e26c5e0845f74c812102ca7114b6a896ab2"
+MULTI_SEND = "0x9641d764fc13c8b624c04430c7356c1c7c8102e2"
+
+def _vet_implementations(monkeypatch, addrs):
+    snap = snapshot()
+    snap = dataclasses.replace(snap, eip4337=dataclasses.replace(snap.eip4337, vetted_implementations=frozenset(addrs)))
+    monkeypatch.setattr(eip4337, "snapshot", lambda: snap)
+
+@pytest.fixture
+def aa_node(monkeypatch):
+    get_sim_cache().clear()
+    with MockNode(chain_id=1) as node:
+        monkeypatch.setenv("RPC_MAINNET", node.url)
+        monkeypatch.setenv("ENTRY_POINT", EP)
+        monkeypatch.setenv("AA_CHAIN_ID", "1")
+        yield node
+    get_sim_cache().clear()
+
+@pytest.mark.parametrize("name", ["simple_account_transfer.json", "safe_multisend_delegatecall.json"])
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_streamed_parse_matches_reference(name, size):
+    frame = _fixture(name)
+    assert _shape(parse_call_trace(_chunks(_envelope(frame), size))) == _ref_shape(frame)
+
+def test_recorded_traces_through_the_node(aa_node, monkeypatch):
+    aa_node.handlers["debug_traceCall"] = lambda tx, block, cfg: _fixture("safe_multisend_delegatecall.json")
+    tree = simulate_validation(OP)
+    (method, (tx, block, cfg)), = [c for c in aa_node.calls if c[0] == "debug_traceCall"]
+    assert tx["to"] == EP and tx["data"].startswith("0xd6383f94") and cfg == {"tracer": "callTracer"}
+    dels = lambda: [i.msg.split()[-1] for i in lint_userop(tree, OP) if i.code == "AA-DEL"]
+    # every delegatecall is a finding, proxy forwards to the Safe singleton included
+    assert dels() == [SAFE_SINGLETON, SAFE_SINGLETON, MULTI_SEND]
+    # once the proxies' implementations are vetted, only the MultiSend delegatecall is left
+    _vet_implementations(monkeypatch, {SAFE_SINGLETON, "0x8abb13360b87be5eeb1b98647a016add927a136c",
+                                       "0x43506849d7c04f9138d1a2050bbf3a0c054402dd"})
+    assert dels() == [MULTI_SEND]
+    assert verdict_4337(OP).decision == "BLOCK"
+
+    get_sim_cache().clear()
+    aa_node.handlers["debug_traceCall"] = lambda tx, block, cfg: _fixture("simple_account_transfer.json")
+    assert not [i for i in lint_userop(simulate_validation(OP), OP) if i.code == "AA-DEL"]
+    assert verdict_4337(OP).decision == "ALLOW"
+
+def test_trace_call_fallback(aa_node):
+    aa_node.handlers["trace_call"] = lambda tx, types, block: {"output": "0x", "trace": [
+        {"action": {"callType": "call", "to": EP.lower(), "input": "0xd6383f94"}, "traceAddress": [], "type": "call"},
+        {"action": {"callType": "call", "to": OP.sender, "input": "0x7bb37428aa"}, "traceAddress": [0], "type": "call"},
+        {"action": {"callType": "delegatecall", "to": "0x9641d764fc13c8b624c04430c7356c1c7c8102e2",
+                    "input": "0x8d80ff0a00"}, "traceAddress": [0, 0], "type": "call"},
+        {"action": {"from": OP.sender, "init": "0x60"}, "result": {"address": "0x" + "ab" * 20},
+         "traceAddress": [1], "type": "create"},
+    ]}
+    tree = simulate_validation(OP)
+    assert _shape(tree) == [EP.lower(), "0xd6383f94", [
+        [OP.sender, "0x7bb37428", [["0x9641d764fc13c8b624c04430c7356c1c7c8102e2", "delegatecall:0x8d80ff0a", []]]],
+        ["0x" + "ab" * 20, "create", []]]]
+
+def test_unavailable_simulation_is_reported(monkeypatch):
+    get_sim_cache().clear()
+    monkeypatch.delenv("ENTRY_POINT", raising=False)
+    v = verdict_4337(OP)
+    assert v.decision == "BLOCK" and v.rationale[0].startswith("AA-SIM")
+
+def test_async_simulation_path(aa_node, monkeypatch):
+    frame = _fixture("simple_account_transfer.json")
+    _vet_implementations(monkeypatch, {"0x8abb13360b87be5eeb1b98647a016add927a136c",
+                                       "0x43506849d7c04f9138d1a2050bbf3a0c054402dd"})
+    aa_node.handlers["debug_traceCall"] = lambda tx, block, cfg: frame
+
+    async def run():
+        try:
+            return await simulate_validation_async(OP), await verdict_4337_async(OP)
+        finally:
+            await REGISTRY.aclose()
+    tree, v = asyncio.run(run())
+    assert _shape(tree) == _ref_shape(frame) and v == verdict_4337(OP) and v.decision == "ALLOW"
+    assert [c[0] for c in aa_node.calls].count("debug_traceCall") == 1     # the sync verdict was a cache hit
+
+    get_sim_cache().clear()
+    del aa_node.handlers["debug_traceCall"]
+    aa_node.handlers["trace_call"] = lambda tx, types, block: {"output": "0x", "trace": [
+        {"action": {"callType": "call", "to": EP.lower(), "input": "0xd6383f94"}, "traceAddress": [], "type": "call"}]}
+    tree, v = asyncio.run(run())
+    assert _shape(tree) == [EP.lower(), "0xd6383f94", []]
+
+def test_4337_batch_in_order_and_deadline_blocks_the_rest(aa_node, monkeypatch):
+    frame = _fixture("simple_account_transfer.json")
+    _vet_implementations(monkeypatch, {"0x8abb13360b87be5eeb1b98647a016add927a136c",
+                                       "0x43506849d7c04f9138d1a2050bbf3a0c054402dd"})
+    aa_node.handlers["debug_traceCall"] = lambda tx, block, cfg: frame
+    ops = [OP.model_copy(update={"nonce": hex(n)}).model_dump() for n in range(8)]
+    raw = b"\n".join([json.dumps(o).encode() for o in ops[:3]] + [b'{"sender": 1}']
+                     + [json.dumps(o).encode() for o in ops[3:]])
+
+    async def run(limit):
+        try:
+            with deadline(limit):
+                body = _ndjson(batch_verdicts_4337(parse_batch(raw, UserOperation), concurrency=4)).body_iterator
+                return [json.loads(line) async for line in body]
+        finally:
+            await REGISTRY.aclose()
+    out = asyncio.run(run(None))
+    assert [v["decision"] for v in out] == ["ALLOW"] * 3 + ["BLOCK"] + ["ALLOW"] * 5
+    assert out[3]["rationale"][0].startswith("P-INPUT")
+    assert [v["attestation"]["sender"] for v in out[:3] + out[4:]] == [OP.sender] * 8
+
+    # a slow node: the first window finishes, the rest is blocked once the deadline passes, and every line still comes back
+    get_sim_cache().clear()
+    aa_node.latency = 0.4
+    out = asyncio.run(run(0.6))
+    assert len(out) == 9 and out[3]["rationale"][0].startswith("P-INPUT")
+    late = [v for v in out if v["rationale"] and "deadline" in v["rationale"][0]]
+    assert late and all(v["decision"] == "BLOCK" and v["rationale"][0].startswith("AA-SIM") for v in late)
+    assert out[-1] in late
+
+def test_multi_megabyte_trace_in_bounded_memory():
+    blob = "0x" + "ab" * 8192
+    frame = {"type": "CALL", "from": "0x0", "to": "0x1", "input": "0xd6383f94" + "00" * 64, "calls": [
+        {"type": "CALL", "from": "0x1", "to": f"0x{i:040x}", "input": blob, "output": blob} for i in range(400)]}
+    raw = _envelope(frame)
+    assert len(raw) > 12_000_000
+    tracemalloc.start()
+    try:
+        tree = parse_call_trace(_chunks(raw, 1 << 16))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert len(tree.children) == 400 and tree.children[0].selector == "0xabababab"
+    assert peak < 2_000_000
+
+def test_deep_trace_and_early_stop():
+    depth = 5000
+    raw = b"".join([b'{"jsonrpc":"2.0","id":1,"result":',
+                    b''.join(b'{"type":"DELEGATECALL","to":"0x%x","input":"0x%08x","calls":[' % (i, i) for i in range(depth)),
+                    b"]}" * depth, b"}"])
+    tree = parse_call_trace(_chunks(raw, 1000))
+    issues = lint_userop(tree, OP)
+    assert len([i for i in issues if i.code == "AA-DEL"]) == MAX_FINDINGS
+    for mode in ("json", "merkle"):
+        assert attestation({"callTree": tree}, mode=mode)["callTree"].startswith("0x")
+
+def test_json_attestation_unchanged_for_shallow_trees():
+    tree = parse_call_trace([_envelope(_fixture("safe_multisend_delegatecall.json"))])
+    assert attestation({"callTree": tree}, mode="json")["callTree"] == stable_hash(tree.model_dump())
+
+def test_tokens_across_chunk_boundaries():
+    raw = json.dumps({"a": "x\\\"yé", "n": [12345, -1.5e3, True, None], "b": "z" * 50}).encode()
+    for size in (1, 2, 3):
+        toks = list(tokens(_chunks(raw, size), max_str=16))
+        assert ("s", 'x\\"yé') in toks and ("v", 12345) in toks and ("v", -1500.0) in toks
+        assert ("s", "z" * 16) in toks
@@ -0,0 +1,31 @@
+import json
+from app.api.routes import batch_verdicts, parse_batch, verdict_eip712, verdict_4337
+from app.models.schemas import EIP712TypedData, UserOperation
+
+PERMIT = {
+    "types": {"Permit": [{"name": "spender", "type": "address"}, {"name": "value", "type": "uint256"}]},
+    "primaryType": "Permit",
+    "domain": {"chainId": 1, "verifyingContract": "0xabc"},
+    "message": {"spender": "0xdead", "value": 10**30},
+}
+USEROP = {k: "0x" for k in ("sender", "nonce", "initCode", "callData", "callGasLimit", "verificationGasLimit",
+                            "preVerificationGas", "maxFeePerGas", "maxPriorityFeePerGas", "paymasterAndData")}
+
+def _small(n):
+    return {**PERMIT, "message": {"spender": "0xdead", "value": n}}
+
+def test_array_and_ndjson_give_same_verdicts_in_order():
+    items = [PERMIT, _small(1), _small(2)]
+    as_array = json.dumps(items).encode()
+    as_ndjson = b"\n".join(json.dumps(i).encode() for i in items) + b"\n"
+    a = list(batch_verdicts(parse_batch(as_array, EIP712TypedData), verdict_eip712))
+    b = list(batch_verdicts(parse_batch(as_ndjson, EIP712TypedData), verdict_eip712))
+    assert a == b
+    assert a == [verdict_eip712(EIP712TypedData.model_validate(i)) for i in items]
+
+def test_invalid_item_blocks_without_failing_the_batch():
+    raw = b"\n".join([json.dumps(USEROP).encode(), b'{"sender": 1}', json.dumps(USEROP).encode()])
+    out = list(batch_verdicts(parse_batch(raw, UserOperation), verdict_4337))
+    assert len(out) == 3
+    assert out[1].decision == "BLOCK" and out[1].rationale[0].startswith("P-INPUT")
+    assert out[0] == out[2] == verdict_4337(UserOperation.model_validate(USEROP))